@@ -3,10 +3,17 @@
 from fastapi import APIRouter
 from schemas.analysis_request import AnalysisRequest
 from schemas.analysis_response import AnalysisResponse
-from application.analyzer_service import analyze_text
+from schemas.bundle_analysis_request import BundleAnalysisRequest
+from schemas.bundle_analysis_response import BundleAnalysisResponse
+from application.analyzer_service import analyze_text, analyze_bundle
 
 router = APIRouter()
 
 @router.post("", response_model=AnalysisResponse)
 async def analyze(req: AnalysisRequest) -> AnalysisResponse:
     return await analyze_text(req.file_buffer, req.language_code)
+
+@router.post("/bundle", response_model=BundleAnalysisResponse)
+async def analyze_bundle_files(req: BundleAnalysisRequest) -> BundleAnalysisResponse:
+    files = [(f.file_name, f.file_buffer) for f in req.files]
+    return await analyze_bundle(files, req.language_code, token_budget=req.token_budget)
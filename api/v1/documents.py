@@ -5,19 +5,81 @@ from schemas.add_request import AddRequest
 from schemas.add_response import AddResponse
 from schemas.delete_response import DeleteResponse
 from schemas.delete_request import DeleteRequest
-from application.document_service import add_document, delete_document
+from schemas.update_request import UpdateRequest
+from schemas.update_response import UpdateResponse
+from schemas.document_status_response import DocumentStatusResponse
+from schemas.bulk_delete_request import BulkDeleteRequest
+from schemas.deletion_job_response import DeletionJobResponse
+from schemas.document_metadata import DocumentMetadata
+from application.document_service import (
+    add_document, update_document, delete_document, get_document_status, set_document_metadata
+)
+from application.compaction_service import start_bulk_deletion, get_deletion_job
+from mappers.metadata_mapper import to_domain_metadata
 from typing import List
-import requests
 
 router = APIRouter()
 
 @router.post("", response_model=AddResponse)
 async def add(req: AddRequest) -> AddResponse:
-    success = await add_document(req.doc_id, req.file_name, req.file_buffer)
+    success = await add_document(req.doc_id, req.file_name, req.file_buffer, to_domain_metadata(req.metadata))
     result = "success" if success else "failed"
     return AddResponse(success=result)
 
+@router.get("/{doc_id}/status", response_model=DocumentStatusResponse)
+async def status(doc_id: str) -> DocumentStatusResponse:
+    doc_status = get_document_status(doc_id)
+    if doc_status is None:
+        return DocumentStatusResponse(doc_id=doc_id, found=False)
+    return DocumentStatusResponse(doc_id=doc_id, found=True, **doc_status)
+
+@router.put("/{doc_id}/metadata", response_model=DocumentStatusResponse)
+async def metadata(doc_id: str, req: DocumentMetadata) -> DocumentStatusResponse:
+    doc_status = await set_document_metadata(doc_id, to_domain_metadata(req))
+    if doc_status is None:
+        return DocumentStatusResponse(doc_id=doc_id, found=False)
+    return DocumentStatusResponse(doc_id=doc_id, found=True, **doc_status)
+
+@router.put("/{doc_id}", response_model=UpdateResponse)
+async def update(doc_id: str, req: UpdateRequest) -> UpdateResponse:
+    diff = await update_document(doc_id, req.file_name, req.file_buffer, to_domain_metadata(req.metadata))
+    if diff is None:
+        return UpdateResponse(success="failed")
+    return UpdateResponse(
+        success="success",
+        added=diff.added,
+        removed=diff.removed,
+        changed=diff.changed,
+        moved=diff.moved,
+        unchanged=len(diff.unchanged),
+        failed=diff.failed,
+        full_reingest=diff.full_reingest,
+    )
+
 @router.delete("/{doc_id}", response_model=DeleteResponse)
 async def delete(req: DeleteRequest) -> DeleteResponse:
     result = await delete_document(req.doc_id)
-    return DeleteResponse(output=result)
\ No newline at end of file
+    return DeleteResponse(output=result)
+
+def _to_deletion_job_response(job: dict) -> DeletionJobResponse:
+    return DeletionJobResponse(
+        job_id=job["job_id"],
+        status=job["status"],
+        total=len(job["doc_ids"]),
+        processed=len(job["removed"]) + len(job["not_found"]) + len(job["failed"]),
+        removed=job["removed"],
+        not_found=job["not_found"],
+        failed=job["failed"],
+    )
+
+@router.post("/bulk-delete", response_model=DeletionJobResponse)
+async def bulk_delete(req: BulkDeleteRequest) -> DeletionJobResponse:
+    # The documents are hidden right away, and removed from the storages by a background job
+    return _to_deletion_job_response(await start_bulk_deletion(req.doc_ids))
+
+@router.get("/deletion-jobs/{job_id}", response_model=DeletionJobResponse)
+async def deletion_job(job_id: str) -> DeletionJobResponse:
+    job = get_deletion_job(job_id)
+    if job is None:
+        return DeletionJobResponse(job_id=job_id, found=False)
+    return _to_deletion_job_response(job)
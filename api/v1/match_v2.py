@@ -3,9 +3,12 @@
 from fastapi import APIRouter
 from schemas.match_request import MatchRequest
 from schemas.match_response import MatchResponse
-from application.matcher_service import match_documents_v2
+from schemas.batch_match_request import BatchMatchRequest
+from schemas.batch_match_response import LotMatchResponse
+from application.matcher_service import match_documents_v2, match_documents_batch
 from mappers.keyword_mapper import to_domain_keywords
 from mappers.match_mapper import to_match_responses
+from mappers.metadata_mapper import to_metadata_filter
 from typing import List
 
 router = APIRouter()
@@ -13,5 +16,20 @@ router = APIRouter()
 @router.post("", response_model=List[MatchResponse])
 async def match_v2(req: MatchRequest) -> List[MatchResponse]:
     domain_keywords = to_domain_keywords(req.keywords)
-    matched_docs = await match_documents_v2(domain_keywords, req.language_code)
+    matched_docs = await match_documents_v2(
+        domain_keywords, req.language_code, deadline_ms=req.deadline_ms, mode=req.mode,
+        metadata_filter=to_metadata_filter(req.filters),
+    )
     return to_match_responses(matched_docs)
+
+@router.post("/batch", response_model=List[LotMatchResponse])
+async def match_batch(req: BatchMatchRequest) -> List[LotMatchResponse]:
+    keyword_sets = [to_domain_keywords(lot.keywords) for lot in req.lots]
+    results = await match_documents_batch(
+        keyword_sets, req.language_code, deadline_ms=req.deadline_ms, mode=req.mode,
+        metadata_filter=to_metadata_filter(req.filters),
+    )
+    return [
+        LotMatchResponse(lot_id=lot.lot_id, documents=to_match_responses(matched_docs))
+        for lot, matched_docs in zip(req.lots, results)
+    ]
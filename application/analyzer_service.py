@@ -1,17 +1,55 @@
 # application/analyzer_service.py
 
-from infrastructure.analyzer_engine import summarize, extract_keywords
+from infrastructure.analyzer_engine import summarize, extract_keywords, SUMMARY_PROMPT_VERSION, KEYWORDS_PROMPT_VERSION
+from infrastructure.analysis_cache import text_cache, keywords_cache, summary_cache
 from schemas.analysis_response import AnalysisResponse, Keyword as KeywordSchema
-from core.utils.file_loader import extract_text_from_buffer
+from schemas.bundle_analysis_response import BundleAnalysisResponse, AnalyzedFile
+from core.utils.file_loader import extract_text_from_bytes
+from domain.document_bundle import BundleDocument, remove_shared_boilerplate, fit_to_budget, merge_texts, estimate_tokens
 
+import os
 import time
+import base64
+import asyncio
+import hashlib
+from typing import List, Optional, Tuple
 from infrastructure.logger import debug, write_log
-    
+from infrastructure.single_flight import SingleFlight
 
-async def analyze_text(file_buffer: str, language_code: str) -> AnalysisResponse: 
+# Identical concurrent analyses (same file and language) share one computation
+_analysis_flights = SingleFlight("analyze")
+_bundle_flights = SingleFlight("analyze_bundle")
+
+# Tokens of merged text sent to each LLM call of /analyze/bundle
+ANALYZE_BUNDLE_TOKEN_BUDGET = int(os.getenv("ANALYZE_BUNDLE_TOKEN_BUDGET", "60000"))
+
+
+def _decode(file_buffer: str) -> Tuple[bytes, str]:
+    """PDF bytes and their hash (results are keyed by the content, not by its base64 encoding)."""
+    try:
+        file_bytes = base64.b64decode(file_buffer)
+    except ValueError as e:
+        debug(f"[ERROR] Failed to decode file buffer: {e}")
+        file_bytes = b""
+    return file_bytes, hashlib.sha256(file_bytes).hexdigest()
+
+async def analyze_text(file_buffer: str, language_code: str) -> AnalysisResponse:
+    file_bytes, content_hash = _decode(file_buffer)
+    key = (content_hash, language_code)
+    return await _analysis_flights.run(key, lambda: _analyze_text(file_bytes, content_hash, language_code))
+
+async def _get_text(file_bytes: bytes, content_hash: str) -> Optional[str]:
+    document_text = text_cache.get(content_hash)
+    if document_text is None:
+        document_text = await extract_text_from_bytes(file_bytes)
+        if document_text:
+            text_cache.put(content_hash, document_text)
+    return document_text
+
+async def _analyze_text(file_bytes: bytes, content_hash: str, language_code: str) -> AnalysisResponse:
     start = time.time()
 
-    document_text = extract_text_from_buffer(file_buffer)
+    document_text = await _get_text(file_bytes, content_hash)
 
     if not document_text:
         return AnalysisResponse(
@@ -19,9 +57,20 @@ async def analyze_text(file_buffer: str, language_code: str) -> AnalysisResponse
             keywords=[]
         )
 
-    summary = await summarize(document_text, language_code)
-    domain_keywords = await extract_keywords(document_text)
-    
+    summary_key = (content_hash, language_code, SUMMARY_PROMPT_VERSION)
+    summary = summary_cache.get(summary_key)
+    if summary is None:
+        summary = await summarize(document_text, language_code)
+        if not summary.startswith("ERROR:"):
+            summary_cache.put(summary_key, summary)
+
+    keywords_key = (content_hash, KEYWORDS_PROMPT_VERSION)
+    domain_keywords = keywords_cache.get(keywords_key)
+    if domain_keywords is None:
+        domain_keywords = await extract_keywords(document_text)
+        if domain_keywords:  # an empty list is a failed call
+            keywords_cache.put(keywords_key, domain_keywords)
+
     response_keywords = [
         KeywordSchema(keyword=k.keyword, score=k.score)
         for k in domain_keywords
@@ -33,3 +82,99 @@ async def analyze_text(file_buffer: str, language_code: str) -> AnalysisResponse
     debug(f"[INFO] Analysis complete in {time.time() - start:.2f}s")
 
     return AnalysisResponse(summary=summary, keywords=response_keywords)
+
+
+async def _timed(coro, timings: dict, stage: str):
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+async def _cached_summary(text_hash: str, text: str, language_code: str) -> str:
+    key = ("bundle", text_hash, language_code, SUMMARY_PROMPT_VERSION)
+    summary = summary_cache.get(key)
+    if summary is None:
+        summary = await summarize(text, language_code)
+        if not summary.startswith("ERROR:"):
+            summary_cache.put(key, summary)
+    return summary
+
+async def _cached_keywords(text_hash: str, text: str) -> list:
+    key = ("bundle", text_hash, KEYWORDS_PROMPT_VERSION)
+    keywords = keywords_cache.get(key)
+    if keywords is None:
+        keywords = await extract_keywords(text)
+        if keywords:
+            keywords_cache.put(key, keywords)
+    return keywords
+
+async def analyze_bundle(
+        files: List[Tuple[str, str]], language_code: str, token_budget: Optional[int] = None,
+        ) -> BundleAnalysisResponse:
+    """One summary and one keyword list for several PDFs (file_name, base64 buffer) analyzed together."""
+    token_budget = token_budget or ANALYZE_BUNDLE_TOKEN_BUDGET
+    decoded = [(file_name, *_decode(file_buffer)) for file_name, file_buffer in files]
+    key = (tuple(content_hash for _, _, content_hash in decoded), language_code, token_budget)
+    return await _bundle_flights.run(key, lambda: _analyze_bundle(decoded, language_code, token_budget))
+
+async def _analyze_bundle(
+        decoded: List[Tuple[str, bytes, str]], language_code: str, token_budget: int,
+        ) -> BundleAnalysisResponse:
+    start = time.perf_counter()
+    timings = {}
+
+    texts = await _timed(
+        asyncio.gather(*(_get_text(file_bytes, content_hash) for _, file_bytes, content_hash in decoded)),
+        timings, "extraction",
+    )
+
+    dedup_start = time.perf_counter()
+    # None for the files whose text could not be extracted
+    per_file = [
+        BundleDocument(file_name, text, len(text)) if text else None
+        for (file_name, _, _), text in zip(decoded, texts)
+    ]
+    documents = [d for d in per_file if d]
+    remove_shared_boilerplate(documents)
+    fit_to_budget(documents, token_budget)
+    merged_text = merge_texts(documents)
+    timings["deduplication"] = round((time.perf_counter() - dedup_start) * 1000, 1)
+
+    analyzed_files = [
+        AnalyzedFile(
+            file_name=file_name,
+            extracted_characters=document.extracted_chars if document else 0,
+            boilerplate_characters=document.boilerplate_chars if document else 0,
+            truncated_characters=document.truncated_chars if document else 0,
+            error=None if document else "Could not extract text from PDF.",
+        )
+        for (file_name, _, _), document in zip(decoded, per_file)
+    ]
+
+    if not documents:
+        return BundleAnalysisResponse(
+            summary="ERROR: Could not extract text from PDF.", keywords=[], files=analyzed_files,
+            prompt_tokens=0, timings_ms=timings,
+        )
+
+    text_hash = hashlib.sha256(merged_text.encode()).hexdigest()
+    summary, domain_keywords = await asyncio.gather(
+        _timed(_cached_summary(text_hash, merged_text, language_code), timings, "summary"),
+        _timed(_cached_keywords(text_hash, merged_text), timings, "keywords"),
+    )
+    timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+
+    write_log(msg=f"Files: {[f.file_name for f in analyzed_files]}\nSummary: {summary}\n"
+                  f"Keywords: {[(k.keyword, k.score) for k in domain_keywords]}",
+              header='AI1 Bundle Results', file_name="AI1_results.log")
+    debug(f"[INFO] Bundle analysis of {len(documents)}/{len(decoded)} files, ~{estimate_tokens(merged_text)} tokens, "
+          f"timings (ms): {timings}")
+
+    return BundleAnalysisResponse(
+        summary=summary,
+        keywords=[KeywordSchema(keyword=k.keyword, score=k.score) for k in domain_keywords],
+        files=analyzed_files,
+        prompt_tokens=estimate_tokens(merged_text),
+        timings_ms=timings,
+    )
@@ -0,0 +1,112 @@
+# application/compaction_service.py
+#
+# Bulk deletion: the documents are tombstoned right away (hidden from /match and /ask), then removed
+# from the storages by a background compaction job, COMPACTION_BATCH_SIZE documents per write.
+
+import os
+import time
+import asyncio
+from typing import Dict, List, Optional
+from infrastructure.logger import debug, write_log
+from infrastructure.tombstones import create_deletion_job, get_job, list_jobs, update_job, remove_tombstones
+from infrastructure.corpus_sync import corpus_write
+from infrastructure.llm_dispatcher import llm_priority_var, BULK
+from domain.document_deleter import remove_docs_from_rag
+
+# Documents removed per storage write (other writes can run between two batches)
+COMPACTION_BATCH_SIZE = int(os.getenv("COMPACTION_BATCH_SIZE", "25"))
+
+_queue: Optional[asyncio.Queue] = None
+_worker: Optional[asyncio.Task] = None
+
+
+def _remaining(job: Dict) -> List[str]:
+    processed = set(job["removed"]) | set(job["not_found"]) | set(job["failed"])
+    return [doc_id for doc_id in job["doc_ids"] if doc_id not in processed]
+
+
+async def _run_job(job_id: str) -> None:
+    # The jobs and tombstones are only written under the write access, from an up-to-date view: with several
+    # workers, the job may also be resumed by another process
+    async with corpus_write():
+        job = get_job(job_id)
+        if job is None or job["status"] == "complete":
+            return
+        update_job(job_id, status="running")
+    start = time.time()
+
+    while True:
+        async with corpus_write():
+            job = get_job(job_id)
+            if job is None:
+                return
+            batch = _remaining(job)[:max(1, COMPACTION_BATCH_SIZE)]
+            if not batch:
+                break
+            statuses = await remove_docs_from_rag(batch)
+            for doc_id, status in statuses.items():
+                job[{"success": "removed", "not_found": "not_found"}.get(status, "failed")].append(doc_id)
+            # Failed documents stay tombstoned (still hidden), the others are gone
+            remove_tombstones([doc_id for doc_id, status in statuses.items() if status in ("success", "not_found")])
+            update_job(job_id, removed=job["removed"], not_found=job["not_found"], failed=job["failed"])
+        debug(f"[INFO] Deletion job {job_id}: {len(job['doc_ids']) - len(_remaining(job))}/{len(job['doc_ids'])} documents processed")
+
+    async with corpus_write():
+        update_job(job_id, status="complete", finished_at=time.time())
+    write_log(
+        msg=f"Deletion job {job_id}: {len(job['removed'])} removed, {len(job['not_found'])} not found, "
+            f"{len(job['failed'])} failed in {time.time() - start:.2f}s",
+        header="Bulk Deletion Results",
+        file_name="deletion_documents.log",
+    )
+
+
+async def _run_worker() -> None:
+    llm_priority_var.set(BULK)  # the worker task has its own context
+    while True:
+        job_id = await _queue.get()
+        try:
+            await _run_job(job_id)
+        except Exception as e:
+            async with corpus_write():
+                update_job(job_id, status="failed")
+            debug(f"[ERROR] Deletion job {job_id} failed: {e}")
+        finally:
+            _queue.task_done()
+
+
+def _enqueue(job_id: str) -> None:
+    global _queue, _worker
+    if _queue is None:
+        _queue = asyncio.Queue()
+    if _worker is None:
+        _worker = asyncio.create_task(_run_worker())
+    _queue.put_nowait(job_id)
+
+
+async def start_bulk_deletion(doc_ids: List[str]) -> Dict:
+    """Tombstone the documents (they disappear from the results immediately) and queue their removal."""
+    async with corpus_write():
+        job = create_deletion_job(doc_ids)
+    _enqueue(job["job_id"])
+    debug(f"[INFO] Deletion job {job['job_id']} queued for {len(job['doc_ids'])} documents")
+    return job
+
+
+def get_deletion_job(job_id: str) -> Optional[Dict]:
+    return get_job(job_id)
+
+
+def resume_compaction() -> int:
+    """Re-queue the deletion jobs that were not finished when the server stopped."""
+    jobs = [job_id for job_id, job in list_jobs().items() if job["status"] in ("pending", "running")]
+    for job_id in jobs:
+        _enqueue(job_id)
+    return len(jobs)
+
+
+def stop_compaction() -> None:
+    global _worker
+    if _worker is not None:
+        _worker.cancel()
+        _worker = None
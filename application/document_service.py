@@ -3,12 +3,34 @@
 import time
 from infrastructure.logger import debug, write_log
 from core.utils.file_utils import save_base64_to_tempfile, cleanup_tempfile
-from domain.document_ingestor import ingest_pdf_into_rag
-from domain.document_deleter import remove_doc_from_rag 
+from typing import Optional
+from domain.document_ingestor import prepare_pdf, ingest_pdf_into_rag, update_pdf_in_rag, refresh_document_profile
+from domain.document_deleter import remove_doc_from_rag, remove_docs_from_rag
+from domain.slide_diff import SlideDiff
+from infrastructure.doc_registry import get_doc, update_doc
+from infrastructure.corpus_sync import corpus_write
+from infrastructure.llm_dispatcher import llm_priority, BULK
+from infrastructure.tombstones import is_tombstoned, remove_tombstones
+from infrastructure.profile_engine import DOCUMENT_PROFILES
+from domain.document_metadata import DocumentMetadata
 
-async def add_document(doc_id: str, file_name: str, file_buffer: str) -> bool:
+async def _purge_tombstoned(doc_id: str) -> None:
+    """A document added again before its compaction: remove the deleted version first."""
+    if is_tombstoned(doc_id):
+        debug(f"[INFO] {doc_id} was deleted and not yet compacted, removing the old version")
+        await remove_docs_from_rag([doc_id])
+        remove_tombstones([doc_id])
+
+async def _refresh_profile(doc_id: str, file_name: str) -> None:
+    """Build the profile of a written document. A failure only keeps the previous profile (if any)."""
+    try:
+        await refresh_document_profile(doc_id, file_name)
+    except Exception as e:
+        debug(f"[ERROR] Profile of {doc_id} not built: {e}")
+
+async def add_document(doc_id: str, file_name: str, file_buffer: str, metadata: Optional[DocumentMetadata] = None) -> bool:
     """
-    Adds a base64-encoded PDF document into the RAG pipeline.
+    Adds a base64-encoded PDF document (and its metadata, used by the /match filters) into the RAG pipeline.
     Returns True if successful, False otherwise.
     """
     start = time.time()
@@ -21,7 +43,16 @@ async def add_document(doc_id: str, file_name: str, file_buffer: str) -> bool:
     tmp_path = save_base64_to_tempfile(file_buffer, suffix=".pdf")
 
     try:
-        success = await ingest_pdf_into_rag(tmp_path, doc_id, file_name)
+        # Captioning and graph extraction give way to the interactive LLM calls
+        with llm_priority(BULK):
+            # Rendering and captioning (LLM calls) run without the write access, which is taken for the
+            # writes only: the other writers of every worker do not wait for them
+            prepared = await prepare_pdf(tmp_path, doc_id)
+            async with corpus_write():
+                await _purge_tombstoned(doc_id)
+                success = await ingest_pdf_into_rag(tmp_path, doc_id, file_name, metadata, prepared)
+            if success and DOCUMENT_PROFILES:
+                await _refresh_profile(doc_id, file_name)
         debug(f"[INFO] Adding complete in {time.time() - start:.2f}s")
     except Exception as e:
         debug(f"[ERROR] Exception while ingesting {doc_id}: {e}")
@@ -41,6 +72,43 @@ async def add_document(doc_id: str, file_name: str, file_buffer: str) -> bool:
         
     return success
 
+async def update_document(doc_id: str, file_name: str, file_buffer: str, metadata: Optional[DocumentMetadata] = None) -> Optional[SlideDiff]:
+    """
+    Updates an ingested document with a new version of its base64-encoded PDF.
+    Only the added or changed slides are processed. The metadata, when given, replace the previous ones.
+    Returns the SlideDiff if successful, None otherwise.
+    """
+    start = time.time()
+    diff = None
+
+    debug(f"[INFO] Starting update of {doc_id}...")
+
+    # Decode base64 -> temp PDF
+    tmp_path = save_base64_to_tempfile(file_buffer, suffix=".pdf")
+
+    try:
+        with llm_priority(BULK):
+            async with corpus_write():
+                await _purge_tombstoned(doc_id)
+                diff = await update_pdf_in_rag(tmp_path, doc_id, file_name)
+                if diff is not None and metadata is not None:
+                    update_doc(doc_id, metadata=metadata.to_dict())
+            if DOCUMENT_PROFILES and diff is not None and diff.has_changes():
+                await _refresh_profile(doc_id, file_name)
+        debug(f"[INFO] Update complete in {time.time() - start:.2f}s")
+    except Exception as e:
+        debug(f"[ERROR] Exception while updating {doc_id}: {e}")
+        diff = None
+    finally:
+        cleanup_tempfile(tmp_path)
+        write_log(
+            msg=f"Document {doc_id} update {'succeeded: ' + str(diff) if diff else 'failed'}.",
+            header='Update Results',
+            file_name='ingestion_documents.log'
+        )
+
+    return diff
+
 async def delete_document(doc_id: str) -> str:
     """
     Delete a document from LightRAG.
@@ -50,7 +118,8 @@ async def delete_document(doc_id: str) -> str:
     debug(f"[INFO] Starting deletion for {doc_id}...")
 
     try:
-        deletion_result = await remove_doc_from_rag(doc_id)
+        async with corpus_write():
+            deletion_result = await remove_doc_from_rag(doc_id)
 
         if deletion_result.status == "success":
             debug(f"[INFO] Document {doc_id} deleted successfully")
@@ -72,4 +141,28 @@ async def delete_document(doc_id: str) -> str:
             msg=f"Document {doc_id} deletion attempt resulted in: {deletion_result.status if 'deletion_result' in locals() else 'error'}.",
             header='Deletion Results',
             file_name='deletion_documents.log'
-        )
\ No newline at end of file
+        )
+
+def get_document_status(doc_id: str) -> Optional[dict]:
+    """
+    Ingestion status of a document (None if unknown): whether it is matchable,
+    and whether its knowledge graph is complete.
+    """
+    entry = get_doc(doc_id)
+    if entry is None or is_tombstoned(doc_id):
+        return None
+    return {
+        "matchable": bool(entry.get("slides")),
+        "graph_status": entry.get("graph_status"),
+        "slides": len(entry.get("slides", [])),
+        "duplicate_slides": sum(1 for slide in entry.get("slides", []) if slide.get("duplicate_of")),
+        "metadata": entry.get("metadata"),
+    }
+
+async def set_document_metadata(doc_id: str, metadata: DocumentMetadata) -> Optional[dict]:
+    """Replace the metadata of an ingested document. Returns its status, None if the document is unknown."""
+    if get_doc(doc_id) is None or is_tombstoned(doc_id):
+        return None
+    async with corpus_write():
+        update_doc(doc_id, metadata=metadata.to_dict())
+    return get_document_status(doc_id)
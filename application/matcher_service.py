@@ -2,37 +2,105 @@
 
 from domain.keyword import Keyword as DomainKeyword
 from domain.matched_document import MatchedDocument
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+import os
 import time
+import asyncio
 from infrastructure.logger import debug, write_log
 
-from infrastructure.lightrag_engine import query_similar_chunks_from_keywords, get_slide_number
+from infrastructure.lightrag_engine import query_chunks_by_vector, get_slide_number, get_chunk_vectors, get_chunk_filter
 from infrastructure.azure_llm import ask_llm_for_ranked_documents
+from infrastructure.embedder import embedder
+from infrastructure.hybrid_search import query_chunks_hybrid, RETRIEVAL_MODE
+from infrastructure.single_flight import SingleFlight
+from infrastructure.doc_registry import get_doc
+from infrastructure.duplicate_index import get_duplicate_aliases, get_slide_of
+from infrastructure.tombstones import get_tombstoned_ids
+from infrastructure.metadata_index import SearchScope, resolve_scope
 from domain.document import Document
+from domain.document_profile import DocumentProfile
 from domain.chunk import Chunk
+from domain.extractive_explanation import build_extractive_explanation
+from domain.evidence_selection import select_evidence
+from domain.document_ingestor import build_slide_content, slide_caption
+from domain.document_metadata import MetadataFilter
 
+# Default time budget of a /match request in milliseconds (0 = no deadline). When the LLM re-ranking cannot
+# finish before the deadline, the deterministic Stage 1 ranking is returned with degraded=True.
+MATCH_DEADLINE_MS = int(os.getenv("MATCH_DEADLINE_MS", "0"))
+# Time kept to build and send the response after the LLM call is abandoned
+MATCH_DEADLINE_MARGIN_MS = int(os.getenv("MATCH_DEADLINE_MARGIN_MS", "150"))
 
-def _generate_weighted_query(keywords: List[DomainKeyword]) -> str:
+# Trade-off between relevance and diversity of the evidence chunks sent to the LLM (1 = similarity only)
+EVIDENCE_MMR_LAMBDA = float(os.getenv("EVIDENCE_MMR_LAMBDA", "0.7"))
+# Evidence chunks sent to the LLM with a document that has a profile (the others get per_doc_chunk_limit chunks)
+RANKING_EVIDENCE_WITH_PROFILE = int(os.getenv("RANKING_EVIDENCE_WITH_PROFILE", "2"))
+
+# Identical concurrent /match requests (double submit, same tender opened by several users) share one computation
+_match_flights = SingleFlight("match")
+
+
+async def _generate_weighted_query_vector(keywords: List[DomainKeyword]):
+    """
+    Build a single query vector as the weighted sum of the keyword embeddings (weight = keyword score).
+    """
+    keywords = [kw for kw in keywords if kw.keyword.strip() and kw.score > 0]
+    if not keywords:
+        return None
+    return await embedder.embed_weighted_query(
+        [kw.keyword.strip().lower() for kw in keywords],
+        [kw.score for kw in keywords],
+    )
+
+
+def _with_duplicate_slides(raw_chunks: List[dict], scope: Optional[SearchScope] = None) -> List[dict]:
+    """
+    Near-duplicate slides share one chunk (see infrastructure/duplicate_index.py): a retrieved shared chunk
+    is also credited, with the same similarity, to the other documents holding the slide. The copies take
+    a single place in the top_k results of the search.
+    With a scope, only its documents are kept (a shared chunk may be owned by a document outside it).
     """
-+    Build a token-weighted query by repeating each keyword token according to its integer weight.
-+    """
-    return " ".join(
-        kw.keyword.lower() for kw in keywords for _ in range(kw.score)
+    aliases = get_duplicate_aliases()
+    if not aliases:
+        return raw_chunks if scope is None else [c for c in raw_chunks if c["full_doc_id"] in scope.doc_ids]
+    excluded = get_tombstoned_ids()
+    expanded = []
+    for raw_chunk in raw_chunks:
+        if scope is None or raw_chunk["full_doc_id"] in scope.doc_ids:
+            expanded.append(raw_chunk)
+        for alias in aliases.get(raw_chunk["id"], []):
+            if alias.doc_id in excluded or (scope is not None and alias.doc_id not in scope.doc_ids):
+                continue
+            expanded.append({
+                **raw_chunk,
+                "full_doc_id": alias.doc_id,
+                "content": build_slide_content(alias.slide, alias.file_name, slide_caption(raw_chunk["content"])),
+                "alias_order_index": alias.slide - 1,
+            })
+    return expanded
+
+
+def _to_chunk(raw_chunk: dict) -> Chunk:
+    if "alias_order_index" in raw_chunk:
+        slide_number = raw_chunk["alias_order_index"]
+    else:
+        slide = get_slide_of(raw_chunk["full_doc_id"], raw_chunk["id"])
+        # Documents without a manifest: the chunk_order_index is the slide order
+        slide_number = slide - 1 if slide is not None else get_slide_number(raw_chunk["id"])
+    return Chunk(
+        id=raw_chunk["id"],
+        doc_id=raw_chunk["full_doc_id"],
+        content=raw_chunk["content"],
+        distance=raw_chunk["distance"],
+        slide_number=slide_number,
     )
 
 
 def _group_chunks_by_document(chunks_results) -> Dict[str, Document]:
     documents_by_ao = {}
-    for raw_chunk in chunks_results: 
+    for raw_chunk in _with_duplicate_slides(chunks_results):
         doc_id = raw_chunk["full_doc_id"]
-        chunk_id = raw_chunk["id"]
-        chunk = Chunk(
-            id=chunk_id,
-            doc_id=doc_id,
-            content=raw_chunk["content"],
-            distance=raw_chunk["distance"],
-            slide_number=get_slide_number(chunk_id)
-        )
+        chunk = _to_chunk(raw_chunk)
         documents_by_ao[doc_id] = documents_by_ao.get(doc_id, Document(ao_id=doc_id, chunks=[]))
         documents_by_ao[doc_id].add_chunk(chunk)
     return documents_by_ao
@@ -69,11 +137,14 @@ def _map_llm_result_to_matched_documents(
 async def match_documents(keywords: List[DomainKeyword], language_code: str, top_k: int = 15) -> List[MatchedDocument]:
     start = time.time()
 
-    # 1. Generate weighted query string
-    weighted_query = _generate_weighted_query(keywords)
+    # 1. Generate weighted query vector
+    weighted_query = ", ".join(f"{kw.keyword.lower()} ({kw.score})" for kw in keywords)
+    query_vector = await _generate_weighted_query_vector(keywords)
+    if query_vector is None:
+        return []
 
     # 2. Get chunks from vector database
-    chunks_results = await query_similar_chunks_from_keywords(weighted_query, top_k)
+    chunks_results = await query_chunks_by_vector(query_vector, top_k)
 
     # 3. Group chunks by document -> instantiate Document objects
     documents_by_ao = _group_chunks_by_document(chunks_results)
@@ -108,8 +179,10 @@ def _init_doc_acc(doc_id: str) -> Dict:
         return {
             "doc": Document(ao_id=doc_id, chunks=[]),
             "per_kw_best_sim": {},
+            "per_kw_best_chunk": {},
             "evidence": [],
-            "seen_chunks": set()
+            "seen_chunks": set(),
+            "chunk_keywords": {},  # chunk_id -> {keyword: similarity}, for the evidence selection
         }
 
 def _process_chunk(
@@ -119,53 +192,90 @@ def _process_chunk(
     sim: float,
     chunk: Chunk
 ):
-    """Processes a single chunk for a given document, updating the best similarity score for a keyword
+    """Processes a single chunk for a given document, updating the best similarity score (and chunk) for a keyword
     and collecting evidence chunks if it has not been seen before."""
     prev = doc_acc[doc_id]["per_kw_best_sim"].get(kw_lower, 0.0)
     if sim > prev:
         doc_acc[doc_id]["per_kw_best_sim"][kw_lower] = sim
+        doc_acc[doc_id]["per_kw_best_chunk"][kw_lower] = chunk
 
     chunk_id = chunk.id
+    doc_acc[doc_id]["chunk_keywords"].setdefault(chunk_id, {})[kw_lower] = sim
     if chunk_id not in doc_acc[doc_id]["seen_chunks"]:
         doc_acc[doc_id]["evidence"].append(chunk)
         doc_acc[doc_id]["seen_chunks"].add(chunk_id)
 
-async def _gather_chunks_per_keyword(
-    keywords: List[DomainKeyword],
+async def _retrieve_keyword_hits(
+    keyword_texts: List[str],
     per_keyword_k: int,
-) -> Dict[str, Dict]:
+    retrieval_mode: str = RETRIEVAL_MODE,
+    scope: Optional[SearchScope] = None,
+) -> Dict[str, List[Tuple[float, Chunk]]]:
+    """
+    Query similar chunks for each distinct keyword (case-insensitive) once: vector search, or vector + BM25
+    search in "hybrid" mode. All keywords are embedded in a single batch and searched concurrently.
+    With a scope (metadata filter), only the chunks of its documents are scored.
+    Returns a dict: lowercase keyword -> [(similarity, chunk), ...].
     """
-    For each keyword, query similar chunks and aggregate them per document.
+    unique = {}
+    for text in keyword_texts:
+        text = text.strip()
+        if text and text.lower() not in unique:
+            unique[text.lower()] = text
+    if not unique or (scope is not None and not scope.chunk_ids):
+        return {}
+
+    texts = list(unique.values())
+    query_vectors = await embedder.embed_queries(texts)
+    # Rows of the scope in chunks_vdb, resolved once for all the keywords
+    chunk_filter = await get_chunk_filter(scope.chunk_ids) if scope is not None else None
+    if retrieval_mode == "hybrid":
+        searches = [
+            query_chunks_hybrid(text, query_vector, top_k=per_keyword_k, chunk_filter=chunk_filter)
+            for text, query_vector in zip(texts, query_vectors)
+        ]
+    else:
+        searches = [
+            query_chunks_by_vector(query_vector, top_k=per_keyword_k, chunk_filter=chunk_filter)
+            for query_vector in query_vectors
+        ]
+    results = await asyncio.gather(*searches)
+
+    hits: Dict[str, List[Tuple[float, Chunk]]] = {}
+    for kw_lower, raw_chunks in zip(unique, results):
+        hits[kw_lower] = [
+            (raw_chunk["distance"], _to_chunk(raw_chunk)) for raw_chunk in _with_duplicate_slides(raw_chunks, scope)
+        ]
+    return hits
+
+def _aggregate_hits(keywords: List[DomainKeyword], hits: Dict[str, List[Tuple[float, Chunk]]]) -> Dict[str, Dict]:
+    """
+    Aggregate the chunks retrieved for the given keywords per document.
     Returns a dict: doc_id -> aggregation info.
     """
-    
     doc_acc: Dict[str, Dict] = {}
     for kw in keywords:
-        q = kw.keyword.strip()
-        if not q:
-            continue
-
-        raw_chunks = await query_similar_chunks_from_keywords(q, top_k=per_keyword_k)
-
-        for raw_chunk in raw_chunks:
-            doc_id = raw_chunk["full_doc_id"]
-            sim = raw_chunk["distance"]
-            chunk_id = raw_chunk["id"]
-            chunk = Chunk(
-                id=chunk_id,
-                doc_id=doc_id,
-                content=raw_chunk["content"],
-                distance=raw_chunk["distance"],
-                slide_number=get_slide_number(chunk_id)
-            )
-
-            if doc_id not in doc_acc:
-                doc_acc[doc_id] = _init_doc_acc(doc_id)
-
-            kw_lower = kw.keyword.lower()
-            _process_chunk(doc_acc, doc_id, kw_lower, sim, chunk)
+        kw_lower = kw.keyword.lower()
+        for sim, chunk in hits.get(kw_lower.strip(), []):
+            if chunk.doc_id not in doc_acc:
+                doc_acc[chunk.doc_id] = _init_doc_acc(chunk.doc_id)
+            _process_chunk(doc_acc, chunk.doc_id, kw_lower, sim, chunk)
     return doc_acc
 
+async def _gather_chunks_per_keyword(
+    keywords: List[DomainKeyword],
+    per_keyword_k: int,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    scope: Optional[SearchScope] = None,
+) -> Dict[str, Dict]:
+    """
+    For each keyword, query similar chunks (vector search, or vector + BM25 search in "hybrid" mode)
+    and aggregate them per document.
+    Returns a dict: doc_id -> aggregation info.
+    """
+    hits = await _retrieve_keyword_hits([kw.keyword for kw in keywords], per_keyword_k, retrieval_mode, scope)
+    return _aggregate_hits(keywords, hits)
+
 # Scoring functions
 
 def _normalize_similarity(sim: float, norm_min: float = 0.7, norm_max: float = 0.9) -> float:
@@ -221,6 +331,35 @@ def _select_top_evidence(evidence: List[Chunk], per_doc_chunk_limit: int) -> Lis
     evidence_sorted = sorted(evidence, key=lambda c: c.distance, reverse=True)
     return evidence_sorted[:per_doc_chunk_limit]
 
+async def _diversify_evidence(
+    top_for_llm: List[Tuple[str, float, List[DomainKeyword], List[Chunk]]],
+    doc_acc: Dict[str, Dict],
+    score_lookup: Dict[str, int],
+    per_doc_chunk_limit: int,
+) -> List[Tuple[str, float, List[DomainKeyword], List[Chunk]]]:
+    """
+    Replace the evidence of the selected documents (top chunks by similarity) with chunks covering their
+    matched keywords and diverse (MMR over the chunk embeddings), see domain/evidence_selection.py.
+    """
+    if EVIDENCE_MMR_LAMBDA >= 1.0:
+        return top_for_llm
+    chunk_ids = [chunk.id for doc_id, _, _, _ in top_for_llm for chunk in doc_acc[doc_id]["evidence"]]
+    vectors = await get_chunk_vectors(chunk_ids)
+
+    diversified = []
+    for doc_id, total_score, matched_keywords, _ in top_for_llm:
+        agg = doc_acc[doc_id]
+        evidence = select_evidence(
+            agg["evidence"],
+            agg["chunk_keywords"],
+            {kw.keyword: score_lookup.get(kw.keyword, 0) for kw in matched_keywords},
+            vectors,
+            per_doc_chunk_limit,
+            mmr_lambda=EVIDENCE_MMR_LAMBDA,
+        )
+        diversified.append((doc_id, total_score, matched_keywords, evidence))
+    return diversified
+
 def _score_and_select_documents(
     doc_acc: Dict[str, Dict],
     score_lookup: Dict[str, int],
@@ -254,15 +393,43 @@ def _score_and_select_documents(
     return scored[:docs_for_llm]
 
 
+def _stage1_matched_documents(
+    top_for_llm: List[Tuple[str, float, List[DomainKeyword], List[Chunk]]],
+    doc_acc: Dict[str, Dict],
+    language_code: str,
+    degraded: bool = False,
+) -> List[MatchedDocument]:
+    """
+    Deterministic result of Stage 1 (documents ordered by score, keywords by weight), with extractive
+    explanations built from the evidence chunks. Used by mode="fast", and when the LLM re-ranking
+    did not finish before the deadline (degraded=True).
+    """
+    matched_docs: List[MatchedDocument] = []
+    for doc_id, _, matched_keywords, _ in top_for_llm:
+        keywords = sorted(
+            matched_keywords,
+            key=lambda kw: (kw.score, doc_acc[doc_id]["per_kw_best_sim"].get(kw.keyword, 0.0)),
+            reverse=True,
+        )
+        explanation = build_extractive_explanation(keywords, doc_acc[doc_id]["per_kw_best_chunk"], language_code)
+        matched_docs.append(
+            MatchedDocument(ao_id=doc_id, explanation=explanation, matched_keywords=keywords, degraded=degraded)
+        )
+    return matched_docs
+
+
 def _prepare_documents_for_llm(
     top_for_llm: List[Tuple[str, float, List[DomainKeyword], List[Chunk]]]
 ) -> List[Document]:
     """
-    Prepare Document objects with only the evidence chunks for LLM input.
+    Prepare Document objects with only the evidence chunks for LLM input: the document profile and its
+    RANKING_EVIDENCE_WITH_PROFILE best chunks, or all its evidence chunks for documents without a profile.
     """
     docs_for_llm_domain: List[Document] = []
     for doc_id, _, _, evidence in top_for_llm:
-        d = Document(ao_id=doc_id, chunks=list(evidence))
+        profile = DocumentProfile.from_dict((get_doc(doc_id) or {}).get("profile"))
+        chunks = list(evidence[:RANKING_EVIDENCE_WITH_PROFILE]) if profile else list(evidence)
+        d = Document(ao_id=doc_id, chunks=chunks, profile=profile)
         docs_for_llm_domain.append(d)
     return docs_for_llm_domain
 
@@ -271,30 +438,44 @@ def _prepare_documents_for_llm(
 
 
 
-async def match_documents_v2(
+async def _resolve_scope(metadata_filter: Optional[MetadataFilter]) -> Optional[SearchScope]:
+    scope = await resolve_scope(metadata_filter)
+    if scope is not None:
+        debug(f"[INFO] Metadata filter {metadata_filter}: {len(scope.doc_ids)} documents, {len(scope.chunk_ids)} chunks")
+    return scope
+
+
+def _deadline_from_ms(deadline_ms: Optional[int]) -> Tuple[int, Optional[float]]:
+    """Deadline in milliseconds (MATCH_DEADLINE_MS by default) and as a time.monotonic() value (None = no deadline)."""
+    deadline_ms = MATCH_DEADLINE_MS if deadline_ms is None else deadline_ms
+    return deadline_ms, (time.monotonic() + deadline_ms / 1000 if deadline_ms > 0 else None)
+
+
+async def _rank_documents(
         keywords: List[DomainKeyword],
+        doc_acc: Dict[str, Dict],
         language_code: str,
         *,
-        per_keyword_k: int = 8,
-        per_doc_chunk_limit: int = 6,
-        docs_for_llm: int = 12,
+        per_doc_chunk_limit: int,
+        docs_for_llm: int,
+        deadline_ms: int,
+        deadline: Optional[float],
+        mode: str,
+        start: float,
         ) -> List[MatchedDocument]:
-    """
-    Second method with a pipeline that will work with a large dataset :
-    Stage 1 (deterministic): gather chunks per keyword, aggregate per document,
-    score docs by weighted best-sim per keyword, and keep only top docs_for_llm.
-    Stage 2 (LLM): ask the LLM to re-rank those few docs and produce explanations.
-    """
-    start = time.time()
+    """Stage 1 scoring of the aggregated chunks, then Stage 2 LLM re-ranking (unless mode="fast" or the deadline is reached)."""
     score_lookup = {k.keyword.lower(): k.score for k in keywords}
 
-    # 1. Gather chunks per keyword and aggregate per document
-    doc_acc = await _gather_chunks_per_keyword(keywords, per_keyword_k)
-
     # 2. Score and select top documents for LLM
     top_for_llm = _score_and_select_documents(doc_acc, score_lookup, per_doc_chunk_limit, docs_for_llm)
 
-    # 3. Prepare Document objects for LLM
+    if mode == "fast":
+        matched_docs = _stage1_matched_documents(top_for_llm, doc_acc, language_code)
+        debug(f"[INFO] Fast matching: {len(matched_docs)} docs in {(time.time() - start) * 1000:.1f}ms")
+        return matched_docs
+
+    # 3. Prepare Document objects for LLM, with diverse evidence covering the matched keywords
+    top_for_llm = await _diversify_evidence(top_for_llm, doc_acc, score_lookup, per_doc_chunk_limit)
     docs_for_llm_domain = _prepare_documents_for_llm(top_for_llm)
 
     # Print Log of the retrieved documents
@@ -305,7 +486,19 @@ async def match_documents_v2(
     )
 
     # 4. Ask LLM to re-rank these few docs + generate explanations and related keywords
-    llm_result = await ask_llm_for_ranked_documents(keywords, docs_for_llm_domain, language_code)
+    llm_call = ask_llm_for_ranked_documents(keywords, docs_for_llm_domain, language_code)
+    if deadline is None:
+        llm_result = await llm_call
+    else:
+        remaining = deadline - time.monotonic() - MATCH_DEADLINE_MARGIN_MS / 1000
+        try:
+            if remaining <= 0:
+                llm_call.close()
+                raise asyncio.TimeoutError
+            llm_result = await asyncio.wait_for(llm_call, timeout=remaining)
+        except asyncio.TimeoutError:
+            debug(f"[WARN] Deadline of {deadline_ms}ms reached, returning the Stage 1 ranking")
+            return _stage1_matched_documents(top_for_llm, doc_acc, language_code, degraded=True)
 
     write_log(
         msg=f"{llm_result}",
@@ -319,4 +512,102 @@ async def match_documents_v2(
     total_chunks = sum(len(v["evidence"]) for v in doc_acc.values()) if doc_acc else 0
     debug(f"[INFO] Deterministic preselection: {len(top_for_llm)} docs sent to LLM, {total_chunks} raw chunks. Completed in {time.time() - start:.2f}s")
 
-    return matched_docs
\ No newline at end of file
+    return matched_docs
+
+
+async def match_documents_v2(
+        keywords: List[DomainKeyword],
+        language_code: str,
+        *,
+        per_keyword_k: int = 8,
+        per_doc_chunk_limit: int = 6,
+        docs_for_llm: int = 12,
+        retrieval_mode: str = RETRIEVAL_MODE,
+        deadline_ms: Optional[int] = None,
+        mode: str = "llm",
+        metadata_filter: Optional[MetadataFilter] = None,
+        ) -> List[MatchedDocument]:
+    """
+    Second method with a pipeline that will work with a large dataset :
+    Stage 1 (deterministic): gather chunks per keyword, aggregate per document,
+    score docs by weighted best-sim per keyword, and keep only top docs_for_llm.
+    Stage 2 (LLM): ask the LLM to re-rank those few docs and produce explanations.
+    If Stage 2 cannot finish within deadline_ms (from the start of the call), the Stage 1
+    ranking is returned with degraded=True.
+    With mode="fast", Stage 2 is skipped: the Stage 1 ranking is returned with extractive explanations.
+    With a metadata_filter, only the documents matching it are searched.
+    Concurrent calls with the same keyword set and options share one computation.
+    """
+    key = (
+        tuple(sorted((kw.keyword.strip().lower(), kw.score) for kw in keywords)),
+        language_code, per_keyword_k, per_doc_chunk_limit, docs_for_llm, retrieval_mode, deadline_ms, mode,
+        metadata_filter,
+    )
+    return await _match_flights.run(key, lambda: _match_documents_v2(
+        keywords, language_code,
+        per_keyword_k=per_keyword_k, per_doc_chunk_limit=per_doc_chunk_limit, docs_for_llm=docs_for_llm,
+        retrieval_mode=retrieval_mode, deadline_ms=deadline_ms, mode=mode, metadata_filter=metadata_filter,
+    ))
+
+
+async def _match_documents_v2(
+        keywords: List[DomainKeyword],
+        language_code: str,
+        *,
+        per_keyword_k: int,
+        per_doc_chunk_limit: int,
+        docs_for_llm: int,
+        retrieval_mode: str,
+        deadline_ms: Optional[int],
+        mode: str,
+        metadata_filter: Optional[MetadataFilter],
+        ) -> List[MatchedDocument]:
+    start = time.time()
+    deadline_ms, deadline = _deadline_from_ms(deadline_ms)
+
+    # 1. Gather chunks per keyword (in the documents matching the filter) and aggregate per document
+    scope = await _resolve_scope(metadata_filter)
+    doc_acc = await _gather_chunks_per_keyword(keywords, per_keyword_k, retrieval_mode, scope)
+
+    return await _rank_documents(
+        keywords, doc_acc, language_code,
+        per_doc_chunk_limit=per_doc_chunk_limit, docs_for_llm=docs_for_llm,
+        deadline_ms=deadline_ms, deadline=deadline, mode=mode, start=start,
+    )
+
+
+async def match_documents_batch(
+        keyword_sets: List[List[DomainKeyword]],
+        language_code: str,
+        *,
+        per_keyword_k: int = 8,
+        per_doc_chunk_limit: int = 6,
+        docs_for_llm: int = 12,
+        retrieval_mode: str = RETRIEVAL_MODE,
+        deadline_ms: Optional[int] = None,
+        mode: str = "llm",
+        metadata_filter: Optional[MetadataFilter] = None,
+        ) -> List[List[MatchedDocument]]:
+    """
+    match_documents_v2 for several keyword sets (the lots of a tender) sharing one retrieval pass:
+    the keywords of all the sets are deduplicated, embedded and searched once, then each set is scored
+    on the shared hits and re-ranked by the LLM, the sets concurrently.
+    The metadata_filter applies to every set.
+    Returns one list of matched documents per keyword set, in the same order.
+    """
+    start = time.time()
+    deadline_ms, deadline = _deadline_from_ms(deadline_ms)
+
+    all_keywords = [kw.keyword for keywords in keyword_sets for kw in keywords]
+    scope = await _resolve_scope(metadata_filter)
+    hits = await _retrieve_keyword_hits(all_keywords, per_keyword_k, retrieval_mode, scope)
+    debug(f"[INFO] Batch matching: {len(keyword_sets)} sets, {len(all_keywords)} keywords, {len(hits)} searched")
+
+    return list(await asyncio.gather(*(
+        _rank_documents(
+            keywords, _aggregate_hits(keywords, hits), language_code,
+            per_doc_chunk_limit=per_doc_chunk_limit, docs_for_llm=docs_for_llm,
+            deadline_ms=deadline_ms, deadline=deadline, mode=mode, start=start,
+        )
+        for keywords in keyword_sets
+    )))
@@ -1,7 +1,7 @@
 #application/query_service.py
 
-from infrastructure.lightrag_engine import init_rag
-from lightrag import QueryParam
+from infrastructure.lightrag_engine import init_rag, tombstone_filter_var
+from infrastructure.embedder import query_embedding_var
 import time
 from infrastructure.logger import debug
 from schemas.ask_response import AskResponse
@@ -9,9 +9,16 @@ from schemas.ask_response import AskResponse
 async def run_rag_query(user_query: str) -> AskResponse:
     start = time.time()
     lightrag = await init_rag()
+    from lightrag import QueryParam
 
     param = QueryParam(mode='hybrid', top_k=15)
-    result = await lightrag.aquery(user_query, param=param)
+    token = tombstone_filter_var.set(True)  # hide the deleted documents not yet compacted
+    query_token = query_embedding_var.set(True)  # the query is embedded with the query prefix
+    try:
+        result = await lightrag.aquery(user_query, param=param)
+    finally:
+        query_embedding_var.reset(query_token)
+        tombstone_filter_var.reset(token)
     debug(f"[INFO] Query complete in {time.time() - start:.2f}s")
 
     answer = result if result else "No relevant answer found."
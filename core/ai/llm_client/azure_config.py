@@ -1,16 +1,22 @@
 #services/azure_config.py
 
 import os
-import asyncio
-from lightrag import LightRAG, QueryParam
-from openai import AzureOpenAI
 
-# 1. Azure OpenAI Setup
+# 1. Azure OpenAI Setup (the client is built on first use to keep the startup fast).
+# Async client, so a call never blocks the event loop. Retries are done by infrastructure/llm_dispatcher.py
 
-client = AzureOpenAI(
-        api_key=os.getenv("OPENAI_API_KEY"),
-        api_version=os.getenv("OPENAI_API_VERSION"),
-        azure_endpoint=os.getenv("OPENAI_API_BASE")
-    )
+_client = None
 
-deployment_name = os.getenv("OPENAI_DEPLOYMENT_NAME")
\ No newline at end of file
+def get_client():
+    global _client
+    if _client is None:
+        from openai import AsyncAzureOpenAI
+        _client = AsyncAzureOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            api_version=os.getenv("OPENAI_API_VERSION"),
+            azure_endpoint=os.getenv("OPENAI_API_BASE"),
+            max_retries=0,
+        )
+    return _client
+
+deployment_name = os.getenv("OPENAI_DEPLOYMENT_NAME")
@@ -1,25 +1,81 @@
 # infrastructure/file_loader.py
 
-import base64
-import fitz  # PyMuPDF
+import os
+import math
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional
 #from io import BytesIO
 from infrastructure.logger import debug, write_log
 
-def extract_text_from_buffer(file_buffer: str) -> Optional[str]:
+# PDFs with at least this many pages are extracted by page ranges in worker processes, in parallel
+# (the text extraction of PyMuPDF holds the GIL). Smaller PDFs are extracted in a thread, off the event loop.
+PARALLEL_EXTRACTION_MIN_PAGES = int(os.getenv("PARALLEL_EXTRACTION_MIN_PAGES", "40"))
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs threads (event loop, log listener) can deadlock the child
+        _pool = ProcessPoolExecutor(EXTRACTION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_extraction_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _page_count(file_bytes: bytes) -> int:
+    import fitz  # PyMuPDF (imported on first use, see infrastructure/warmup.py)
+    with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+        return doc.page_count
+
+
+def _extract_pages(file_bytes: bytes, start: int, end: int) -> str:
+    """Text of the pages [start, end), one page per line block (runs in a worker process for large PDFs)."""
+    import fitz
+    with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+        return "\n".join(doc[i].get_text() for i in range(start, end))
+
+
+async def _extract_in_pool(file_bytes: bytes, page_count: int) -> str:
+    range_size = math.ceil(page_count / EXTRACTION_WORKERS)
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, _extract_pages, file_bytes, start, min(start + range_size, page_count))
+            for start in range(0, page_count, range_size)
+        ))
+    except BrokenProcessPool:
+        shutdown_extraction_pool()  # a worker died: the next extraction starts a new pool
+        raise
+    return "\n".join(parts)
+
+
+async def extract_text_from_bytes(file_bytes: bytes) -> Optional[str]:
+    """Text of a PDF, extracted off the event loop. Returns None if the PDF cannot be read."""
     debug(f"Beginning text extraction...")
     try:
-        # Step 1: decode base64 to bytes
-        file_bytes = base64.b64decode(file_buffer)
+        page_count = await asyncio.to_thread(_page_count, file_bytes)
+        if page_count >= PARALLEL_EXTRACTION_MIN_PAGES and EXTRACTION_WORKERS > 1:
+            all_text = await _extract_in_pool(file_bytes, page_count)
+        else:
+            all_text = await asyncio.to_thread(_extract_pages, file_bytes, 0, page_count)
 
-        # Step 2: open as PDF in memory
-        with fitz.open(stream=file_bytes, filetype="pdf") as doc:
-            all_text = "\n".join(page.get_text() for page in doc)
-        
         write_log(f"Extracted text: {(all_text)}", header="Text Extraction", file_name="text_extraction.log")
-        debug(f"[INFO] Text extraction complete, {len(all_text)} characters extracted.")
-        
+        debug(f"[INFO] Text extraction complete, {page_count} pages, {len(all_text)} characters extracted.")
+
         return all_text
     except Exception as e:
         debug(f"[ERROR] Failed to extract text from file buffer: {e}")
         return None
+
@@ -0,0 +1,88 @@
+# core/utils/json_salvage.py
+#
+# Tolerant parsing of a JSON array answered by an LLM. The answer may be wrapped in markdown fences or prose,
+# be the value of a key of an object ({"documents": [...]}), or be cut in the middle of an element (max_tokens
+# reached). The array is decoded element by element: every element decoded before the cut or the first
+# malformed element is kept, and the result says whether the array was complete.
+
+import re
+import json
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+@dataclass
+class SalvagedArray:
+    items: List[Any] = field(default_factory=list)
+    complete: bool = False  # the closing bracket was reached: no element is missing
+
+
+def strip_code_fences(text: str) -> str:
+    """LLM answer without the markdown fences (```json ... ```) wrapping it, if any."""
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned)
+        cleaned = re.sub(r"\s*```$", "", cleaned)
+    return cleaned
+
+
+def _array_start(text: str, key: Optional[str]) -> int:
+    """Index of the opening bracket of the array, -1 if there is none."""
+    if key is not None:
+        match = re.search(r'"%s"\s*:\s*\[' % re.escape(key), text)
+        if match:
+            return match.end() - 1
+    # First bracket opening an array of objects (not a "[note]" in some prose)
+    match = re.search(r"\[\s*[{\]]", text)
+    return match.start() if match else -1
+
+
+def _skip(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def salvage_json_array(text: Optional[str], key: Optional[str] = None) -> Optional[SalvagedArray]:
+    """
+    Elements of the JSON array in `text` (or of the array under `key` when the answer is an object).
+    Returns None when no array can be found.
+    """
+    if not text:
+        return None
+    cleaned = strip_code_fences(text)
+
+    # Fast path: valid JSON
+    try:
+        result = json.loads(cleaned)
+        if isinstance(result, dict) and key is not None:
+            result = result.get(key)
+        if isinstance(result, list):
+            return SalvagedArray(result, complete=True)
+    except json.JSONDecodeError:
+        pass
+
+    start = _array_start(cleaned, key)
+    if start < 0:
+        return None
+    salvaged = SalvagedArray()
+    pos = start + 1
+    while True:
+        pos = _skip(cleaned, pos)
+        if pos >= len(cleaned):
+            return salvaged  # cut after the last complete element
+        if cleaned[pos] == "]":
+            salvaged.complete = True
+            return salvaged
+        if salvaged.items:
+            if cleaned[pos] != ",":
+                return salvaged  # malformed: keep what was decoded before
+            pos = _skip(cleaned, pos + 1)
+        try:
+            item, pos = _decoder.raw_decode(cleaned, pos)
+        except json.JSONDecodeError:
+            return salvaged  # element cut by max_tokens, or malformed
+        salvaged.items.append(item)
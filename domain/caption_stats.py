@@ -0,0 +1,34 @@
+# domain/caption_stats.py
+
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+@dataclass
+class CaptionStats:
+    """How the slides of a document were captioned."""
+    vision_calls: int = 0     # slides described by the vision LLM
+    vision_requests: int = 0  # requests sent to the vision LLM (several slides per request when batching)
+    vision_seconds: float = 0.0
+    cached_slides: int = 0    # vision captions found in the cache
+    text_slides: int = 0      # slides taken from the PDF text layer (vision call saved)
+    failed_slides: int = 0    # vision captioning failed (slide not ingested, nothing cached)
+    duplicate_slides: int = 0         # near-duplicates of ingested slides, sharing their chunk (nothing stored)
+    duplicate_visual_slides: int = 0  # duplicates that would have been sent to the vision LLM
+
+    def average_vision_seconds(self) -> Optional[float]:
+        """Average vision time per slide."""
+        return self.vision_seconds / self.vision_calls if self.vision_calls else None
+
+    def to_dict(self, average_vision_seconds: Optional[float]) -> dict:
+        """
+        Stats with the estimated time saved by the text and duplicate slides (at the given average vision
+        call duration), and the chunks (vector, text, BM25 entry) not stored thanks to the duplicates.
+        """
+        calls_saved = self.text_slides + self.duplicate_visual_slides
+        seconds_saved = calls_saved * average_vision_seconds if average_vision_seconds else 0.0
+        return {
+            **asdict(self),
+            "vision_calls_saved": calls_saved,
+            "seconds_saved": round(seconds_saved, 2),
+            "chunks_saved": self.duplicate_slides,
+        }
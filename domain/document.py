@@ -3,12 +3,14 @@
 from dataclasses import dataclass, field
 from typing import List, Optional
 from domain.chunk import Chunk
+from domain.document_profile import DocumentProfile
 
 @dataclass
 class Document:
     ao_id: str
     chunks: List[Chunk] = field(default_factory=list)
     text: Optional[str] = None
+    profile: Optional[DocumentProfile] = None  # built at ingestion, replaces most of the chunks in the ranking prompt
 
     def add_chunk(self, chunk: Chunk) -> None:
         self.chunks.append(chunk)
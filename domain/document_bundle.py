@@ -0,0 +1,70 @@
+# domain/document_bundle.py
+# Merging of the texts of a document bundle (e.g. the RC, CCTP, CCAP and annexes of a tender) into one text,
+# analyzed by a single summary call and a single keyword call:
+# - the lines found in several documents, or repeated in one document (legal boilerplate, page headers),
+#   are kept once, at their first occurrence in the bundle order
+# - the merged text is cut to a token budget, shared between the documents: small documents are kept whole,
+#   the rest of the budget is split evenly between the larger ones
+
+import os
+from dataclasses import dataclass
+from typing import List
+
+# Shorter lines (titles, numbers, "Article 3") are never removed as boilerplate
+BOILERPLATE_MIN_LINE_CHARS = int(os.getenv("BOILERPLATE_MIN_LINE_CHARS", "40"))
+
+
+@dataclass
+class BundleDocument:
+    file_name: str
+    text: str
+    extracted_chars: int
+    boilerplate_chars: int = 0  # removed lines already seen earlier in the bundle
+    truncated_chars: int = 0    # cut to fit the token budget
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def _header(document: BundleDocument) -> str:
+    return f"--- DOCUMENT: {document.file_name} ---\n"
+
+
+def _line_key(line: str) -> str:
+    return " ".join(line.lower().split())
+
+
+def remove_shared_boilerplate(documents: List[BundleDocument]) -> None:
+    """Keeps each long line once across the bundle."""
+    seen = set()
+    for document in documents:
+        kept = []
+        for line in document.text.splitlines():
+            key = _line_key(line)
+            if len(key) >= BOILERPLATE_MIN_LINE_CHARS:
+                if key in seen:
+                    document.boilerplate_chars += len(line) + 1
+                    continue
+                seen.add(key)
+            kept.append(line)
+        document.text = "\n".join(kept)
+
+
+def fit_to_budget(documents: List[BundleDocument], token_budget: int) -> None:
+    """Cuts the documents (at a line break) so that the merged text fits in token_budget."""
+    remaining = token_budget * 4 - sum(len(_header(d)) + 2 for d in documents)
+    by_size = sorted(documents, key=lambda d: len(d.text))
+    for i, document in enumerate(by_size):
+        share = max(0, remaining // (len(by_size) - i))
+        if len(document.text) > share:
+            cut = document.text.rfind("\n", 0, share)
+            if cut < share // 2:  # very long lines: cut inside the line rather than losing most of the share
+                cut = share
+            document.truncated_chars = len(document.text) - cut
+            document.text = document.text[:cut]
+        remaining -= len(document.text)
+
+
+def merge_texts(documents: List[BundleDocument]) -> str:
+    return "\n\n".join(_header(d) + d.text for d in documents)
@@ -1,5 +1,38 @@
-from infrastructure.lightrag_engine import init_rag
+from typing import Dict, List
+from infrastructure.lightrag_engine import init_rag, deferred_persistence
+from infrastructure.doc_registry import remove_doc, remove_docs
+from infrastructure.bm25_index import unindex_doc, unindex_docs
+from infrastructure.logger import debug
+from domain.document_ingestor import shared_chunk_contents, promote_duplicates
 
 async def remove_doc_from_rag(doc_id: str) -> bool:
     lightrag = await init_rag()
-    return await lightrag.adelete_by_doc_id(doc_id)
\ No newline at end of file
+    shared = await shared_chunk_contents([doc_id])  # slides of other documents pointing to its chunks
+    result = await lightrag.adelete_by_doc_id(doc_id)
+    if result.status == "success":
+        remove_doc(doc_id)
+        await unindex_doc(doc_id)
+        await promote_duplicates(shared)
+    return result
+
+async def remove_docs_from_rag(doc_ids: List[str]) -> Dict[str, str]:
+    """
+    Delete several documents from LightRAG, writing the storages, the registry and the BM25 index
+    once for the whole batch. Returns the deletion status of each document.
+    """
+    statuses = {}
+    shared = {doc_id: await shared_chunk_contents([doc_id]) for doc_id in doc_ids}
+    async with deferred_persistence() as lightrag:
+        for doc_id in doc_ids:
+            try:
+                statuses[doc_id] = (await lightrag.adelete_by_doc_id(doc_id)).status
+            except Exception as e:
+                debug(f"[ERROR] Failed to delete {doc_id}: {e}")
+                statuses[doc_id] = "failed"
+
+    gone = [doc_id for doc_id, status in statuses.items() if status in ("success", "not_found")]
+    remove_docs(gone)
+    await unindex_docs(gone)
+    # Slides of the remaining documents pointing to a deleted chunk get their own chunk back
+    await promote_duplicates({chunk_id: content for doc_id in gone for chunk_id, content in shared[doc_id].items()})
+    return statuses
@@ -1,117 +1,326 @@
 # domain/document_ingestor.py
-import fitz
-from PIL import Image
-from io import BytesIO
-import base64
-import json
+# fitz (PyMuPDF) is imported inside the functions: it is only needed when ingesting
 import os
-import hashlib
-from infrastructure.azure_llm import azure_llm
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
 from infrastructure.lightrag_engine import init_rag  
 from infrastructure.logger import debug, write_log
+from infrastructure.doc_registry import get_doc, update_doc
+from infrastructure.chunk_store import compute_chunk_id, upsert_chunks, delete_chunks, update_document_record, persist
+from infrastructure.bm25_index import index_chunks, unindex_chunks
+from infrastructure.graph_backfill import enqueue_graph_backfill, PENDING, COMPLETE
+from infrastructure.profile_engine import build_document_profile
+from infrastructure.duplicate_index import SLIDE_DEDUP, find_canonical, get_aliases_of
+from infrastructure.tombstones import get_tombstoned_ids
+from infrastructure.corpus_sync import corpus_write
+from domain.slide_diff import SlideDiff
+from domain.document_metadata import DocumentMetadata
+from domain.caption_stats import CaptionStats
+from domain.slide_fingerprint import SlideFingerprint, slide_fingerprint, is_near_duplicate
+from domain.slide_captioner import (
+    PendingSlide, render_page, prepare_slide, caption_pending_slides, report_caption_stats, is_visual_slide
+)
 
 SPLIT_MARKER = "====SPLIT===="
 CUSTOM_SEPARATOR = f"\n\n{SPLIT_MARKER}\n\n"
 
-slide_analysis_prompt = """ You are analyzing a slide from a professional Response to a Call for Tenders presentation.
+# How a new document is written into LightRAG:
+# - "full"         : lightrag.ainsert (chunks, vectors and knowledge graph extraction before returning)
+# - "vector_first" : chunks and vectors are written right away (the document is matchable within seconds),
+#                    the knowledge graph used by /ask is extracted later in the background
+INGESTION_MODE = os.getenv("INGESTION_MODE", "full").lower()
 
-Please return two sections:
+def build_slide_content(slide_number: int, file_name: str, summary: str) -> str:
+    return f"This is slide {slide_number} from the document '{file_name}'.\n\n{summary.strip()}"
 
----
+def slide_caption(content: str) -> str:
+    """Caption of a slide chunk: its content without the header added by build_slide_content."""
+    header, separator, caption = content.partition("\n\n")
+    return caption.strip() if separator and header.startswith("This is slide ") else content.strip()
 
-### [Extracted Text]
-Extract all visible text exactly as it appears on the slide.  
-Preserve the wording, line breaks, bullet points, and labels.  
-Do not summarize or paraphrase — just list what is visible.
-
----
-
-### [Visual Summary]
-Describe only the visual elements that contribute to the **meaning, structure, or interpretation** of the slide.  
-Ignore purely decorative features (e.g., colors, white space, logos, branding).  
-Focus only on layout, icons, diagrams, or formatting that affect how the content is understood.
+def _find_duplicate(
+        fingerprint: SlideFingerprint, local: Dict[int, SlideFingerprint], doc_id: str
+        ) -> Optional[Union[str, int]]:
+    """
+    Chunk id of an ingested near-duplicate of the slide (in another document), otherwise the number of a
+    near-duplicate slide met earlier in the same PDF, otherwise None.
+    """
+    canonical = find_canonical(fingerprint, exclude_doc_id=doc_id)
+    if canonical is not None:
+        return canonical
+    return next((n for n, other in local.items() if is_near_duplicate(fingerprint, other)), None)
 
-Do not add interpretations, summaries, or opinions. Just describe the visual design.
-"""
+def _resolve_local_duplicates(duplicates: Dict[int, Union[str, int]], captions: Dict[int, str], file_name: str,
+                              stats: CaptionStats) -> None:
+    """Point the duplicates of a slide of the same PDF to its chunk (dropped if its captioning failed)."""
+    for slide_number, target in list(duplicates.items()):
+        if isinstance(target, str):
+            continue
+        if target in captions:
+            duplicates[slide_number] = compute_chunk_id(build_slide_content(target, file_name, captions[target]))
+        elif isinstance(duplicates.get(target), str):
+            duplicates[slide_number] = duplicates[target]  # the slide turned out to share an ingested chunk
+        else:
+            debug(f"[WARN] Slide {slide_number} is a duplicate of slide {target}, whose captioning failed")
+            del duplicates[slide_number]
+            stats.duplicate_slides -= 1
+            stats.failed_slides += 1
 
-def pdf_slide_to_base64(pdf_path, page_number):
-    doc = fitz.open(pdf_path)
-    page = doc.load_page(page_number)
-    pix = page.get_pixmap(dpi=200)
-    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-    buffered = BytesIO()
-    img.save(buffered, format="JPEG")
-    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return img_str
+def _duplicate_entry(slide_number: int, page_hash: str, chunk_id: str, fingerprint: Optional[SlideFingerprint]) -> dict:
+    """Manifest entry of a slide sharing the chunk of a near-duplicate slide (no chunk of its own)."""
+    return {
+        "slide": slide_number,
+        "hash": page_hash,
+        "chunk_id": None,
+        "order": None,
+        "duplicate_of": chunk_id,
+        "fingerprint": fingerprint.to_dict() if fingerprint else None,
+    }
 
-def get_cache_key(doc_id, slide_number):
-    key = f"{doc_id}_slide_{slide_number}"
-    return hashlib.md5(key.encode()).hexdigest()
+async def _rebuild_document_record(doc_id: str, file_name: str, slides: List[dict], new_contents: Dict[str, str]) -> List[str]:
+    """
+    Rewrite the document content (full_docs, doc_status) from its stored chunks and the new ones
+    (chunk id -> content). Returns the chunk contents in slide order.
+    """
+    lightrag = await init_rag()
+    # Sorted by slide number: the chunk_order_index of a chunk written by LightRAG (full ingestion mode) is its
+    # position among the chunks of the document, that of a chunk written by chunk_store is its slide number - 1
+    own = sorted((s for s in slides if s["chunk_id"]), key=lambda s: s["slide"])
+    kept_ids = [s["chunk_id"] for s in own if s["chunk_id"] not in new_contents]
+    kept = await lightrag.text_chunks.get_by_ids(kept_ids)
+    contents = {chunk_id: c["content"] for chunk_id, c in zip(kept_ids, kept) if c}
+    contents.update(new_contents)
+    ordered_ids = [s["chunk_id"] for s in own if s["chunk_id"] in contents]
+    joined_text = CUSTOM_SEPARATOR.join(contents[chunk_id] for chunk_id in ordered_ids)
+    await update_document_record(doc_id, file_name, joined_text, ordered_ids)
+    return [contents[chunk_id] for chunk_id in ordered_ids]
 
-def get_cache_path(cache_dir, key):
-    return os.path.join(cache_dir, f"{key}.json")
+async def refresh_document_profile(doc_id: str, file_name: str) -> bool:
+    """
+    Build the profile of a document again from its stored content. The LLM call runs without the write
+    access, which is taken only to store the profile, unless the document changed in the meantime
+    (the previous profile is kept if the call fails). Returns whether the profile was stored.
+    """
+    entry = get_doc(doc_id)
+    lightrag = await init_rag()
+    record = await lightrag.full_docs.get_by_id(doc_id)
+    if entry is None or not record or not record.get("content"):
+        return False
+    contents = [part.strip() for part in record["content"].split(SPLIT_MARKER) if part.strip()]
+    profile = await build_document_profile(file_name, contents)
+    if profile is None:
+        return False
+    async with corpus_write():
+        current = get_doc(doc_id)
+        if current is None or current.get("slides") != entry.get("slides"):
+            return False  # deleted or updated again: that write builds its own profile
+        update_doc(doc_id, profile=profile.to_dict())
+    return True
 
-# Send image to GPT-4o for captioning/summary
-async def describe_slide_cached(
-        image_base64: str,
-        slide_number: int,
-        doc_id: str = None,
-        use_cache: bool = True,
-        cache_dir="./gpt_cache"
-        ) -> str:
+async def promote_duplicates(contents: Dict[str, str]) -> int:
     """
-    Describe a slide image with optional caching.
-    - If use_cache=True and doc_id is provided, results are cached.
-    - If use_cache=False or no doc_id, always call the LLM without cache.
+    The given shared chunks (chunk id -> content) are being removed (document deleted, slide changed):
+    for each of them, the first slide still pointing to it gets its own chunk (built from the same caption,
+    no LLM call) and the other slides now share that one. Returns the number of chunks written.
     """
+    # The documents deleted but not yet compacted keep pointing to the removed chunk until they are removed
+    aliases = get_aliases_of(contents, get_tombstoned_ids())
+    promoted: Dict[str, Dict[int, str]] = {}  # doc_id -> slide number -> content of its new chunk
+    repointed: Dict[str, Dict[int, str]] = {}  # doc_id -> slide number -> new shared chunk id
+    for chunk_id, slides in aliases.items():
+        first = slides[0]
+        content = build_slide_content(first.slide, first.file_name, slide_caption(contents[chunk_id]))
+        promoted.setdefault(first.doc_id, {})[first.slide] = content
+        for alias in slides[1:]:
+            repointed.setdefault(alias.doc_id, {})[alias.slide] = compute_chunk_id(content)
 
-    path = None
+    written = 0
+    for doc_id in list(promoted) + [d for d in repointed if d not in promoted]:
+        entry = get_doc(doc_id)
+        if entry is None:
+            continue
+        own = promoted.get(doc_id, {})
+        targets = repointed.get(doc_id, {})
+        slides = []
+        for slide in entry["slides"]:
+            if slide["slide"] in own:
+                slide = {k: v for k, v in slide.items() if k != "duplicate_of"}
+                slide.update(chunk_id=compute_chunk_id(own[slide["slide"]]), order=slide["slide"] - 1)
+            elif slide["slide"] in targets:
+                slide = {**slide, "duplicate_of": targets[slide["slide"]]}
+            slides.append(slide)
+        if own:
+            file_name = entry.get("file_name", "")
+            chunk_ids = await upsert_chunks(doc_id, file_name, {n - 1: content for n, content in own.items()})
+            await index_chunks({
+                compute_chunk_id(content): {"content": content.strip(), "full_doc_id": doc_id} for content in own.values()
+            })
+            await _rebuild_document_record(
+                doc_id, file_name, slides, {compute_chunk_id(content): content.strip() for content in own.values()}
+            )
+            written += len(chunk_ids)
+        update_doc(doc_id, slides=slides)
+        if own:
+            await enqueue_graph_backfill(doc_id, chunk_ids)
+    if written:
+        await persist()
+        debug(f"[INFO] {written} shared slides got their own chunk back")
+    return written
 
-    if use_cache and doc_id:
-        os.makedirs(cache_dir, exist_ok=True)
-        key = get_cache_key(doc_id, slide_number)
-        path = get_cache_path(cache_dir, key)
+async def shared_chunk_contents_of(chunk_ids: List[str], excluded_doc_ids=()) -> Dict[str, str]:
+    """Content of the given chunks that are shared with other slides (outside excluded_doc_ids)."""
+    shared = list(get_aliases_of(chunk_ids, excluded_doc_ids))
+    if not shared:
+        return {}
+    lightrag = await init_rag()
+    records = await lightrag.text_chunks.get_by_ids(shared)
+    return {chunk_id: record["content"] for chunk_id, record in zip(shared, records) if record}
 
-        # Return cached description if available
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)["description"]
-    try:
-        response = await azure_llm(slide_analysis_prompt, image_data=image_base64)
-        # Save the response to cache
-        if use_cache and doc_id and path:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump({"description": response}, f)
+async def shared_chunk_contents(doc_ids: List[str]) -> Dict[str, str]:
+    """Content of the chunks of the given documents shared with slides of other documents."""
+    owned = [
+        slide["chunk_id"]
+        for doc_id in doc_ids
+        for slide in (get_doc(doc_id) or {}).get("slides", [])
+        if slide.get("chunk_id")
+    ]
+    return await shared_chunk_contents_of(owned, doc_ids)
 
-    except Exception as e:
-        debug(f"[ERROR] Failed to describe slide {slide_number} (doc={doc_id}): {e}")
-        response = f"ERROR: LLM failed - {e}"
+@dataclass
+class PreparedSlides:
+    """Slides of a PDF rendered, fingerprinted and captioned before the write access is taken."""
+    total_pages: int
+    hashes: Dict[int, str] = field(default_factory=dict)
+    captions: Dict[int, str] = field(default_factory=dict)
+    fingerprints: Dict[int, SlideFingerprint] = field(default_factory=dict)
+    duplicates: Dict[int, Union[str, int]] = field(default_factory=dict)  # chunk id (or slide number) it shares
+    stats: CaptionStats = field(default_factory=CaptionStats)
+
+async def prepare_pdf(pdf_path, doc_id) -> PreparedSlides:
+    """
+    Render every slide, caption it from its text layer / the cache, or with the vision LLM (several slides
+    per request). No storage is written: this runs without the write access. Near-duplicates of an ingested
+    slide are not captioned; they are checked again by ingest_pdf_into_rag under the write access.
+    """
+    import fitz
+    pending = []
+    with fitz.open(pdf_path) as doc:
+        prepared = PreparedSlides(total_pages=len(doc))
+        stats, fingerprints, duplicates = prepared.stats, prepared.fingerprints, prepared.duplicates
+        for idx, page in enumerate(doc):
+            slide_number = idx + 1
+            try:
+                pix, prepared.hashes[slide_number] = render_page(page)
+                if SLIDE_DEDUP:
+                    local = {n: fp for n, fp in fingerprints.items() if n not in duplicates}
+                    fingerprints[slide_number] = slide_fingerprint(page, pix)
+                    duplicate = _find_duplicate(fingerprints[slide_number], local, doc_id)
+                    if duplicate is not None:
+                        duplicates[slide_number] = duplicate
+                        stats.duplicate_slides += 1
+                        stats.duplicate_visual_slides += is_visual_slide(page)
+                        continue
+                caption = prepare_slide(page, pix, prepared.hashes[slide_number], slide_number, doc_id, stats)
+            except Exception as e:
+                debug(f"[ERROR] Failed to process slide {slide_number} (doc={doc_id}): {e}")
+                continue  # skip this slide but continue others
+            if isinstance(caption, PendingSlide):
+                pending.append(caption)
+            else:
+                prepared.captions[slide_number] = caption
+    prepared.captions.update(await caption_pending_slides(pending, doc_id, stats))
+    return prepared
 
-    return response
+async def _caption_slides(pdf_path, slide_numbers: List[int], hashes: Dict[int, str], doc_id: str,
+                          stats: CaptionStats) -> Dict[int, str]:
+    """Caption the given slides of the PDF (slides found to be duplicates whose canonical chunk is gone)."""
+    import fitz
+    captions, pending = {}, []
+    with fitz.open(pdf_path) as doc:
+        for slide_number in slide_numbers:
+            page = doc[slide_number - 1]
+            try:
+                pix, _ = render_page(page)
+                caption = prepare_slide(page, pix, hashes[slide_number], slide_number, doc_id, stats)
+            except Exception as e:
+                debug(f"[ERROR] Failed to process slide {slide_number} (doc={doc_id}): {e}")
+                continue
+            if isinstance(caption, PendingSlide):
+                pending.append(caption)
+            else:
+                captions[slide_number] = caption
+    captions.update(await caption_pending_slides(pending, doc_id, stats))
+    return captions
 
-async def ingest_pdf_into_rag(pdf_path, doc_id, file_name) -> bool:
+def _recheck_duplicates(prepared: PreparedSlides, doc_id: str) -> List[int]:
     """
-    Try to ingest a PDF into LightRAG.
+    Under the write access, look up the near-duplicates of the slides again: a document written since
+    prepare_pdf may have added a canonical slide, or removed one. Returns the slides whose canonical chunk
+    is gone, to be captioned now.
+    """
+    missing = []
+    for slide_number, fingerprint in sorted(prepared.fingerprints.items()):
+        if isinstance(prepared.duplicates.get(slide_number), int):
+            continue  # duplicate of a slide of this PDF
+        canonical = find_canonical(fingerprint, exclude_doc_id=doc_id)
+        if canonical is not None:
+            if prepared.captions.pop(slide_number, None) is not None:
+                prepared.stats.duplicate_slides += 1
+            prepared.duplicates[slide_number] = canonical
+        elif slide_number in prepared.duplicates:
+            del prepared.duplicates[slide_number]
+            prepared.stats.duplicate_slides -= 1
+            missing.append(slide_number)
+    return missing
+
+async def ingest_pdf_into_rag(pdf_path, doc_id, file_name, metadata: Optional[DocumentMetadata] = None,
+                              prepared: Optional[PreparedSlides] = None) -> bool:
+    """
+    Try to ingest a PDF into LightRAG, with its metadata (client, sector, year, language) if given.
+    Call under corpus_write(), with the slides prepared beforehand by prepare_pdf (without the write
+    access) when possible; otherwise they are prepared here.
     Return True if it succeded, False otherwise.
     """
     try:
         lightrag = await init_rag()
+        if prepared is None:
+            prepared = await prepare_pdf(pdf_path, doc_id)
+        total_pages, stats = prepared.total_pages, prepared.stats
+        captions, hashes = prepared.captions, prepared.hashes
+        fingerprints, duplicates = prepared.fingerprints, prepared.duplicates
         chunks = []
+        slides = []  # manifest of the ingested slides, used by update_pdf_in_rag
 
-        with fitz.open(pdf_path) as doc:
-            total_pages = len(doc)
-            for idx, _ in enumerate(doc):
-                slide_number = idx + 1
-                try:
-                    img_b64 = pdf_slide_to_base64(pdf_path, idx)
-                    summary = await describe_slide_cached(img_b64, slide_number, doc_id)
-                except Exception as e:
-                    debug(f"[ERROR] Failed to process slide {slide_number} (doc={doc_id}): {e}")
-                    continue  # skip this slide but continue others
-                full_content = (
-                    f"This is slide {slide_number} from the document '{file_name}'.\n\n{summary.strip()}"
-                )
-                chunks.append(full_content)
+        if SLIDE_DEDUP:
+            missing = _recheck_duplicates(prepared, doc_id)
+            if missing:
+                captions.update(await _caption_slides(pdf_path, missing, hashes, doc_id, stats))
+        _resolve_local_duplicates(duplicates, captions, file_name, stats)
+        if duplicates and not captions:
+            # Every slide is a duplicate: the first one gets its own chunk (a document keeps at least one)
+            first = min(duplicates)
+            shared = await lightrag.text_chunks.get_by_id(duplicates.pop(first))
+            if shared:
+                captions[first] = slide_caption(shared["content"])
+                stats.duplicate_slides -= 1
+
+        for slide_number in sorted(set(captions) | set(duplicates)):
+            fingerprint = fingerprints.get(slide_number)
+            if slide_number in duplicates:
+                slides.append(_duplicate_entry(slide_number, hashes[slide_number], duplicates[slide_number], fingerprint))
+                continue
+            full_content = build_slide_content(slide_number, file_name, captions[slide_number])
+            slides.append({
+                "slide": slide_number,
+                "hash": hashes[slide_number],
+                "chunk_id": compute_chunk_id(full_content),
+                # chunk_order_index: given by LightRAG (position among the chunks), or the slide number - 1
+                "order": slide_number - 1 if INGESTION_MODE == "vector_first" else len(chunks),
+                "fingerprint": fingerprint.to_dict() if fingerprint else None,
+            })
+            chunks.append(full_content)
+
+        own_slides = [s for s in slides if s["chunk_id"]]  # in the order of chunks
 
         # Case where no chunks are created
         if not chunks:
@@ -128,20 +337,189 @@ async def ingest_pdf_into_rag(pdf_path, doc_id, file_name) -> bool:
         )
 
         try:
-            await lightrag.ainsert(
-                joined_text,
-                split_by_character=SPLIT_MARKER,
-                split_by_character_only=True,
-                ids=[doc_id],
-                file_paths=[file_name]
-            )
+            if INGESTION_MODE == "vector_first":
+                chunk_ids = await upsert_chunks(
+                    doc_id, file_name, {s["order"]: content for s, content in zip(own_slides, chunks)}
+                )
+                await update_document_record(doc_id, file_name, joined_text, chunk_ids)
+                await persist()
+            else:
+                await lightrag.ainsert(
+                    joined_text,
+                    split_by_character=SPLIT_MARKER,
+                    split_by_character_only=True,
+                    ids=[doc_id],
+                    file_paths=[file_name]
+                )
         except Exception as e:
             debug(f"❌ Failed inserting document {doc_id} into LightRAG: {e}")
             return False
 
+        await index_chunks({
+            compute_chunk_id(content): {"content": content.strip(), "full_doc_id": doc_id} for content in chunks
+        })
+        # The profile used by the /match ranking is built by the caller, once the write access is released
+        update_doc(
+            doc_id, file_name=file_name, slides=slides, caption_stats=report_caption_stats(doc_id, stats),
+            graph_status=PENDING if INGESTION_MODE == "vector_first" else COMPLETE, graph_pending_chunks=[],
+            **({"metadata": metadata.to_dict()} if metadata is not None else {}),
+        )
+        if INGESTION_MODE == "vector_first":
+            await enqueue_graph_backfill(doc_id)
         debug(f"Ingested {total_pages} slides from '{doc_id}' into LightRAG.")
         return True
 
     except Exception as e:
         debug(f"❌ Unexpected error while ingesting {pdf_path}: {e}")
-        return False
\ No newline at end of file
+        return False
+
+async def update_pdf_in_rag(pdf_path, doc_id, file_name) -> Optional[SlideDiff]:
+    """
+    Update an already ingested document with a new version of its PDF.
+    Each rendered page is hashed and compared with the slide manifest of the document: only the added
+    or changed slides are captioned and embedded, the chunks of removed or changed slides are deleted,
+    and unchanged slides keep their chunk, vector and chunk_order_index.
+    Documents without a manifest (ingested before manifests existed) are fully re-ingested.
+    Return the SlideDiff, or None if the update failed.
+    """
+    import fitz
+    try:
+        lightrag = await init_rag()
+        entry = get_doc(doc_id)
+
+        if not entry or "slides" not in entry:
+            debug(f"[INFO] No slide manifest for {doc_id}, full re-ingestion")
+            if await lightrag.doc_status.get_by_id(doc_id):
+                await lightrag.adelete_by_doc_id(doc_id)
+            if not await ingest_pdf_into_rag(pdf_path, doc_id, file_name):
+                return None
+            slides = get_doc(doc_id)["slides"]
+            return SlideDiff(added=[s["slide"] for s in slides], full_reingest=True)
+
+        old_slides = {s["slide"]: s for s in entry["slides"]}
+        same_name = entry.get("file_name") == file_name  # the file name is part of every chunk
+        # Old slides by page hash: a slide moved by an insertion or a removal keeps its chunk
+        old_by_hash: Dict[str, List[int]] = {}
+        for n in sorted(old_slides):
+            old_by_hash.setdefault(old_slides[n]["hash"], []).append(n)
+        kept = set()  # old slide numbers whose entry (and chunk) is kept, at the same or another number
+        diff = SlideDiff()
+        stats = CaptionStats()
+        slides = []
+        new_chunks = {}  # chunk_order_index -> content
+        captions, hashes, pending = {}, {}, []
+        fingerprints, duplicates = {}, {}
+
+        with fitz.open(pdf_path) as doc:
+            total_pages = len(doc)
+            for idx, page in enumerate(doc):
+                slide_number = idx + 1
+                try:
+                    pix, page_hash = render_page(page)
+                    matches = [n for n in old_by_hash.get(page_hash, []) if n not in kept] if same_name else []
+                    if matches:
+                        # Same slide number first, otherwise a moved slide: only its manifest entry is
+                        # renumbered (its chunk, with the header of its previous number, is kept)
+                        previous = slide_number if slide_number in matches else matches[0]
+                        kept.add(previous)
+                        if previous == slide_number:
+                            diff.unchanged.append(slide_number)
+                            slides.append(old_slides[previous])
+                        else:
+                            diff.moved.append(slide_number)
+                            slides.append({**old_slides[previous], "slide": slide_number})
+                        continue
+                    hashes[slide_number] = page_hash
+                    if SLIDE_DEDUP:
+                        local = {n: fp for n, fp in fingerprints.items() if n not in duplicates}
+                        fingerprints[slide_number] = slide_fingerprint(page, pix)
+                        duplicate = _find_duplicate(fingerprints[slide_number], local, doc_id)
+                        if duplicate is not None:
+                            duplicates[slide_number] = duplicate
+                            stats.duplicate_slides += 1
+                            stats.duplicate_visual_slides += is_visual_slide(page)
+                            continue
+                    caption = prepare_slide(page, pix, page_hash, slide_number, doc_id, stats)
+                except Exception as e:
+                    debug(f"[ERROR] Failed to process slide {slide_number} (doc={doc_id}): {e}")
+                    # Same as a failed captioning: the slide keeps its previous version (and chunk), and the
+                    # next update retries it
+                    hashes.pop(slide_number, None)
+                    fingerprints.pop(slide_number, None)
+                    diff.failed.append(slide_number)
+                    continue
+                if isinstance(caption, PendingSlide):
+                    pending.append(caption)
+                else:
+                    captions[slide_number] = caption
+
+        captions.update(await caption_pending_slides(pending, doc_id, stats))
+        _resolve_local_duplicates(duplicates, captions, file_name, stats)
+
+        # Slides whose captioning failed keep their previous version (and hash: the next update retries them),
+        # unless it moved to another number
+        for slide_number in sorted(n for n in hashes if n not in captions and n not in duplicates):
+            diff.failed.append(slide_number)
+        diff.failed.sort()
+        for slide_number in diff.failed:
+            if slide_number in old_slides and slide_number not in kept:
+                kept.add(slide_number)
+                slides.append(old_slides[slide_number])
+
+        for slide_number in sorted(set(captions) | set(duplicates)):
+            replaced = slide_number in old_slides and slide_number not in kept
+            (diff.changed if replaced else diff.added).append(slide_number)
+            fingerprint = fingerprints.get(slide_number)
+            if slide_number in duplicates:
+                slides.append(_duplicate_entry(slide_number, hashes[slide_number], duplicates[slide_number], fingerprint))
+                continue
+            full_content = build_slide_content(slide_number, file_name, captions[slide_number])
+            order = slide_number - 1
+            new_chunks[order] = full_content
+            slides.append({
+                "slide": slide_number,
+                "hash": hashes[slide_number],
+                "chunk_id": compute_chunk_id(full_content),
+                "order": order,
+                "fingerprint": fingerprint.to_dict() if fingerprint else None,
+            })
+
+        diff.removed = sorted(n for n in old_slides if n not in kept and n not in diff.changed)
+        if not diff.has_changes():
+            debug(f"[INFO] Document {doc_id} is unchanged")
+            return diff
+
+        # Remove the chunks of the removed / changed slides, then embed only the new ones
+        stale_ids = [old_slides[n]["chunk_id"] for n in diff.removed + diff.changed if old_slides[n]["chunk_id"]]
+        stale_shared = await shared_chunk_contents_of(stale_ids)
+        await delete_chunks(stale_ids)
+        await upsert_chunks(doc_id, file_name, new_chunks)
+        await unindex_chunks(stale_ids)
+        await index_chunks({
+            compute_chunk_id(content): {"content": content.strip(), "full_doc_id": doc_id}
+            for content in new_chunks.values()
+        })
+
+        # Rebuild the document content from the stored unchanged chunks and the new ones
+        await _rebuild_document_record(
+            doc_id, file_name, slides,
+            {compute_chunk_id(content): content.strip() for content in new_chunks.values()},
+        )
+        await persist()
+
+        # The content changed: the profile is built again by the caller, once the write access is released
+        update_doc(doc_id, file_name=file_name, slides=slides, caption_stats=report_caption_stats(doc_id, stats))
+        # Slides (of other documents, or unchanged ones of this one) sharing a removed chunk get it back
+        await promote_duplicates(stale_shared)
+        # The knowledge graph of the new slides is extracted in the background
+        if new_chunks:
+            await enqueue_graph_backfill(doc_id, [compute_chunk_id(content) for content in new_chunks.values()])
+        debug(
+            f"Updated '{doc_id}': {len(diff.added)} added, {len(diff.changed)} changed, "
+            f"{len(diff.removed)} removed, {len(diff.moved)} moved, {len(diff.unchanged)} unchanged slides."
+        )
+        return diff
+
+    except Exception as e:
+        debug(f"❌ Unexpected error while updating {doc_id} from {pdf_path}: {e}")
+        return None
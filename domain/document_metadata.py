@@ -0,0 +1,80 @@
+# domain/document_metadata.py
+# Descriptive metadata of an ingested document (client, sector, year, language), given when the document
+# is added and stored in the document registry, and the filters of a /match request on it.
+# Text values are compared case-insensitively.
+
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Tuple
+
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip()
+    return value or None
+
+
+def _normalize(value: Optional[str]) -> Optional[str]:
+    value = _clean(value)
+    return value.lower() if value else None
+
+
+@dataclass(frozen=True)
+class DocumentMetadata:
+    client: Optional[str] = None
+    sector: Optional[str] = None
+    year: Optional[int] = None
+    language: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "DocumentMetadata":
+        data = data or {}
+        year = data.get("year")
+        return cls(
+            client=_clean(data.get("client")),
+            sector=_clean(data.get("sector")),
+            year=int(year) if year is not None else None,
+            language=_clean(data.get("language")),
+        )
+
+
+@dataclass(frozen=True)
+class MetadataFilter:
+    """Restriction of a search to the documents whose metadata match every given field."""
+    clients: Tuple[str, ...] = ()
+    sectors: Tuple[str, ...] = ()
+    languages: Tuple[str, ...] = ()
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+
+    @classmethod
+    def create(
+            cls,
+            clients: Optional[List[str]] = None,
+            sectors: Optional[List[str]] = None,
+            languages: Optional[List[str]] = None,
+            year_min: Optional[int] = None,
+            year_max: Optional[int] = None,
+            ) -> "MetadataFilter":
+        """Filter with normalized (lowercase, sorted) values, usable as a cache key."""
+        def values(items):
+            return tuple(sorted({v for v in map(_normalize, items or []) if v}))
+        return cls(values(clients), values(sectors), values(languages), year_min, year_max)
+
+    def is_empty(self) -> bool:
+        return not (self.clients or self.sectors or self.languages) and self.year_min is None and self.year_max is None
+
+    def matches(self, metadata: DocumentMetadata) -> bool:
+        """A document without the value of a filtered field does not match."""
+        if self.clients and _normalize(metadata.client) not in self.clients:
+            return False
+        if self.sectors and _normalize(metadata.sector) not in self.sectors:
+            return False
+        if self.languages and _normalize(metadata.language) not in self.languages:
+            return False
+        if self.year_min is not None and (metadata.year is None or metadata.year < self.year_min):
+            return False
+        if self.year_max is not None and (metadata.year is None or metadata.year > self.year_max):
+            return False
+        return True
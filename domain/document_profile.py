@@ -0,0 +1,31 @@
+# domain/document_profile.py
+# Compact profile of an ingested document (summary, offer themes, keywords), built once at ingestion
+# (see infrastructure/profile_engine.py) and stored in the document registry. The /match re-ranking
+# prompt describes each document by its profile and one or two evidence snippets instead of its raw
+# slide captions.
+
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional
+
+
+@dataclass
+class DocumentProfile:
+    summary: str
+    themes: List[str] = field(default_factory=list)
+    keywords: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> Optional["DocumentProfile"]:
+        if not data or not data.get("summary"):
+            return None
+        return cls(summary=data["summary"], themes=list(data.get("themes", [])), keywords=list(data.get("keywords", [])))
+
+    def to_prompt(self) -> str:
+        return (
+            f"Summary: {self.summary}\n"
+            f"Themes: {'; '.join(self.themes)}\n"
+            f"Keywords: {', '.join(self.keywords)}"
+        )
@@ -0,0 +1,55 @@
+# domain/evidence_selection.py
+# Choice of the evidence chunks of a document sent to the LLM: the matched keywords are covered first
+# (most important keywords first), then the remaining slots are filled by maximal marginal relevance
+# (MMR) over the chunk embeddings, so near-identical slides (repeated headers, team slides) do not
+# take several slots.
+
+from typing import Any, Dict, List, Optional
+from domain.chunk import Chunk
+
+
+def _redundancy(vector: Optional[Any], selected_vectors: List[Any]) -> float:
+    """Highest cosine similarity (numpy vectors) with the already selected chunks, 0 without vectors."""
+    if vector is None or not selected_vectors:
+        return 0.0
+    return float(max(vector @ other for other in selected_vectors))
+
+
+def select_evidence(
+    candidates: List[Chunk],
+    chunk_keywords: Dict[str, Dict[str, float]],
+    keyword_weights: Dict[str, float],
+    vectors: Dict[str, Any],
+    limit: int,
+    mmr_lambda: float = 0.7,
+) -> List[Chunk]:
+    """
+    Up to `limit` chunks, in order of selection (the most useful first).
+    - candidates: evidence chunks of the document
+    - chunk_keywords: chunk id -> {lowercase keyword that retrieved the chunk: similarity}
+    - keyword_weights: lowercase keyword -> weight (keywords with weight <= 0 are ignored)
+    - vectors: chunk id -> normalized embedding (chunks without a vector are never seen as redundant)
+    Each step picks the chunk covering the most weight of not yet covered keywords, ties (and every
+    step once all keywords are covered) broken by the MMR score
+    mmr_lambda * best keyword similarity - (1 - mmr_lambda) * max similarity to the selected chunks.
+    """
+    remaining = list(candidates)
+    selected: List[Chunk] = []
+    selected_vectors: List[Any] = []
+    uncovered = {kw for kw, weight in keyword_weights.items() if weight > 0}
+
+    while remaining and len(selected) < limit:
+        def gain(chunk: Chunk):
+            sims = chunk_keywords.get(chunk.id, {})
+            covered_weight = sum(keyword_weights.get(kw, 0) for kw in sims if kw in uncovered)
+            relevance = max(sims.values(), default=chunk.distance)
+            mmr = mmr_lambda * relevance - (1 - mmr_lambda) * _redundancy(vectors.get(chunk.id), selected_vectors)
+            return covered_weight, mmr
+
+        best = max(remaining, key=gain)
+        remaining.remove(best)
+        selected.append(best)
+        if best.id in vectors:
+            selected_vectors.append(vectors[best.id])
+        uncovered -= set(chunk_keywords.get(best.id, {}))
+    return selected
@@ -0,0 +1,71 @@
+# domain/extractive_explanation.py
+# Explanation of a match built from the evidence chunks (no LLM): for each matched keyword, the slide
+# where it matched best and the sentence of that slide that mentions it.
+
+import re
+import unicodedata
+from typing import Dict, List
+from domain.chunk import Chunk
+from domain.keyword import Keyword
+
+SNIPPET_MAX_CHARS = 160
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+_HEADER_RE = re.compile(r"^This is slide \d+ from the document '.*?'\.\s*")  # see build_slide_content
+_MARKUP_RE = re.compile(r"^[#\-*•>\s]+|\[(Extracted Text|Visual Summary)\]|^-{3,}$")
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _sentences(content: str) -> List[str]:
+    content = _HEADER_RE.sub("", content.strip())
+    sentences = []
+    for sentence in _SENTENCE_SPLIT_RE.split(content):
+        sentence = _MARKUP_RE.sub("", sentence.strip()).strip()
+        if len(sentence) > 3:
+            sentences.append(sentence)
+    return sentences
+
+
+def best_snippet(content: str, keyword: str) -> str:
+    """
+    Sentence of the chunk that shares the most words with the keyword (the first sentence when none
+    does, e.g. a semantic match), shortened to SNIPPET_MAX_CHARS.
+    """
+    sentences = _sentences(content)
+    if not sentences:
+        return ""
+    words = set(re.findall(r"\w+", _normalize(keyword)))
+    best = max(sentences, key=lambda s: len(words.intersection(re.findall(r"\w+", _normalize(s)))))
+    if len(best) > SNIPPET_MAX_CHARS:
+        best = best[:SNIPPET_MAX_CHARS].rsplit(" ", 1)[0] + "..."
+    return best
+
+
+def build_extractive_explanation(
+    matched_keywords: List[Keyword],
+    per_kw_best_chunk: Dict[str, Chunk],
+    language_code: str,
+) -> str:
+    """One line per matched keyword (most important first): best slide and its matching sentence."""
+    lines = []
+    for kw in matched_keywords:
+        chunk = per_kw_best_chunk.get(kw.keyword.lower())
+        if chunk is None:
+            continue
+        snippet = best_snippet(chunk.content, kw.keyword)
+        line = f"- {kw.keyword}"
+        if chunk.slide_number is not None and chunk.slide_number >= 0:
+            line += f" (slide {chunk.slide_number + 1})"
+        if snippet:
+            line += f" : \"{snippet}\""
+        lines.append(line)
+
+    if language_code == "fr":
+        header = "Correspondances trouvées dans le document :"
+    else:
+        header = "Matches found in the document:"
+    return "\n".join([header] + lines)
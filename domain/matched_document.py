@@ -4,7 +4,8 @@ from typing import List
 from domain.keyword import Keyword
 
 class MatchedDocument:
-    def __init__(self, ao_id: str, explanation: str, matched_keywords: List[Keyword]):
+    def __init__(self, ao_id: str, explanation: str, matched_keywords: List[Keyword], degraded: bool = False):
         self.ao_id = ao_id
         self.explanation = explanation
         self.matched_keywords = matched_keywords
+        self.degraded = degraded  # deterministic ranking, without LLM re-ranking (deadline reached)
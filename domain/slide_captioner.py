@@ -0,0 +1,315 @@
+# domain/slide_captioner.py
+# Captioning of the slides of a document: PDF text layer for text slides, vision LLM (one or several
+# slides per request) for visual ones. fitz (PyMuPDF) and PIL are imported inside the functions.
+from io import BytesIO
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+import base64
+import json
+import math
+import os
+import hashlib
+import time
+from infrastructure.azure_llm import azure_llm
+from infrastructure.prompt_templates import SLIDE_CAPTION_PROMPT, BATCH_SLIDE_CAPTION_PROMPT
+from infrastructure.logger import debug, write_log
+from domain.caption_stats import CaptionStats
+from infrastructure.single_flight import SingleFlight
+from core.utils.json_salvage import strip_code_fences
+
+# How slides are captioned:
+# - "vision" : every slide is described by the vision LLM
+# - "auto"   : text-dominant slides are chunked from the PDF text layer, only slides with meaningful
+#              images, diagrams or scanned content are sent to the vision LLM
+# - "text"   : only the PDF text layer is used (no LLM call)
+SLIDE_CAPTION_MODE = os.getenv("SLIDE_CAPTION_MODE", "auto").lower()
+# Below this number of characters in the text layer, a slide is considered visual (or scanned)
+TEXT_SLIDE_MIN_CHARS = int(os.getenv("TEXT_SLIDE_MIN_CHARS", "80"))
+# Above this share of the page covered by images, a slide is considered visual
+VISUAL_IMAGE_AREA_RATIO = float(os.getenv("VISUAL_IMAGE_AREA_RATIO", "0.15"))
+# From this number of vector drawings (shapes, arrows, ...), a slide is considered a diagram
+VISUAL_MIN_DRAWINGS = int(os.getenv("VISUAL_MIN_DRAWINGS", "25"))
+
+# Several visual slides are captioned in one multimodal request (CAPTION_BATCHING=false: one request per slide).
+# A batch is limited by the estimated input tokens of its images and by the completion size of its answer.
+CAPTION_BATCHING = os.getenv("CAPTION_BATCHING", "true").lower() == "true"
+CAPTION_BATCH_MAX_SLIDES = int(os.getenv("CAPTION_BATCH_MAX_SLIDES", "6"))
+CAPTION_BATCH_TOKEN_BUDGET = int(os.getenv("CAPTION_BATCH_TOKEN_BUDGET", "8000"))
+CAPTION_BATCH_OUTPUT_TOKENS = int(os.getenv("CAPTION_BATCH_OUTPUT_TOKENS", "600"))  # expected per slide
+CAPTION_BATCH_MAX_OUTPUT_TOKENS = 4096  # max_tokens of azure_llm
+
+CACHE_DIR = "./gpt_cache"
+
+# The same slide image captioned concurrently (e.g. the same deck added twice) is sent to the LLM once
+_caption_flights = SingleFlight("caption")
+
+# Running average duration of a vision call, used to estimate the time saved by text slides
+_vision_calls_count = 0
+_vision_seconds_total = 0.0
+
+def render_page(page):
+    """
+    Render a PDF page.
+    Returns the pixmap and the hash of the rendered pixels, used to detect which slides changed.
+    """
+    pix = page.get_pixmap(dpi=200)
+    page_hash = hashlib.sha256(pix.samples).hexdigest()
+    return pix, page_hash
+
+def pixmap_to_base64(pix) -> str:
+    from PIL import Image
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    buffered = BytesIO()
+    img.save(buffered, format="JPEG")
+    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
+    return img_str
+
+def pdf_slide_to_base64(pdf_path, page_number):
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        return pixmap_to_base64(render_page(doc.load_page(page_number))[0])
+
+def classify_page(page) -> str:
+    """
+    Classify a page from its PyMuPDF inventory (text layer, images, vector drawings).
+    Returns "text" when the text layer holds the content of the slide, "visual" otherwise.
+    """
+    import fitz
+    if len(page.get_text().strip()) < TEXT_SLIDE_MIN_CHARS:
+        return "visual"  # little or no text layer: scanned or purely visual slide
+
+    page_area = abs(page.rect) or 1.0
+    image_area = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    if image_area / page_area > VISUAL_IMAGE_AREA_RATIO:
+        return "visual"
+
+    # Full-page rectangles are backgrounds, not diagrams
+    drawings = [d for d in page.get_drawings() if abs(d["rect"]) < 0.9 * page_area]
+    if len(drawings) >= VISUAL_MIN_DRAWINGS:
+        return "visual"
+    return "text"
+
+def is_visual_slide(page) -> bool:
+    """Whether the slide would be sent to the vision LLM (depending on SLIDE_CAPTION_MODE)."""
+    return SLIDE_CAPTION_MODE == "vision" or (SLIDE_CAPTION_MODE == "auto" and classify_page(page) == "visual")
+
+def text_layer_caption(page) -> str:
+    """Caption of a text slide, in the same layout as the vision captions."""
+    return f"### [Extracted Text]\n{page.get_text(sort=True).strip()}"
+
+def get_cache_key(doc_id, slide_number, content_hash=None):
+    # With the hash of the rendered slide, the caption is reused as long as the slide does not change
+    key = content_hash if content_hash else f"{doc_id}_slide_{slide_number}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+def get_cache_path(cache_dir, key):
+    return os.path.join(cache_dir, f"{key}.json")
+
+def _read_cached_caption(path):
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            description = json.load(f)["description"]
+        if description.startswith("ERROR:"):
+            # Failed call cached by an older version: drop it so the slide is captioned again
+            os.remove(path)
+            return None
+        return description
+    return None
+
+def _write_cached_caption(path, description: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"description": description}, f)
+
+# Send image to GPT-4o for captioning/summary
+async def describe_slide_cached(
+        image_base64: str,
+        slide_number: int,
+        doc_id: str = None,
+        use_cache: bool = True,
+        cache_dir=CACHE_DIR,
+        content_hash: str = None,
+        ) -> Optional[str]:
+    """
+    Describe a slide image with optional caching.
+    - If use_cache=True and content_hash (hash of the rendered slide) or doc_id is provided, results are cached.
+    - If use_cache=False or neither is provided, always call the LLM without cache.
+    Returns None if the LLM call failed (after the retries of the LLM dispatcher): failures are never cached.
+    """
+
+    path = None
+
+    if use_cache and (content_hash or doc_id):
+        path = get_cache_path(cache_dir, get_cache_key(doc_id, slide_number, content_hash))
+
+        # Return cached description if available
+        cached = _read_cached_caption(path)
+        if cached is not None:
+            return cached
+
+    async def caption():
+        response = await azure_llm(
+            SLIDE_CAPTION_PROMPT.instructions, image_data=image_base64, prompt_name=SLIDE_CAPTION_PROMPT.id,
+        )
+        # Save the response to cache
+        if use_cache and path:
+            _write_cached_caption(path, response)
+        return response
+
+    image_key = content_hash or hashlib.sha256(image_base64.encode()).hexdigest()
+    try:
+        response = await _caption_flights.run(image_key, caption)
+
+    except Exception as e:
+        debug(f"[ERROR] Failed to describe slide {slide_number} (doc={doc_id}): {e}")
+        response = None
+
+    return response
+
+@dataclass
+class PendingSlide:
+    """A visual slide waiting for its vision caption."""
+    slide_number: int
+    image_base64: str
+    content_hash: str
+    width: int
+    height: int
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """
+    Input tokens of a high-detail image: the image is scaled to fit in 2048x2048, then its shortest
+    side to 768px, and costs 170 tokens per 512px tile plus 85 tokens.
+    """
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+def plan_caption_batches(pending: List[PendingSlide]) -> List[List[PendingSlide]]:
+    """
+    Group the slides in batches whose image tokens fit in CAPTION_BATCH_TOKEN_BUDGET, and whose
+    expected answer fits in the completion limit (CAPTION_BATCH_OUTPUT_TOKENS per slide).
+    """
+    max_by_output = max(1, CAPTION_BATCH_MAX_OUTPUT_TOKENS // CAPTION_BATCH_OUTPUT_TOKENS)
+    max_slides = max(1, min(CAPTION_BATCH_MAX_SLIDES, max_by_output))
+
+    batches, batch, batch_tokens = [], [], 0
+    for slide in pending:
+        tokens = estimate_image_tokens(slide.width, slide.height)
+        if batch and (len(batch) >= max_slides or batch_tokens + tokens > CAPTION_BATCH_TOKEN_BUDGET):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(slide)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _parse_batch_captions(response: str, slide_numbers: List[int]) -> Dict[int, str]:
+    """Map the JSON answer of a batch to slide number -> caption (same layout as a single slide caption)."""
+    captions = {}
+    for item in json.loads(strip_code_fences(response)).get("slides", []):
+        try:
+            slide_number = int(item["slide"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if slide_number not in slide_numbers:
+            continue
+        captions[slide_number] = (
+            f"### [Extracted Text]\n{str(item.get('extracted_text', '')).strip()}\n\n---\n\n"
+            f"### [Visual Summary]\n{str(item.get('visual_summary', '')).strip()}"
+        )
+    return captions
+
+async def describe_slides_batch(batch: List[PendingSlide], doc_id: str) -> Dict[int, str]:
+    """
+    Caption several slides with a single multimodal request.
+    Slides missing from the answer (or all of them, if it cannot be parsed) are retried individually.
+    Slides that still fail are left out of the result.
+    """
+    slide_numbers = [slide.slide_number for slide in batch]
+    captions = {}
+    try:
+        response = await azure_llm(
+            BATCH_SLIDE_CAPTION_PROMPT.instructions,
+            image_data=[slide.image_base64 for slide in batch],
+            image_labels=[f"Slide {n}" for n in slide_numbers],
+            prompt_name=BATCH_SLIDE_CAPTION_PROMPT.id,
+        )
+        captions = _parse_batch_captions(response, slide_numbers)
+    except Exception as e:
+        debug(f"[WARN] Batch captioning of slides {slide_numbers} failed (doc={doc_id}), retrying individually: {e}")
+
+    for slide in batch:
+        if slide.slide_number in captions:
+            _write_cached_caption(
+                get_cache_path(CACHE_DIR, get_cache_key(doc_id, slide.slide_number, slide.content_hash)),
+                captions[slide.slide_number],
+            )
+        else:
+            caption = await describe_slide_cached(
+                slide.image_base64, slide.slide_number, doc_id, content_hash=slide.content_hash
+            )
+            if caption is not None:
+                captions[slide.slide_number] = caption
+    return captions
+
+def prepare_slide(page, pix, page_hash: str, slide_number: int, doc_id: str, stats: CaptionStats) -> Union[str, PendingSlide]:
+    """
+    Caption a rendered slide from its text layer or from the cache when possible (depending on SLIDE_CAPTION_MODE).
+    Otherwise return a PendingSlide, to be captioned by caption_pending_slides.
+    """
+    if not is_visual_slide(page):
+        stats.text_slides += 1
+        return text_layer_caption(page)
+
+    cached = _read_cached_caption(get_cache_path(CACHE_DIR, get_cache_key(doc_id, slide_number, page_hash)))
+    if cached is not None:
+        stats.cached_slides += 1
+        return cached
+
+    return PendingSlide(slide_number, pixmap_to_base64(pix), page_hash, pix.width, pix.height)
+
+async def caption_pending_slides(pending: List[PendingSlide], doc_id: str, stats: CaptionStats) -> Dict[int, str]:
+    """
+    Caption the visual slides with the vision LLM, several slides per request when CAPTION_BATCHING is on.
+    Slides whose captioning failed are missing from the result (they are not ingested).
+    """
+    global _vision_calls_count, _vision_seconds_total
+
+    batches = plan_caption_batches(pending) if CAPTION_BATCHING else [[slide] for slide in pending]
+    captions = {}
+    for batch in batches:
+        start = time.time()
+        if len(batch) == 1:
+            slide = batch[0]
+            caption = await describe_slide_cached(
+                slide.image_base64, slide.slide_number, doc_id, content_hash=slide.content_hash
+            )
+            if caption is not None:
+                captions[slide.slide_number] = caption
+        else:
+            captions.update(await describe_slides_batch(batch, doc_id))
+        elapsed = time.time() - start
+        stats.failed_slides += sum(1 for slide in batch if slide.slide_number not in captions)
+        stats.vision_requests += 1
+        stats.vision_calls += len(batch)
+        stats.vision_seconds += elapsed
+        _vision_calls_count += len(batch)
+        _vision_seconds_total += elapsed
+    return captions
+
+def report_caption_stats(doc_id: str, stats: CaptionStats) -> dict:
+    average = stats.average_vision_seconds()
+    if average is None and _vision_calls_count:
+        average = _vision_seconds_total / _vision_calls_count
+    report = stats.to_dict(average)
+    debug(
+        f"[INFO] Captioning of {doc_id} ({SLIDE_CAPTION_MODE} mode): {stats.vision_calls} slides captioned "
+        f"in {stats.vision_requests} vision requests, {stats.cached_slides} cached, {stats.text_slides} text slides, "
+        f"{stats.duplicate_slides} duplicates -> {report['vision_calls_saved']} vision calls, "
+        f"~{report['seconds_saved']}s and {report['chunks_saved']} chunks saved"
+    )
+    write_log(msg=json.dumps(report), header=f"Captioning stats {doc_id}", file_name="ingestion_documents.log")
+    return report
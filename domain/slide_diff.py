@@ -0,0 +1,18 @@
+# domain/slide_diff.py
+
+from dataclasses import dataclass, field
+from typing import List
+
+@dataclass
+class SlideDiff:
+    """Slide numbers added, removed, changed, moved, unchanged and failed in a document update."""
+    added: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    changed: List[int] = field(default_factory=list)
+    unchanged: List[int] = field(default_factory=list)
+    moved: List[int] = field(default_factory=list)  # new numbers of unchanged slides found at another number
+    failed: List[int] = field(default_factory=list)  # captioning failed, the previous version is kept
+    full_reingest: bool = False
+
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.changed or self.moved)
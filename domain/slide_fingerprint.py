@@ -0,0 +1,121 @@
+# domain/slide_fingerprint.py
+# Fingerprint of a rendered slide, used to find the near-duplicate slides of the corpus (company overview,
+# methodology and reference slides reused from deck to deck):
+# - dHash of the slide image (64 bits: brightness gradients of a 9x8 grayscale thumbnail), robust to
+#   re-rendering and small visual edits
+# - MinHash of the word 3-shingles of the text layer, an estimate of the Jaccard similarity of the texts
+# Two slides are near-duplicates when both are close. Slides without a text layer (image-only, blank) are
+# duplicates only when their rendered images are identical: the dHash alone is too coarse to tell them apart.
+# PIL is imported inside the functions.
+
+import os
+import re
+import hashlib
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# Maximum number of differing dHash bits between two near-duplicate slides
+DUPLICATE_DHASH_MAX_DISTANCE = int(os.getenv("DUPLICATE_DHASH_MAX_DISTANCE", "4"))
+# Minimum estimated Jaccard similarity of the text layers of two near-duplicate slides
+DUPLICATE_TEXT_MIN_SIMILARITY = float(os.getenv("DUPLICATE_TEXT_MIN_SIMILARITY", "0.85"))
+
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+_MERSENNE_PRIME = (1 << 61) - 1
+# Fixed permutations (a * x + b mod p), so the signatures stay comparable across processes and versions
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.sha256(f"a{i}".encode()).digest()[:8], "big") % (_MERSENNE_PRIME - 1) + 1,
+        int.from_bytes(hashlib.sha256(f"b{i}".encode()).digest()[:8], "big") % _MERSENNE_PRIME,
+    )
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+
+@dataclass(frozen=True)
+class SlideFingerprint:
+    dhash: int
+    minhash: Tuple[int, ...]  # empty when the slide has no text layer
+    image_hash: Optional[str] = None  # SHA-256 of the rendered image, only for slides without text
+
+    def to_dict(self) -> dict:
+        data = {"dhash": f"{self.dhash:016x}", "minhash": "".join(f"{value:08x}" for value in self.minhash)}
+        if self.image_hash is not None:
+            data["image_hash"] = self.image_hash
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> Optional["SlideFingerprint"]:
+        if not data or "dhash" not in data:
+            return None
+        minhash = data.get("minhash", "")
+        return cls(
+            dhash=int(data["dhash"], 16),
+            minhash=tuple(int(minhash[i:i + 8], 16) for i in range(0, len(minhash), 8)),
+            image_hash=data.get("image_hash"),
+        )
+
+
+def image_dhash(pix) -> int:
+    """dHash of a PyMuPDF pixmap: one bit per pair of horizontally adjacent pixels of a 9x8 thumbnail."""
+    from PIL import Image
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples).convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = list(img.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def text_minhash(text: str) -> Tuple[int, ...]:
+    """MinHash signature (32-bit values) of the word shingles of a text, empty for a text without words."""
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return ()
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles]
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) & 0xFFFFFFFF
+        for a, b in _PERMUTATIONS
+    )
+
+
+def slide_fingerprint(page, pix) -> SlideFingerprint:
+    """Fingerprint of a PDF page from its rendered pixmap and its text layer."""
+    minhash = text_minhash(page.get_text())
+    image_hash = None if minhash else hashlib.sha256(pix.samples).hexdigest()
+    return SlideFingerprint(dhash=image_dhash(pix), minhash=minhash, image_hash=image_hash)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def text_similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two texts (0 if one of them has no text)."""
+    if not a or not b:
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / min(len(a), len(b))
+
+
+def is_near_duplicate(a: SlideFingerprint, b: SlideFingerprint) -> bool:
+    if not a.minhash and not b.minhash:
+        return a.image_hash is not None and a.image_hash == b.image_hash
+    return (
+        hamming_distance(a.dhash, b.dhash) <= DUPLICATE_DHASH_MAX_DISTANCE
+        and text_similarity(a.minhash, b.minhash) >= DUPLICATE_TEXT_MIN_SIMILARITY
+    )
+
+
+def dhash_bands(dhash: int) -> List[Tuple[int, int]]:
+    """
+    The dHash cut in DUPLICATE_DHASH_MAX_DISTANCE + 1 bands: two hashes within the maximum distance
+    share at least one band exactly (pigeonhole), so the bands index the candidate duplicates.
+    """
+    count = DUPLICATE_DHASH_MAX_DISTANCE + 1
+    bands = []
+    for i in range(count):
+        start, end = i * 64 // count, (i + 1) * 64 // count
+        bands.append((i, (dhash >> start) & ((1 << (end - start)) - 1)))
+    return bands
@@ -0,0 +1,83 @@
+# infrastructure/analysis_cache.py
+#
+# In-memory results of /analyze, keyed by the hash of the PDF content (not of its base64 encoding), so that a
+# file analyzed again (retry, another user, another language) skips the work already done:
+# - extracted text: content hash
+# - keywords: content hash + keyword prompt version (they do not depend on the language)
+# - summary: content hash + language + summary prompt version
+# Each cache is bounded, the least recently used entries are evicted first. Failed extractions and LLM calls
+# are never cached. The caches are per worker process.
+
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+# Keyword lists and summaries kept in memory
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "256"))
+# Total characters of extracted text kept in memory (~1 byte per character for latin text)
+ANALYSIS_TEXT_CACHE_CHARS = int(os.getenv("ANALYSIS_TEXT_CACHE_CHARS", str(50_000_000)))
+
+
+class LRUCache(Generic[V]):
+    """LRU cache bounded by a number of entries, and optionally by the total weight of its values."""
+
+    def __init__(self, max_entries: int, max_weight: Optional[int] = None, weigh: Callable[[V], int] = None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self._weigh = weigh or (lambda value: 1)
+        self._entries: "OrderedDict[Hashable, V]" = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        weight = self._weigh(value)
+        if self.max_weight is not None and weight > self.max_weight:
+            return  # larger than the whole cache
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._weight -= self._weigh(previous)
+            self._entries[key] = value
+            self._weight += weight
+            while len(self._entries) > self.max_entries or (
+                    self.max_weight is not None and self._weight > self.max_weight):
+                _, evicted = self._entries.popitem(last=False)
+                self._weight -= self._weigh(evicted)
+                self.counters["evictions"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "weight": self._weight,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None,
+                **self.counters,
+            }
+
+
+text_cache: LRUCache[str] = LRUCache(ANALYSIS_CACHE_SIZE, ANALYSIS_TEXT_CACHE_CHARS, weigh=len)
+keywords_cache: LRUCache[list] = LRUCache(ANALYSIS_CACHE_SIZE)
+summary_cache: LRUCache[str] = LRUCache(ANALYSIS_CACHE_SIZE)
+
+
+def get_analysis_cache_stats() -> dict:
+    return {
+        "text": text_cache.get_stats(),
+        "keywords": keywords_cache.get_stats(),
+        "summary": summary_cache.get_stats(),
+    }
@@ -1,11 +1,17 @@
 #services/azure_llm.py
 
-from core.ai.llm_client.azure_config import client, deployment_name
+from core.ai.llm_client.azure_config import get_client, deployment_name
+from infrastructure.llm_dispatcher import get_dispatcher
+from infrastructure.llm_usage import record_usage
 
+import time
 from datetime import datetime
 
 # Definition of the function to call Azure OpenAI LLM
 
+MAX_COMPLETION_TOKENS = 4096
+IMAGE_TOKENS_ESTIMATE = 765  # high-detail 1024x768 image, counted against the tokens-per-minute limit
+
 async def azure_llm(prompt, **kwargs): 
 
     image_data = kwargs.get("image_data", None)
@@ -16,32 +22,142 @@ async def azure_llm(prompt, **kwargs):
         messages.append({"role": "system", "content": system_prompt})
     
     if image_data:
-        # Multimodal message (text + image)
-        messages.append({
-            "role": "user",
-            "content": [
-                {"type": "text", "text": prompt},
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_data}"}}
-            ]
-        })
+        # Multimodal message (text + one or several images, each optionally preceded by a text label)
+        images = image_data if isinstance(image_data, list) else [image_data]
+        labels = kwargs.get("image_labels") or [None] * len(images)
+        content = [{"type": "text", "text": prompt}]
+        for label, image in zip(labels, images):
+            if label:
+                content.append({"type": "text", "text": label})
+            content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image}"}})
+        messages.append({"role": "user", "content": content})
     else:
         messages.append({"role": "user", "content": prompt})
 
-    response = client.chat.completions.create( 
-        model=deployment_name,  
-        messages=messages,
-        temperature=0.2,  # Lower temperature for more deterministic responses
-        top_p=1.0,
-        max_tokens=4096,
+    # Azure counts the prompt and max_tokens against the tokens-per-minute limit
+    estimated_tokens = len(prompt) // 4 + len(system_prompt or "") // 4 + MAX_COMPLETION_TOKENS
+    if image_data:
+        estimated_tokens += IMAGE_TOKENS_ESTIMATE * len(images)
+
+    # Template of the prompt, for the cached-token stats (the calls made by LightRAG give none)
+    prompt_name = kwargs.get("prompt_name") or "lightrag"
+    # Structured output (e.g. a JSON schema the answer must follow), if the deployment supports it
+    response_format = kwargs.get("response_format")
+    options = {"response_format": response_format} if response_format else {}
+
+    async def create():
+        start = time.monotonic()
+        response = await get_client().chat.completions.create(
+            model=deployment_name,
+            messages=messages,
+            temperature=0.2,  # Lower temperature for more deterministic responses
+            top_p=1.0,
+            max_tokens=MAX_COMPLETION_TOKENS,
+            **options,
+        )
+        record_usage(prompt_name, getattr(response, "usage", None), time.monotonic() - start)
+        return response
+
+    response = await get_dispatcher().run(
+        create,
+        priority=kwargs.get("priority"),  # default: priority of the current task (see llm_priority)
+        estimated_tokens=estimated_tokens,
     )
     return response.choices[0].message.content
 
-import json
-import re
+import os
+from collections import Counter
 from domain.keyword import Keyword as DomainKeyword
-from typing import List
+from typing import List, Optional
 from domain.document import Document
 from infrastructure.logger import debug, write_log
+from infrastructure.llm_hedging import LatencyTracker, hedged_call
+from infrastructure.prompt_templates import RANKING_PROMPT, RANKING_RESPONSE_FORMAT
+from core.utils.json_salvage import SalvagedArray, salvage_json_array
+
+PROFILE_EVIDENCE_MAX_CHARS = 600  # evidence chunks sent with a document profile are shortened to this
+
+# The ranking answer must follow RANKING_RESPONSE_FORMAT (disabled on its own if the deployment rejects it)
+RANKING_STRUCTURED_OUTPUT = os.getenv("RANKING_STRUCTURED_OUTPUT", "true").lower() == "true"
+# When the ranking answer is cut (max_tokens) or malformed, the documents it misses are asked for again
+# in up to this many continuation calls, instead of losing the whole answer
+RANKING_MAX_CONTINUATIONS = int(os.getenv("RANKING_MAX_CONTINUATIONS", "1"))
+
+_structured_output = RANKING_STRUCTURED_OUTPUT
+
+# Outcome of the parsing of each ranking answer: complete, salvaged (partial) or failed
+ranking_parse_stats = Counter()
+
+# Latencies of the ranking calls of /match, used to decide when a hedged request is sent
+ranking_latency = LatencyTracker()
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    text = text.strip()
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+
+def _format_document(doc: Document) -> str:
+    """A document of the ranking prompt: its profile and a few short extracts, or its raw extracts."""
+    if doc.profile is None:
+        doc_chunks = "\n\n".join([chunk.content for chunk in doc.chunks] or [])
+        return f"\n--- Document: {doc.ao_id} ---\n{doc_chunks}\n"
+    extracts = "\n".join(f"- {_shorten(chunk.content, PROFILE_EVIDENCE_MAX_CHARS)}" for chunk in doc.chunks)
+    return f"\n--- Document: {doc.ao_id} ---\n{doc.profile.to_prompt()}\nMost relevant extracts:\n{extracts}\n"
+
+
+def _parse_ranked_documents(response: Optional[str]) -> Optional[SalvagedArray]:
+    """
+    Documents of the ranking answer: every complete document object, also from an answer cut by max_tokens.
+    None if no document can be read from it.
+    """
+    salvaged = salvage_json_array(response, key="documents")
+    ranking_parse_stats["responses"] += 1
+    if salvaged is not None:
+        salvaged.items = [item for item in salvaged.items if isinstance(item, dict) and item.get("document")]
+    if salvaged is not None and salvaged.complete:
+        ranking_parse_stats["complete"] += 1
+        return salvaged
+    if salvaged is not None and salvaged.items:
+        ranking_parse_stats["salvaged"] += 1
+        debug(f"[WARN] Ranking answer incomplete, {len(salvaged.items)} documents salvaged")
+        return salvaged
+
+    ranking_parse_stats["failed"] += 1
+    debug(f"[ERROR] Failed to parse LLM response: {response}")
+    write_log(
+        msg=f"Failed to parse LLM response:\n{response}",
+        header="LLM Response Error",
+        file_name="response_LLMs.log",
+    )
+    return None
+
+
+def get_ranking_parse_stats() -> dict:
+    responses = ranking_parse_stats["responses"]
+    return {
+        **ranking_parse_stats,
+        "parse_failure_rate": round(ranking_parse_stats["failed"] / responses, 3) if responses else None,
+        "salvage_rate": round(ranking_parse_stats["salvaged"] / responses, 3) if responses else None,
+    }
+
+
+async def _ask_ranking(prompt: str) -> Optional[str]:
+    global _structured_output
+    if _structured_output:
+        import openai
+        try:
+            return await azure_llm(
+                prompt, system_prompt=RANKING_PROMPT.system, prompt_name=RANKING_PROMPT.id,
+                response_format=RANKING_RESPONSE_FORMAT,
+            )
+        except openai.BadRequestError as e:
+            if "response_format" not in str(e) and "json_schema" not in str(e):
+                raise
+            # Deployment or API version without structured outputs: the prompt alone asks for the structure
+            _structured_output = False
+            debug(f"[WARN] Structured output not supported, disabled for the ranking calls: {e}")
+    return await azure_llm(prompt, system_prompt=RANKING_PROMPT.system, prompt_name=RANKING_PROMPT.id)
 
 
 async def ask_llm_for_ranked_documents(keywords: List[DomainKeyword], documents: List[Document], language_code: str) -> List[dict]:
@@ -51,65 +167,62 @@ async def ask_llm_for_ranked_documents(keywords: List[DomainKeyword], documents:
         [f"- {kw.keyword.lower()} (importance: {kw.score})" for kw in keywords]
     )
     # 2. Format documents
-    documents_text = ""
-    for doc in documents:
-        doc_chunks = "\n\n".join([chunk.content for chunk in doc.chunks] or [])
-        documents_text += f"\n--- Document: {doc.ao_id} ---\n{doc_chunks}\n"
+    documents_text = "".join(_format_document(doc) for doc in documents)
+
+    # 3. Prepare the prompt: static instructions first (cached by the provider), then the request-specific parts
 
-    # 3. Prepare system prompt and user prompt
-    
     # Get the language
     language_codes = {'fr' : 'french', 'en': 'english'}
     language = language_codes.get(language_code, 'english')
+    keywords_section = f"The call for tender contains the following important keywords:\n{keywords_str}"
+    language_section = f"Language of the explanations: {language}"
 
-    system_prompt = (
-        "You are an expert in analyzing professional documents (RAOs). "
-        "Your task is to evaluate which RAO documents are the most relevant "
-        "to answer a given call for tender (AO), based on weighted keywords."
-        "Give the explanations in the language requested by the user."
-    )
-
-    prompt = (
-        f"The call for tender contains the following important keywords:\n"
-        f"{keywords_str}\n\n"
-        "You are given extracts (chunks) from several RAO documents.\n"
-        f"Rank the documents by relevance and give an explanation in {language}.\n"
-        "For each relevant document, return ONLY the keywords from the list above exactly as written "
-        "that are actually related to the document. Do NOT include synonyms or new terms.\n"
-        "Order the keywords by relevance (most important first).\n"
-        "Exclude documents that are not relevant at all.\n\n"
-        "Return a VALID JSON array. Each element MUST be an object with exactly these keys:\n"
-        "[{\"document\": \"<ao_id>\", \"explanation\": \"<why it matches>\", \"keywords\": [\"k1\", \"k2\", ... ]}, ...]\n\n"
-        "Do not add any other keys or data outside this structure."
-        f"Here are the document chunks:\n{documents_text}"
-    )
+    prompt = RANKING_PROMPT.render(keywords_section, f"Here are the documents:\n{documents_text}", language_section)
 
     write_log(
         msg=prompt,
         header=f'Prompt associated to {keywords_str}',
         file_name="ranking_prompts.log",
     )
+    debug(
+        f"[INFO] Ranking prompt: ~{len(prompt) // 4} tokens, "
+        f"{sum(doc.profile is not None for doc in documents)}/{len(documents)} documents described by their profile"
+    )
 
-    # 4. Call LLM
-    response = await azure_llm(prompt, system_prompt=system_prompt)
-
-    # 5. Clean up response
-    cleaned = response.strip() #Removes leading and trailing spaces
-
-    # Remove markdown fences if present
-    if cleaned.startswith("```"):
-        cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned)
-        cleaned = re.sub(r"\s*```$", "", cleaned)
-
-    # Try parsing directly
-    try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError:
-        debug(f"[ERROR] Failed to parse LLM response: {cleaned}")
-        write_log(
-            msg=f"Failed to parse LLM response:\n{cleaned}",
-            header="LLM Response Error",
-            file_name="response_LLMs.log",
+    # 4. Call LLM (a duplicate call is sent if this one is in the slow tail, the first readable answer wins)
+    async def call_and_parse():
+        return _parse_ranked_documents(await _ask_ranking(prompt))
+
+    ranked = await hedged_call(call_and_parse, lambda result: result is not None, ranking_latency)
+    if ranked is None:
+        return []  # Fallback to empty list if parsing fails
+    results = ranked.items
+
+    # 5. Answer cut or malformed: ask only for the documents it misses, ranked after the ones already returned
+    for _ in range(RANKING_MAX_CONTINUATIONS):
+        if ranked.complete:
+            break
+        returned = {item["document"] for item in results}
+        missing = [doc for doc in documents if doc.ao_id not in returned]
+        if not missing:
+            break
+        ranking_parse_stats["continuations"] += 1
+        debug(f"[INFO] Ranking continuation for {len(missing)} documents")
+        continuation_prompt = RANKING_PROMPT.render(
+            keywords_section,
+            f"Here are the documents:\n{''.join(_format_document(doc) for doc in missing)}",
+            f"Documents already ranked above these ones (do not return them): {', '.join(sorted(returned))}",
+            language_section,
         )
-        return [] # Fallback to empty list if parsing fails
-    
+        try:
+            ranked = _parse_ranked_documents(await _ask_ranking(continuation_prompt))
+        except Exception as e:
+            debug(f"[WARN] Ranking continuation failed, keeping the {len(results)} documents salvaged: {e}")
+            break
+        if ranked is None:
+            break
+        new_items = [item for item in ranked.items if item["document"] not in returned]
+        ranking_parse_stats["continuation_documents"] += len(new_items)
+        results += new_items
+
+    return results
@@ -0,0 +1,400 @@
+# infrastructure/binary_store.py
+#
+# File formats of the SQLite / memory-mapped storage backend (see lightrag_storages.py), without any
+# LightRAG dependency so that the migration and benchmark scripts and the BM25 index can read them:
+# - SqliteKV: JSON records by id in an indexed SQLite table, each write commits only the written records
+# - VectorBlocks: vectors appended to a raw float32 file read through a memory map, with the
+#   id -> row mapping and the metadata of each vector in SQLite
+
+import os
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+SQLITE_BATCH = 500  # ids per "IN (...)" query (SQLite limits the number of parameters)
+COMPACT_DEAD_RATIO = 0.3  # the vector file is rewritten when this share of its rows is dead...
+COMPACT_MIN_DEAD_ROWS = 1000  # ...and at least this number of rows
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Autocommit (explicit transactions for batches); one connection shared by the threads, under a lock
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA page_size=16384")  # new databases: records of a few KB share pages (default 4 KB)
+    conn.execute("PRAGMA journal_mode=WAL")  # readers (other workers) are not blocked by a write
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _batches(items: Sequence, size: int = SQLITE_BATCH) -> Iterator[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SqliteKV:
+    """JSON records by id. Thread-safe; reads always see the last committed write of any process."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS kv (id TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM kv WHERE id = ?", (id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, ids: Sequence[str]) -> List[Optional[dict]]:
+        """Records in the order of ids (None for the missing ones)."""
+        ids = list(ids)
+        found = {}
+        with self._lock:
+            for batch in _batches(ids):
+                query = f"SELECT id, value FROM kv WHERE id IN ({','.join('?' * len(batch))})"
+                found.update(self._conn.execute(query, batch).fetchall())
+        return [json.loads(found[id]) if id in found else None for id in ids]
+
+    def missing(self, ids: Iterable[str]) -> set:
+        ids = list(set(ids))
+        present = set()
+        with self._lock:
+            for batch in _batches(ids):
+                query = f"SELECT id FROM kv WHERE id IN ({','.join('?' * len(batch))})"
+                present.update(row[0] for row in self._conn.execute(query, batch))
+        return set(ids) - present
+
+    def put_many(self, records: Dict[str, dict]) -> None:
+        rows = [(id, json.dumps(value, ensure_ascii=False)) for id, value in records.items()]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO kv (id, value) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET value = excluded.value",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete_many(self, ids: Iterable[str]) -> int:
+        ids = list(ids)
+        deleted = 0
+        with self._lock:
+            for batch in _batches(ids):
+                cursor = self._conn.execute(f"DELETE FROM kv WHERE id IN ({','.join('?' * len(batch))})", batch)
+                deleted += cursor.rowcount
+        return deleted
+
+    def items(self, page_size: int = 1000) -> Iterator[Tuple[str, dict]]:
+        """All the records, read by pages (the lock is not held between pages)."""
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, value FROM kv WHERE id > ? ORDER BY id LIMIT ?", (last_id, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            for id, value in rows:
+                yield id, json.loads(value)
+            last_id = rows[-1][0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv")
+
+
+def _normalize(vectors):
+    import numpy as np
+
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class VectorBlocks:
+    """
+    Normalized float32 vectors appended to <base>.<generation>.f32 and read through a memory map
+    (they stay in the OS page cache, not in the Python heap), with their ids and metadata in <base>.sqlite.
+    Only the row -> id list is held in memory. A deleted or replaced vector leaves a dead row in the file
+    until compact() rewrites it under a new generation.
+    """
+
+    def __init__(self, base_path: str, dim: int):
+        self.base_path = base_path
+        self.dim = dim
+        self._lock = threading.RLock()
+        self._conn = _connect(f"{base_path}.sqlite")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (id TEXT PRIMARY KEY, row INTEGER NOT NULL, meta TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        stored_dim = self._get_info("dim")
+        if stored_dim is None:
+            self._set_info("dim", dim)
+            self._set_info("generation", 0)
+        elif int(stored_dim) != dim:
+            raise ValueError(f"{base_path}: vectors of dimension {stored_dim} stored, {dim} expected")
+        self.load()
+
+    def _get_info(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM info WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_info(self, key: str, value) -> None:
+        self._conn.execute(
+            "INSERT INTO info (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    def _vectors_path(self, generation: int) -> str:
+        return f"{self.base_path}.{generation}.f32"
+
+    @property
+    def vectors_path(self) -> str:
+        return self._vectors_path(self._generation)
+
+    def close(self) -> None:
+        with self._lock:
+            self._matrix = None
+            self._conn.close()
+
+    def load(self) -> None:
+        """(Re)read the row mapping and map the vector file (e.g. after a write by another process)."""
+        import numpy as np
+
+        with self._lock:
+            # One read transaction: the generation and the rows come from the same commit
+            self._conn.execute("BEGIN")
+            try:
+                self._generation = int(self._get_info("generation"))
+                path = self.vectors_path
+                row_size = self.dim * 4
+                n_rows = os.path.getsize(path) // row_size if os.path.exists(path) else 0
+                self._row_ids: List[Optional[str]] = [None] * n_rows  # None: dead row
+                for id, row in self._conn.execute("SELECT id, row FROM vectors"):
+                    if row < n_rows:  # row appended by another process after the file size was read
+                        self._row_ids[row] = id
+            finally:
+                self._conn.execute("COMMIT")
+            self._live = sum(1 for id in self._row_ids if id is not None)
+            self._alive = np.fromiter((id is not None for id in self._row_ids), dtype=bool, count=n_rows)
+            self._map()
+
+    def _map(self) -> None:
+        import numpy as np
+
+        n_rows = len(self._row_ids)
+        if n_rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+        else:
+            self._matrix = np.empty((0, self.dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def dead_rows(self) -> int:
+        return len(self._row_ids) - self._live
+
+    def _rows_of(self, ids: Sequence[str]) -> Dict[str, int]:
+        """
+        Rows of the ids in the mapped file. The rows are read with the generation they belong to: after a
+        compaction by another process, the new file is mapped first (rows of the new generation would
+        point to other vectors in the old file).
+        """
+        while True:
+            rows = {}
+            self._conn.execute("BEGIN")
+            try:
+                generation = int(self._get_info("generation"))
+                if generation == self._generation:
+                    for batch in _batches(list(ids)):
+                        query = f"SELECT id, row FROM vectors WHERE id IN ({','.join('?' * len(batch))})"
+                        rows.update(self._conn.execute(query, batch).fetchall())
+            finally:
+                self._conn.execute("COMMIT")
+            if generation == self._generation:
+                return rows
+            self.load()
+
+    def upsert(self, ids: Sequence[str], vectors, metas: Sequence[dict]) -> None:
+        """Append the vectors (a replaced id leaves its previous row dead) and commit their metadata."""
+        if not len(ids):
+            return
+        import numpy as np
+
+        vectors = _normalize(vectors)
+        with self._lock:
+            previous = self._rows_of(ids)
+            path = self.vectors_path
+            row_size = self.dim * 4
+            # Rows are appended after the last complete row of the file (a partial row left by an
+            # interrupted write is overwritten)
+            first_row = os.path.getsize(path) // row_size if os.path.exists(path) else 0
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(first_row * row_size)
+                f.truncate()
+                f.write(vectors.tobytes())
+            rows = [
+                (id, first_row + i, json.dumps(meta, ensure_ascii=False))
+                for i, (id, meta) in enumerate(zip(ids, metas))
+            ]
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO vectors (id, row, meta) VALUES (?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET row = excluded.row, meta = excluded.meta",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._kill_rows(previous.values())
+            padding = first_row - len(self._row_ids)
+            # An id given twice in the batch keeps its last vector
+            last_row = {id: first_row + i for i, id in enumerate(ids)}
+            appended = [id if last_row[id] == first_row + i else None for i, id in enumerate(ids)]
+            self._row_ids.extend([None] * padding + appended)
+            self._alive = np.concatenate([self._alive, np.zeros(padding, dtype=bool), [id is not None for id in appended]])
+            self._live += len(last_row)
+            self._map()
+
+    def _kill_rows(self, rows: Iterable[int]) -> None:
+        """Mark rows dead. The alive mask is replaced, not modified: a running query keeps its snapshot."""
+        dead = [row for row in rows if row < len(self._row_ids) and self._row_ids[row] is not None]
+        if not dead:
+            return
+        alive = self._alive.copy()
+        alive[dead] = False
+        self._alive = alive
+        for row in dead:
+            self._row_ids[row] = None
+        self._live -= len(dead)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        ids = list(ids)
+        with self._lock:
+            rows = self._rows_of(ids)
+            for batch in _batches(list(rows)):
+                self._conn.execute(f"DELETE FROM vectors WHERE id IN ({','.join('?' * len(batch))})", batch)
+            self._kill_rows(rows.values())
+        return len(rows)
+
+    def ids_where(self, field: str, values: Sequence[str]) -> List[str]:
+        """Ids of the vectors whose metadata field is one of the values."""
+        query = (
+            f"SELECT id FROM vectors WHERE json_extract(meta, ?) IN ({','.join('?' * len(values))})"
+        )
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, [f"$.{field}", *values])]
+
+    def get_metas(self, ids: Sequence[str]) -> Dict[str, dict]:
+        found = {}
+        with self._lock:
+            for batch in _batches(list(ids)):
+                query = f"SELECT id, meta FROM vectors WHERE id IN ({','.join('?' * len(batch))})"
+                found.update((id, json.loads(meta)) for id, meta in self._conn.execute(query, batch))
+        return found
+
+    def get_vectors(self, ids: Sequence[str]) -> Dict[str, list]:
+        with self._lock:
+            rows = self._rows_of(ids)
+            matrix = self._matrix
+        return {id: matrix[row].tolist() for id, row in rows.items() if row < len(matrix)}
+
+    def rows(self, ids: Sequence[str]):
+        """Sorted rows of the given ids (numpy array), to restrict queries to them."""
+        import numpy as np
+
+        with self._lock:
+            return np.array(sorted(self._rows_of(ids).values()), dtype=np.int64)
+
+    def query(self, vector, top_k: int, better_than_threshold: float = -1.0, rows=None) -> List[Tuple[str, float]]:
+        """
+        (id, cosine similarity) of the top_k nearest vectors, best first. With rows (from rows()), only
+        these rows are scored; a row rewritten by a compaction since may return another id, callers
+        check the ids.
+        """
+        import numpy as np
+
+        with self._lock:  # consistent snapshot; the scoring runs without the lock (numpy releases the GIL)
+            matrix, alive, row_ids = self._matrix, self._alive, self._row_ids
+        if rows is None:
+            rows = np.arange(len(matrix))
+            scores = np.where(alive, matrix @ _normalize([vector])[0], -np.inf)
+        else:
+            rows = rows[rows < len(matrix)]
+            scores = np.where(alive[rows], matrix[rows] @ _normalize([vector])[0], -np.inf)
+        if not len(scores) or top_k <= 0:
+            return []
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (row_ids[rows[i]], float(scores[i]))
+            for i in top
+            if np.isfinite(scores[i]) and scores[i] >= better_than_threshold and row_ids[rows[i]] is not None
+        ]
+
+    def needs_compaction(self) -> bool:
+        dead = self.dead_rows
+        return dead >= COMPACT_MIN_DEAD_ROWS and dead >= COMPACT_DEAD_RATIO * len(self._row_ids)
+
+    def compact(self) -> None:
+        """
+        Rewrite the live rows into the file of the next generation, then switch to it in one SQLite
+        transaction (a crash before the commit leaves the current generation intact). Other processes keep
+        reading the old file they have mapped until they reload.
+        """
+        import numpy as np
+
+        with self._lock:
+            old_path = self.vectors_path
+            new_generation = self._generation + 1
+            new_path = self._vectors_path(new_generation)
+            live = [(row, id) for row, id in enumerate(self._row_ids) if id is not None]
+            with open(new_path, "wb") as f:
+                for batch in _batches(live, 4096):
+                    f.write(np.ascontiguousarray(self._matrix[[row for row, _ in batch]]).tobytes())
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE vectors SET row = ? WHERE id = ?",
+                    [(new_row, id) for new_row, (_, id) in enumerate(live)],
+                )
+                self._set_info("generation", new_generation)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                os.remove(new_path)
+                raise
+            self._generation = new_generation
+            self._row_ids = [id for _, id in live]
+            self._alive = np.ones(len(live), dtype=bool)
+            self._live = len(live)
+            self._map()
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass  # still mapped by another process (Windows): removed on a later compaction
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM vectors")
+            self._row_ids = []
+            self._alive = self._alive[:0]
+            self._live = 0
+            self.compact()
@@ -0,0 +1,310 @@
+# infrastructure/bm25_index.py
+#
+# Local inverted index (BM25) over the chunk texts, for exact-match keywords (acronyms, product names,
+# certifications: "SAFe", "ISO 27001", "SAP S/4HANA", "RGPD") that dense retrieval tends to miss.
+# It is maintained at ingestion / deletion and persisted next to the LightRAG storages: a snapshot, and a
+# journal to which each change appends the new state of the chunks it touched (replayed on load). The
+# snapshot is rewritten, and the journal emptied, once the journal outgrows BM25_JOURNAL_MAX_RATIO of it.
+
+import os
+import re
+import json
+import math
+import asyncio
+import tempfile
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+INDEX_PATH = os.path.join("rag_storage", "bm25_index.json")
+CHUNKS_PATH = os.path.join("rag_storage", "kv_store_text_chunks.json")
+CHUNKS_DB_PATH = os.path.join("rag_storage", "kv_store_text_chunks.sqlite")  # KV_STORAGE=SqliteKVStorage
+
+# Journal size (share of the snapshot size, at least 1 MB) above which the snapshot is rewritten
+BM25_JOURNAL_MAX_RATIO = float(os.getenv("BM25_JOURNAL_MAX_RATIO", "0.25"))
+BM25_JOURNAL_MIN_BYTES = 1024 * 1024
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words joined by / . - + & stay one token ("s/4hana", "c++"), their parts are indexed too
+_TOKEN_RE = re.compile(r"\w+(?:[/.\-+&]\w+)*\+*")
+_PART_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-insensitive tokens."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    tokens = []
+    for token in _TOKEN_RE.findall(text):
+        tokens.append(token)
+        parts = _PART_RE.findall(token)
+        if len(parts) > 1 or (parts and parts[0] != token):
+            tokens.extend(parts)
+    return tokens
+
+
+class Bm25Index:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one writer of the files at a time, in the order of the changes
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term -> chunk_id -> tf
+        self._chunk_terms: Dict[str, Dict[str, int]] = {}  # chunk_id -> term -> tf
+        self._chunk_len: Dict[str, int] = {}
+        self._chunk_doc: Dict[str, str] = {}
+        self._doc_chunks: Dict[str, Set[str]] = defaultdict(set)
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._chunk_len)
+
+    # Updates
+
+    def _add(self, chunk_id: str, doc_id: str, term_freqs: Dict[str, int]) -> None:
+        if chunk_id in self._chunk_len:
+            self._remove(chunk_id)
+        for term, tf in term_freqs.items():
+            self._postings[term][chunk_id] = tf
+        length = sum(term_freqs.values())
+        self._chunk_terms[chunk_id] = term_freqs
+        self._chunk_len[chunk_id] = length
+        self._chunk_doc[chunk_id] = doc_id
+        self._doc_chunks[doc_id].add(chunk_id)
+        self._total_len += length
+
+    def _remove(self, chunk_id: str) -> None:
+        term_freqs = self._chunk_terms.pop(chunk_id, None)
+        if term_freqs is None:
+            return
+        for term in term_freqs:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._chunk_len.pop(chunk_id)
+        doc_id = self._chunk_doc.pop(chunk_id)
+        self._doc_chunks[doc_id].discard(chunk_id)
+        if not self._doc_chunks[doc_id]:
+            del self._doc_chunks[doc_id]
+
+    def add_chunks(self, chunks: Dict[str, Dict]) -> None:
+        """Index chunks given as chunk_id -> {"content", "full_doc_id"}."""
+        with self._lock:
+            for chunk_id, chunk in chunks.items():
+                self._add(chunk_id, chunk["full_doc_id"], dict(Counter(tokenize(chunk["content"]))))
+
+    def remove_chunks(self, chunk_ids: Iterable[str]) -> None:
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._remove(chunk_id)
+
+    def remove_doc(self, doc_id: str) -> List[str]:
+        return self.remove_docs([doc_id])
+
+    def remove_docs(self, doc_ids: Iterable[str]) -> List[str]:
+        """Returns the ids of the removed chunks."""
+        removed = []
+        with self._lock:
+            for doc_id in doc_ids:
+                for chunk_id in list(self._doc_chunks.get(doc_id, ())):
+                    self._remove(chunk_id)
+                    removed.append(chunk_id)
+        return removed
+
+    # Search
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        allowed_doc_ids: Optional[Set[str]] = None,
+        excluded_doc_ids: Optional[Set[str]] = None,
+        allowed_chunk_ids: Optional[Set[str]] = None,
+    ) -> List[Tuple[str, float, float]]:
+        """
+        BM25 search. Returns (chunk_id, score, coverage) sorted by score, where coverage is the share
+        of the distinct query terms found in the chunk. The allowed / excluded sets are checked before
+        scoring a chunk.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            n_chunks = len(self._chunk_len)
+            if n_chunks == 0:
+                return []
+            avg_len = self._total_len / n_chunks
+            scores: Dict[str, float] = defaultdict(float)
+            matched: Dict[str, int] = defaultdict(int)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    if allowed_chunk_ids is not None and chunk_id not in allowed_chunk_ids:
+                        continue
+                    if allowed_doc_ids is not None and self._chunk_doc[chunk_id] not in allowed_doc_ids:
+                        continue
+                    if excluded_doc_ids and self._chunk_doc[chunk_id] in excluded_doc_ids:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._chunk_len[chunk_id] / avg_len)
+                    scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    matched[chunk_id] += 1
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(chunk_id, score, matched[chunk_id] / len(terms)) for chunk_id, score in ranked]
+
+    def get_doc_id(self, chunk_id: str) -> Optional[str]:
+        return self._chunk_doc.get(chunk_id)
+
+    # Persistence
+
+    def _snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                chunk_id: {"doc": self._chunk_doc[chunk_id], "tf": term_freqs}
+                for chunk_id, term_freqs in self._chunk_terms.items()
+            }
+
+    def _write_snapshot(self, path: str) -> None:
+        # Called with _save_lock held. Unique temporary file, published by an atomic rename
+        data = self._snapshot()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # The snapshot holds every change of the journal (replaying it again would be harmless)
+        open(f"{path}.journal", "w").close()
+
+    def save(self, path: str = INDEX_PATH) -> None:
+        """Rewrite the whole index."""
+        with self._save_lock:
+            self._write_snapshot(path)
+
+    def log_changes(self, chunk_ids: Iterable[str], path: str = INDEX_PATH) -> None:
+        """
+        Append the current state of the given chunks (indexed or removed) to the journal. The state is read
+        and written under the same lock, so the journal always ends with the latest state of each chunk.
+        """
+        journal_path = f"{path}.journal"
+        with self._save_lock:
+            if not os.path.exists(path):
+                self._write_snapshot(path)
+                return
+            with self._lock:
+                added = {
+                    chunk_id: {"doc": self._chunk_doc[chunk_id], "tf": self._chunk_terms[chunk_id]}
+                    for chunk_id in chunk_ids if chunk_id in self._chunk_terms
+                }
+                removed = [chunk_id for chunk_id in chunk_ids if chunk_id not in self._chunk_terms]
+            with open(journal_path, "a+", encoding="utf-8") as f:
+                if f.tell() > 0:
+                    f.seek(f.tell() - 1)
+                    if f.read(1) != "\n":
+                        f.write("\n")  # end the line cut by a crash, which load() skips
+                f.write(json.dumps({"add": added, "remove": removed}, ensure_ascii=False) + "\n")
+            journal_size = os.path.getsize(journal_path)
+            if journal_size > max(BM25_JOURNAL_MIN_BYTES, BM25_JOURNAL_MAX_RATIO * os.path.getsize(path)):
+                self._write_snapshot(path)
+
+    @classmethod
+    def load(cls, path: str = INDEX_PATH) -> "Bm25Index":
+        index = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for chunk_id, entry in data.items():
+            index._add(chunk_id, entry["doc"], entry["tf"])
+        journal_path = f"{path}.journal"
+        if os.path.exists(journal_path):
+            with open(journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        change = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # line cut by a crash
+                    for chunk_id in change["remove"]:
+                        index._remove(chunk_id)
+                    for chunk_id, entry in change["add"].items():
+                        index._add(chunk_id, entry["doc"], entry["tf"])
+        return index
+
+    @classmethod
+    def build_from_chunks(cls, chunks_path: str = CHUNKS_PATH, chunks_db_path: str = CHUNKS_DB_PATH) -> "Bm25Index":
+        """Build the index from the LightRAG text chunks store (JSON file or SQLite database)."""
+        index = cls()
+        chunks = None
+        if os.getenv("KV_STORAGE") == "SqliteKVStorage" and os.path.exists(chunks_db_path):
+            from infrastructure.binary_store import SqliteKV
+            kv = SqliteKV(chunks_db_path)
+            chunks = dict(kv.items())
+            kv.close()
+        elif os.path.exists(chunks_path):
+            with open(chunks_path, "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+        if chunks:
+            index.add_chunks({
+                chunk_id: chunk for chunk_id, chunk in chunks.items()
+                if chunk.get("content") and chunk.get("full_doc_id")
+            })
+        return index
+
+
+_index: Optional[Bm25Index] = None
+_index_lock = threading.Lock()
+
+
+def get_bm25_index() -> Bm25Index:
+    """The index of the corpus, loaded from disk (or built from the text chunks the first time)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if os.path.exists(INDEX_PATH):
+                    _index = Bm25Index.load()
+                else:
+                    _index = Bm25Index.build_from_chunks()
+                    _index.save()
+    return _index
+
+
+def reload_bm25_index() -> None:
+    """Load the index again from disk (it was rewritten by another process)."""
+    global _index
+    if os.path.exists(INDEX_PATH):
+        index = Bm25Index.load()
+        with _index_lock:
+            _index = index
+
+
+# Maintenance helpers (the changes are written to the journal in a thread, off the event loop)
+
+async def index_chunks(chunks: Dict[str, Dict]) -> None:
+    index = get_bm25_index()
+    index.add_chunks(chunks)
+    await asyncio.to_thread(index.log_changes, list(chunks))
+
+
+async def unindex_chunks(chunk_ids: Iterable[str]) -> None:
+    index = get_bm25_index()
+    chunk_ids = list(chunk_ids)
+    index.remove_chunks(chunk_ids)
+    await asyncio.to_thread(index.log_changes, chunk_ids)
+
+
+async def unindex_doc(doc_id: str) -> None:
+    index = get_bm25_index()
+    await asyncio.to_thread(index.log_changes, index.remove_doc(doc_id))
+
+
+async def unindex_docs(doc_ids: Iterable[str]) -> None:
+    index = get_bm25_index()
+    await asyncio.to_thread(index.log_changes, index.remove_docs(doc_ids))
@@ -0,0 +1,81 @@
+# infrastructure/chunk_store.py
+#
+# Direct access to the LightRAG chunk storages (text_chunks, chunks_vdb, full_docs, doc_status),
+# used to update some chunks of a document without running the whole LightRAG insert pipeline.
+
+from datetime import datetime, timezone
+from typing import Dict, List
+from infrastructure.lightrag_engine import init_rag
+
+
+def compute_chunk_id(content: str) -> str:
+    """Same id as the one LightRAG gives to a chunk (hash of its stripped content)."""
+    from lightrag.utils import compute_mdhash_id
+    return compute_mdhash_id(content.strip(), prefix="chunk-")
+
+
+def _count_tokens(lightrag, content: str) -> int:
+    tokenizer = getattr(lightrag, "tokenizer", None)
+    if tokenizer is not None:
+        return len(tokenizer.encode(content))
+    return len(content) // 4
+
+
+async def upsert_chunks(doc_id: str, file_name: str, chunks: Dict[int, str]) -> List[str]:
+    """
+    Write chunks of a document (chunk_order_index -> content) into text_chunks and chunks_vdb.
+    Only these chunks are embedded. Returns their ids.
+    """
+    if not chunks:
+        return []
+    lightrag = await init_rag()
+    records = {}
+    for order_index, content in chunks.items():
+        content = content.strip()
+        records[compute_chunk_id(content)] = {
+            "tokens": _count_tokens(lightrag, content),
+            "content": content,
+            "chunk_order_index": order_index,
+            "full_doc_id": doc_id,
+            "file_path": file_name,
+        }
+    await lightrag.chunks_vdb.upsert(records)
+    await lightrag.text_chunks.upsert(records)
+    return list(records.keys())
+
+
+async def delete_chunks(chunk_ids: List[str]) -> None:
+    if not chunk_ids:
+        return
+    lightrag = await init_rag()
+    await lightrag.chunks_vdb.delete(chunk_ids)
+    await lightrag.text_chunks.delete(chunk_ids)
+
+
+async def update_document_record(doc_id: str, file_name: str, content: str, chunk_ids: List[str]) -> None:
+    """Keep full_docs and doc_status consistent with the chunks of the document."""
+    lightrag = await init_rag()
+    await lightrag.full_docs.upsert({doc_id: {"content": content, "file_path": file_name}})
+
+    now = datetime.now(timezone.utc).isoformat()
+    status = await lightrag.doc_status.get_by_id(doc_id) or {
+        # Document written without the LightRAG pipeline (vector-first ingestion)
+        "status": "processed",
+        "content_summary": content[:250],
+        "created_at": now,
+    }
+    status.update({
+        "content_length": len(content),
+        "chunks_count": len(chunk_ids),
+        "chunks_list": chunk_ids,
+        "file_path": file_name,
+        "updated_at": now,
+    })
+    await lightrag.doc_status.upsert({doc_id: status})
+
+
+async def persist() -> None:
+    """Flush the chunk storages to disk (what LightRAG does at the end of an insert)."""
+    lightrag = await init_rag()
+    for storage in (lightrag.full_docs, lightrag.doc_status, lightrag.text_chunks, lightrag.chunks_vdb):
+        await storage.index_done_callback()
@@ -0,0 +1,187 @@
+# infrastructure/corpus_sync.py
+#
+# Coordination of the processes sharing rag_storage/ (uvicorn --workers N).
+# - Writes (add / update / delete a document, graph backfill) are serialized by an exclusive lock on
+#   rag_storage/.corpus.lock: one writer at a time across all the workers.
+# - Each write bumps the corpus version (rag_storage/corpus_version.json).
+# - Before a request, a worker whose corpus version is older reloads its in-memory view (LightRAG storages,
+#   document registry, tombstones, BM25 index) under a shared lock. If a write is in progress, it keeps serving its
+#   current snapshot and reloads on a later request.
+
+import os
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from infrastructure.logger import debug
+from infrastructure.lightrag_engine import WORKDIR, reload_rag
+from infrastructure.doc_registry import reload_registry
+from infrastructure.tombstones import reload_tombstones
+from infrastructure.bm25_index import reload_bm25_index
+
+LOCK_PATH = os.path.join(WORKDIR, ".corpus.lock")
+VERSION_PATH = os.path.join(WORKDIR, "corpus_version.json")
+
+# Minimum number of seconds between two checks of the corpus version by a worker
+CORPUS_CHECK_INTERVAL = float(os.getenv("CORPUS_CHECK_INTERVAL", "1.0"))
+
+try:
+    import fcntl
+
+    def _lock_file(f, shared: bool, blocking: bool) -> bool:
+        flags = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB)
+        try:
+            fcntl.flock(f.fileno(), flags)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock_file(f) -> None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+except ImportError:  # Windows: no shared locks, readers take the exclusive lock too
+    import msvcrt
+
+    def _lock_file(f, shared: bool, blocking: bool) -> bool:
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(0.05)
+
+    def _unlock_file(f) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """Lock on a file shared by the processes (each acquisition opens its own file descriptor)."""
+
+    def __init__(self, path: str = LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    def acquire(self, shared: bool = False, blocking: bool = True) -> bool:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a+")
+        if not _lock_file(f, shared, blocking):
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            _unlock_file(self._file)
+            self._file.close()
+            self._file = None
+
+
+async def _acquire(lock: FileLock, shared: bool = False, blocking: bool = True) -> bool:
+    """
+    Acquire the lock in a thread. The thread cannot be interrupted: if the waiting task is cancelled, the
+    acquisition goes on and the lock is released as soon as it is obtained, instead of staying held.
+    """
+    acquiring = asyncio.ensure_future(asyncio.to_thread(lock.acquire, shared, blocking))
+    try:
+        return await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        def _release_if_acquired(task: asyncio.Future) -> None:
+            if not task.cancelled() and task.exception() is None and task.result():
+                lock.release()
+
+        acquiring.add_done_callback(_release_if_acquired)
+        raise
+
+
+def read_corpus_version() -> int:
+    try:
+        with open(VERSION_PATH, "r", encoding="utf-8") as f:
+            return int(json.load(f)["version"])
+    except (FileNotFoundError, ValueError, KeyError):
+        return 0
+
+
+def _bump_corpus_version() -> int:
+    version = read_corpus_version() + 1
+    tmp_path = f"{VERSION_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "pid": os.getpid(), "updated_at": time.time()}, f)
+    os.replace(tmp_path, VERSION_PATH)
+    return version
+
+
+_local_version = read_corpus_version()  # version of the corpus held in memory by this process
+_last_check = 0.0
+_write_lock = asyncio.Lock()  # one writer per process (the file lock serializes the processes)
+_refresh_lock = asyncio.Lock()
+_writer_task = None  # task holding the write access of this process
+
+
+async def _reload(version: int) -> None:
+    global _local_version
+    start = time.time()
+    await reload_rag()
+    reload_registry()
+    reload_tombstones()
+    await asyncio.to_thread(reload_bm25_index)
+    _local_version = version
+    debug(f"[INFO] Corpus reloaded at version {version} in {time.time() - start:.2f}s")
+
+
+async def refresh_if_stale(force: bool = False) -> bool:
+    """
+    Reload the in-memory corpus if another process wrote a newer version.
+    Never waits for a writer: returns False (current snapshot kept) if a write is in progress.
+    """
+    global _last_check
+    if _writer_task is not None:
+        return True  # a write of this process is in progress, the memory already holds the latest version
+    now = time.monotonic()
+    if not force and now - _last_check < CORPUS_CHECK_INTERVAL:
+        return True
+    _last_check = now
+    if read_corpus_version() == _local_version:
+        return True
+
+    async with _refresh_lock:
+        lock = FileLock()
+        if not await _acquire(lock, shared=True, blocking=False):
+            return False
+        try:
+            version = read_corpus_version()
+            if version != _local_version:
+                await _reload(version)
+        finally:
+            lock.release()
+    return True
+
+
+@asynccontextmanager
+async def corpus_write():
+    """
+    Exclusive write access to rag_storage/ across all the processes. The in-memory corpus is brought
+    up to date before the write, and the corpus version is bumped after it. Re-entrant.
+    """
+    global _local_version, _writer_task
+    if _writer_task is not None and _writer_task is asyncio.current_task():
+        yield
+        return
+
+    async with _write_lock:
+        lock = FileLock()
+        await _acquire(lock)
+        _writer_task = asyncio.current_task()
+        try:
+            # Never write from a stale view: the files would be overwritten with the old data
+            version = read_corpus_version()
+            if version != _local_version:
+                await _reload(version)
+            yield
+        finally:
+            _writer_task = None
+            _local_version = _bump_corpus_version()
+            lock.release()
@@ -0,0 +1,83 @@
+# infrastructure/doc_registry.py
+
+import os
+import json
+import threading
+from typing import Dict, Optional
+
+# Per-document information kept next to the LightRAG storages (slide manifest, ...)
+REGISTRY_PATH = os.path.join("rag_storage", "doc_registry.json")
+
+_registry: Optional[Dict[str, Dict]] = None
+_generation = 0  # changes with every write or reload, for the views derived from the registry
+_lock = threading.Lock()
+
+
+def _load() -> Dict[str, Dict]:
+    global _registry
+    if _registry is None:
+        if os.path.exists(REGISTRY_PATH):
+            with open(REGISTRY_PATH, "r", encoding="utf-8") as f:
+                _registry = json.load(f)
+        else:
+            _registry = {}
+    return _registry
+
+
+def _save() -> None:
+    global _generation
+    _generation += 1
+    # Write to a temporary file then rename it, so a crash never leaves a truncated registry
+    os.makedirs(os.path.dirname(REGISTRY_PATH), exist_ok=True)
+    tmp_path = f"{REGISTRY_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_registry, f, ensure_ascii=False)
+    os.replace(tmp_path, REGISTRY_PATH)
+
+
+def get_doc(doc_id: str) -> Optional[Dict]:
+    with _lock:
+        entry = _load().get(doc_id)
+        return dict(entry) if entry is not None else None
+
+
+def list_docs() -> Dict[str, Dict]:
+    with _lock:
+        return {doc_id: dict(entry) for doc_id, entry in _load().items()}
+
+
+def update_doc(doc_id: str, **fields) -> Dict:
+    """Create or update the entry of a document with the given fields."""
+    with _lock:
+        registry = _load()
+        entry = registry.setdefault(doc_id, {})
+        entry.update(fields)
+        _save()
+        return dict(entry)
+
+
+def remove_doc(doc_id: str) -> None:
+    with _lock:
+        if _load().pop(doc_id, None) is not None:
+            _save()
+
+
+def remove_docs(doc_ids) -> None:
+    with _lock:
+        registry = _load()
+        removed = [registry.pop(doc_id, None) for doc_id in doc_ids]
+        if any(entry is not None for entry in removed):
+            _save()
+
+
+def reload_registry() -> None:
+    """Drop the in-memory registry, it is read again from disk on next access (written by another process)."""
+    global _registry, _generation
+    with _lock:
+        _registry = None
+        _generation += 1
+
+
+def registry_generation() -> int:
+    """Counter changed by every write or reload of the registry (cache key of the derived indexes)."""
+    return _generation
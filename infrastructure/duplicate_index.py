@@ -0,0 +1,119 @@
+# infrastructure/duplicate_index.py
+#
+# Corpus-wide view of the near-duplicate slides, derived from the slide manifests of the document registry.
+# A slide that is a near-duplicate of an already ingested slide gets no chunk of its own: its manifest entry
+# points to the chunk of the first ingested copy ("duplicate_of"), which it shares (caption, vector, BM25
+# entry, graph). The index gives:
+# - the canonical chunks (slides with their own chunk and a fingerprint), searched by dHash band
+# - the aliases of each canonical chunk (document, slide), used to credit every document holding the
+#   slide when its chunk is retrieved
+# - the slide number of each chunk in its document (the chunk_order_index of a chunk is not its slide
+#   number once a slide of the document has no chunk of its own)
+# It is rebuilt after each change of the registry (writes and reloads by corpus_sync).
+
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from domain.slide_fingerprint import SlideFingerprint, dhash_bands, hamming_distance, is_near_duplicate
+from infrastructure.doc_registry import list_docs, registry_generation
+from infrastructure.tombstones import get_tombstoned_ids
+
+# Near-duplicate slides are stored once (SLIDE_DEDUP=false: every slide gets its own chunk)
+SLIDE_DEDUP = os.getenv("SLIDE_DEDUP", "true").lower() == "true"
+
+
+@dataclass(frozen=True)
+class SlideAlias:
+    """A slide of a document that shares the chunk of a near-duplicate slide."""
+    doc_id: str
+    slide: int
+    file_name: str
+
+
+@dataclass
+class _Index:
+    generation: int
+    canonicals: Dict[str, Tuple[str, SlideFingerprint]]  # chunk_id -> (doc_id, fingerprint)
+    bands: Dict[Tuple[int, int], List[str]]              # dHash band -> canonical chunk ids
+    aliases: Dict[str, List[SlideAlias]]                  # canonical chunk id -> slides sharing it
+    slides: Dict[Tuple[str, str], int]                    # (doc_id, chunk id) -> slide number
+
+
+_index: Optional[_Index] = None
+_lock = threading.Lock()
+
+
+def _build(generation: int) -> _Index:
+    canonicals, bands, aliases, slides = {}, defaultdict(list), defaultdict(list), {}
+    for doc_id, entry in list_docs().items():
+        for slide in entry.get("slides", []):
+            if slide.get("duplicate_of"):
+                aliases[slide["duplicate_of"]].append(SlideAlias(doc_id, slide["slide"], entry.get("file_name", "")))
+                continue
+            if slide.get("chunk_id"):
+                slides[(doc_id, slide["chunk_id"])] = slide["slide"]
+            fingerprint = SlideFingerprint.from_dict(slide.get("fingerprint"))
+            if fingerprint is None or not slide.get("chunk_id"):
+                continue  # slides ingested before fingerprints existed are never matched
+            canonicals[slide["chunk_id"]] = (doc_id, fingerprint)
+            for band in dhash_bands(fingerprint.dhash):
+                bands[band].append(slide["chunk_id"])
+    return _Index(generation, canonicals, dict(bands), dict(aliases), slides)
+
+
+def _get_index() -> _Index:
+    global _index
+    with _lock:
+        generation = registry_generation()
+        if _index is None or _index.generation != generation:
+            _index = _build(generation)
+        return _index
+
+
+def find_canonical(fingerprint: SlideFingerprint, exclude_doc_id: Optional[str] = None) -> Optional[str]:
+    """
+    Chunk id of the closest ingested near-duplicate of a slide, or None.
+    The slides of exclude_doc_id and of the deleted documents waiting for compaction are not candidates.
+    """
+    index = _get_index()
+    excluded = get_tombstoned_ids()
+    candidates = {chunk_id for band in dhash_bands(fingerprint.dhash) for chunk_id in index.bands.get(band, [])}
+    best, best_distance = None, None
+    for chunk_id in candidates:
+        doc_id, other = index.canonicals[chunk_id]
+        if doc_id == exclude_doc_id or doc_id in excluded or not is_near_duplicate(fingerprint, other):
+            continue
+        distance = hamming_distance(fingerprint.dhash, other.dhash)
+        if best is None or (distance, chunk_id) < (best_distance, best):
+            best, best_distance = chunk_id, distance
+    return best
+
+
+def get_slide_of(doc_id: str, chunk_id: str) -> Optional[int]:
+    """Slide number of the chunk in the manifest of its document, None if the manifest does not list it."""
+    return _get_index().slides.get((doc_id, chunk_id))
+
+
+def get_duplicate_aliases() -> Dict[str, List[SlideAlias]]:
+    """canonical chunk id -> slides of other documents (or of the same one) sharing it."""
+    return _get_index().aliases
+
+
+def get_aliases_of(chunk_ids, excluded_doc_ids=()) -> Dict[str, List[SlideAlias]]:
+    """Slides sharing the given chunks, outside excluded_doc_ids (chunks without aliases are left out)."""
+    excluded = set(excluded_doc_ids)
+    aliases = _get_index().aliases
+    found = {chunk_id: [a for a in aliases.get(chunk_id, []) if a.doc_id not in excluded] for chunk_id in set(chunk_ids)}
+    return {chunk_id: slides for chunk_id, slides in found.items() if slides}
+
+
+def get_duplicate_stats() -> dict:
+    """Slides stored once for several copies, across the corpus."""
+    index = _get_index()
+    return {
+        "canonical_slides": len(index.canonicals),
+        "shared_slides": sum(1 for chunk_id in index.aliases if chunk_id in index.canonicals),
+        "duplicate_slides": sum(len(aliases) for aliases in index.aliases.values()),
+    }
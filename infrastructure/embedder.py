@@ -1,18 +1,171 @@
 # services/embedder.py
 
-from sentence_transformers import SentenceTransformer
+import os
+import asyncio
+import threading
+import contextvars
 
 # Definition of the function to call the embedding model (here local)
 
-model = SentenceTransformer("intfloat/multilingual-e5-small")
+MODEL_NAME = "intfloat/multilingual-e5-small"
+
+# Embedding backend : "torch" (sentence-transformers, fp32) or "onnx" (ONNX Runtime, int8 dynamic quantization)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# Number of CPU threads used by the backend (0 = library default)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+# Folder produced by scripts/export_onnx_embedder.py
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/multilingual-e5-small-onnx-int8")
+ONNX_MODEL_FILE = "model_quantized.onnx"
+
+# E5 models expect "query: " / "passage: " prefixes. Off by default: the existing indexes were built without
+# them, and the vectors of the stored chunks must be computed the same way as the queries. Turn it on only
+# with an empty rag_storage/ (or after re-ingesting every document).
+E5_PREFIXES = os.getenv("E5_PREFIXES", "false").lower() == "true"
+QUERY_PREFIX = "query: "
+PASSAGE_PREFIX = "passage: "
+# Passages are sorted by length and encoded in batches of this size (less padding per batch)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+# Set while LightRAG answers an /ask query: the texts it embeds then are queries, not stored content
+query_embedding_var: contextvars.ContextVar[bool] = contextvars.ContextVar("query_embedding", default=False)
+
+
+class TorchBackend:
+    """fp32 sentence-transformers model (mean pooling + normalization are part of the model)."""
+
+    def __init__(self, model_name: str = MODEL_NAME, threads: int = EMBEDDING_THREADS):
+        self.model_name = model_name
+        self.threads = threads
+        self.model = None
+
+    def load(self):
+        from sentence_transformers import SentenceTransformer
+        if self.threads > 0:
+            import torch
+            torch.set_num_threads(self.threads)
+        self.model = SentenceTransformer(self.model_name)
+
+    def encode(self, texts):
+        # The batch is already formed by LocalEmbeddingWrapper
+        return self.model.encode(texts, batch_size=max(len(texts), 1), convert_to_numpy=True)
+
+
+class OnnxBackend:
+    """int8 quantized export of the same model, run with ONNX Runtime (mean pooling + L2 normalization)."""
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, threads: int = EMBEDDING_THREADS, max_length: int = 512):
+        self.model_dir = model_dir
+        self.threads = threads
+        self.max_length = max_length
+        self.session = None
+        self.tokenizer = None
+
+    def load(self):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_path = os.path.join(self.model_dir, ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found, run `python scripts/export_onnx_embedder.py` to create it"
+            )
+        options = ort.SessionOptions()
+        if self.threads > 0:
+            options.intra_op_num_threads = self.threads
+            options.inter_op_num_threads = 1
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts):
+        import numpy as np
+
+        encoded = self.tokenizer(
+            list(texts), padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        inputs = {k: v.astype(np.int64) for k, v in encoded.items() if k in self._input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over the non-padding tokens, then L2 normalization (same as the sentence-transformers model)
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+
+def create_backend(name: str = EMBEDDING_BACKEND):
+    if name == "torch":
+        return TorchBackend()
+    if name == "onnx":
+        return OnnxBackend()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{name}' (expected 'torch' or 'onnx')")
+
 
 class LocalEmbeddingWrapper:
-    def __init__(self, model):
-        self.model = model
+    def __init__(self, backend):
+        self.backend = backend
         self.embedding_dim = 384  # to change with the model => print(model.get_sentence_embedding_dimension())
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # LightRAG deep-copies its configuration (dataclasses.asdict), embedding function included:
+        # the lock and the loaded model are shared, not copied
+        return self
+
+    def get_model(self):
+        """Load the backend on first use (torch / onnxruntime are only imported here)."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.backend.load()
+                    self._loaded = True
+        return self.backend
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    @staticmethod
+    def _with_prefix(prefix: str, texts):
+        if not E5_PREFIXES:
+            return list(texts)
+        return [t if t.startswith((QUERY_PREFIX, PASSAGE_PREFIX)) else prefix + t for t in texts]
+
+    def _encode_sorted(self, texts):
+        """Encode texts in batches of similar length, and return the vectors in the original order."""
+        import numpy as np
+
+        backend = self.get_model()
+        vectors = np.zeros((len(texts), self.embedding_dim), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), EMBEDDING_BATCH_SIZE):
+            batch = order[start:start + EMBEDDING_BATCH_SIZE]
+            vectors[batch] = backend.encode([texts[i] for i in batch])
+        return vectors
+
+    async def embed_queries(self, texts):
+        """Encode search queries ("query: " prefix). Returns a numpy array."""
+        return await asyncio.to_thread(self._encode_sorted, self._with_prefix(QUERY_PREFIX, texts))
+
+    async def embed_passages(self, texts):
+        """Encode stored content ("passage: " prefix). Returns a numpy array."""
+        return await asyncio.to_thread(self._encode_sorted, self._with_prefix(PASSAGE_PREFIX, texts))
+
+    async def embed_weighted_query(self, texts, weights):
+        """
+        One query vector for several weighted keywords: normalized weighted sum of the keyword embeddings
+        (instead of repeating the keywords in a single query string).
+        """
+        import numpy as np
+
+        vectors = await self.embed_queries(texts)
+        weighted = (np.asarray(weights, dtype=np.float32)[:, None] * vectors).sum(axis=0)
+        return weighted / max(float(np.linalg.norm(weighted)), 1e-12)
 
     async def __call__(self, texts):
-        # Not really async, but simulated (OK for LightRAG)
-        return self.model.encode(texts, convert_to_numpy=True).tolist()
+        # Called by LightRAG for the content it stores (chunks, entities, relations) and for its own /ask queries
+        if query_embedding_var.get():
+            return (await self.embed_queries(texts)).tolist()
+        return (await self.embed_passages(texts)).tolist()
 
-embedder = LocalEmbeddingWrapper(model)
\ No newline at end of file
+embedder = LocalEmbeddingWrapper(create_backend())
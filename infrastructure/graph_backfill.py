@@ -0,0 +1,150 @@
+# infrastructure/graph_backfill.py
+#
+# Background extraction of the knowledge graph (used by /ask) for documents ingested in vector-first
+# mode: their chunks are matchable right away, the graph is built later with its own concurrency limit.
+
+import os
+import asyncio
+import time
+from typing import List, Optional
+from infrastructure.logger import debug
+from infrastructure.doc_registry import get_doc, update_doc, list_docs
+from infrastructure.lightrag_engine import extract_graph_for_chunks, merge_graph_results
+from infrastructure.corpus_sync import corpus_write
+from infrastructure.llm_dispatcher import llm_priority_var, BULK
+from infrastructure.tombstones import is_tombstoned
+
+# Number of documents whose graph is extracted at the same time
+GRAPH_BACKFILL_CONCURRENCY = int(os.getenv("GRAPH_BACKFILL_CONCURRENCY", "1"))
+# Seconds after which a document still marked running by a worker can be taken over by another one
+GRAPH_BACKFILL_LEASE = float(os.getenv("GRAPH_BACKFILL_LEASE", "3600"))
+
+# graph_status of a document: "pending" -> "running" -> "complete" (or "failed")
+PENDING, RUNNING, COMPLETE, FAILED = "pending", "running", "complete", "failed"
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+
+
+def _set_status(doc_id: str, **fields) -> None:
+    # The document may have been deleted in the meantime
+    if get_doc(doc_id) is not None:
+        update_doc(doc_id, **fields)
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        return True  # os.kill would terminate the process: rely on the lease duration only
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _claim_is_live(entry: dict) -> bool:
+    """A document marked running is being extracted by a live worker (of this or another process)."""
+    claim = entry.get("graph_claim")
+    if entry.get("graph_status") != RUNNING or not claim:
+        return False
+    if time.time() - claim["at"] > GRAPH_BACKFILL_LEASE:
+        return False
+    return claim["pid"] == os.getpid() or _pid_alive(claim["pid"])
+
+
+async def _backfill(doc_id: str) -> None:
+    # Graph writes are corpus writes, but the extraction (LLM calls) is not: it runs without the write access,
+    # which is only taken to claim the document, then to merge the result. Every worker process may queue the
+    # same document: the claim (pid and time) makes the others skip it while it is extracted
+    async with corpus_write():
+        entry = get_doc(doc_id)
+        if entry is None or entry.get("graph_status") == COMPLETE or is_tombstoned(doc_id) or _claim_is_live(entry):
+            return  # deleted, already processed by an earlier queue entry, or being processed
+        chunk_ids = entry.get("graph_pending_chunks") or [
+            s["chunk_id"] for s in entry.get("slides", []) if s["chunk_id"]  # duplicate slides have no chunk
+        ]
+        claim = {"pid": os.getpid(), "at": time.time()}
+        _set_status(doc_id, graph_status=RUNNING, graph_claim=claim)
+    start = time.time()
+    try:
+        results = await extract_graph_for_chunks(chunk_ids)
+        async with corpus_write():
+            current = get_doc(doc_id)
+            if current is None or is_tombstoned(doc_id) or current.get("graph_claim") != claim:
+                return  # deleted during the extraction, or the lease expired and another worker took over
+            processed = await merge_graph_results(results, entry.get("file_name", ""))
+            # Chunks queued in the meantime (e.g. by an update) stay pending: their queue entry found the
+            # document claimed, so it is queued again
+            done = set(chunk_ids)
+            remaining = [c for c in current.get("graph_pending_chunks", []) if c not in done]
+            _set_status(
+                doc_id, graph_status=PENDING if remaining else COMPLETE, graph_pending_chunks=remaining, graph_claim=None
+            )
+        if remaining:
+            _queue.put_nowait(doc_id)
+        debug(f"[INFO] Graph of {doc_id} extracted ({processed} chunks) in {time.time() - start:.2f}s")
+    except Exception as e:
+        async with corpus_write():
+            _set_status(doc_id, graph_status=FAILED, graph_claim=None)
+        debug(f"[ERROR] Graph extraction failed for {doc_id}: {e}")
+
+
+async def _worker() -> None:
+    llm_priority_var.set(BULK)  # the worker task has its own context
+    while True:
+        doc_id = await _queue.get()
+        try:
+            await _backfill(doc_id)
+        finally:
+            _queue.task_done()
+
+
+def _ensure_workers() -> None:
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue()
+    if not _workers:
+        _workers.extend(asyncio.create_task(_worker()) for _ in range(max(1, GRAPH_BACKFILL_CONCURRENCY)))
+
+
+async def enqueue_graph_backfill(doc_id: str, chunk_ids: Optional[List[str]] = None) -> None:
+    """
+    Queue the graph extraction of a document (of the given chunks only, e.g. the slides changed
+    by an update, otherwise of all its chunks).
+    """
+    _ensure_workers()
+    async with corpus_write():
+        entry = get_doc(doc_id)
+        if entry is None:
+            return
+        fields = {}
+        if not _claim_is_live(entry):
+            fields["graph_status"] = PENDING
+        if chunk_ids is not None:
+            fields["graph_pending_chunks"] = list(dict.fromkeys(entry.get("graph_pending_chunks", []) + chunk_ids))
+        if fields:
+            update_doc(doc_id, **fields)
+    _queue.put_nowait(doc_id)
+
+
+async def resume_graph_backfill() -> int:
+    """
+    Queue the documents whose graph is not complete (left by the previous run, or by another worker).
+    Documents claimed by a live worker are left to it.
+    """
+    async with corpus_write():
+        docs = [
+            doc_id for doc_id, entry in list_docs().items()
+            if entry.get("graph_status") == PENDING or (entry.get("graph_status") == RUNNING and not _claim_is_live(entry))
+        ]
+        for doc_id in docs:
+            await enqueue_graph_backfill(doc_id)
+    return len(docs)
+
+
+def stop_graph_backfill() -> None:
+    for worker in _workers:
+        worker.cancel()
+    _workers.clear()
@@ -0,0 +1,71 @@
+# infrastructure/hybrid_search.py
+
+import os
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional
+from infrastructure.lightrag_engine import init_rag, query_chunks_by_vector, ChunkFilter
+from infrastructure.bm25_index import get_bm25_index
+from infrastructure.tombstones import get_tombstoned_ids
+
+# Retrieval used by /match : "dense" (vector search only) or "hybrid" (vector search + BM25, fused)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+
+# Reciprocal rank fusion constant
+RRF_K = 60
+# A BM25 hit is given a similarity in this range (the range normalized by the /match scoring),
+# proportional to its score relative to the best hit and to the share of the query terms it contains
+SPARSE_SIM_MIN = 0.7
+SPARSE_SIM_MAX = 0.9
+
+
+async def query_chunks_hybrid(
+        query_text: str, query_vector, top_k: int = 30, chunk_filter: Optional[ChunkFilter] = None
+        ) -> List[Dict]:
+    """
+    Run the vector search and the BM25 search in parallel and fuse them (reciprocal rank fusion).
+    Returns the same records as query_chunks_by_vector; the "distance" of a chunk is the best of its
+    dense similarity and its BM25-derived similarity. Both searches only score the chunks of chunk_filter.
+    """
+    excluded = get_tombstoned_ids()  # deleted documents waiting for compaction
+    allowed = chunk_filter.chunk_ids if chunk_filter is not None else None
+    dense, sparse = await asyncio.gather(
+        query_chunks_by_vector(query_vector, top_k=top_k, chunk_filter=chunk_filter),
+        asyncio.to_thread(
+            lambda: get_bm25_index().search(query_text, top_k, excluded_doc_ids=excluded, allowed_chunk_ids=allowed)
+        ),
+    )
+
+    records: Dict[str, Dict] = {}
+    rrf: Dict[str, float] = defaultdict(float)
+    for rank, record in enumerate(dense):
+        records[record["id"]] = record
+        rrf[record["id"]] += 1 / (RRF_K + rank + 1)
+
+    sparse_only: Dict[str, float] = {}
+    best_score = sparse[0][1] if sparse else 0.0
+    for rank, (chunk_id, score, coverage) in enumerate(sparse):
+        rrf[chunk_id] += 1 / (RRF_K + rank + 1)
+        sim = SPARSE_SIM_MIN + (SPARSE_SIM_MAX - SPARSE_SIM_MIN) * coverage * score / best_score
+        if chunk_id in records:
+            records[chunk_id]["distance"] = max(records[chunk_id]["distance"], sim)
+        else:
+            sparse_only[chunk_id] = sim
+
+    ranked = sorted(rrf, key=rrf.get, reverse=True)[:top_k]
+
+    # Content of the chunks only found by BM25
+    missing = [chunk_id for chunk_id in ranked if chunk_id not in records]
+    if missing:
+        lightrag = await init_rag()
+        for chunk_id, chunk in zip(missing, await lightrag.text_chunks.get_by_ids(missing)):
+            if chunk:
+                records[chunk_id] = {
+                    "id": chunk_id,
+                    "full_doc_id": chunk["full_doc_id"],
+                    "content": chunk["content"],
+                    "file_path": chunk.get("file_path"),
+                    "distance": sparse_only[chunk_id],
+                }
+
+    return [records[chunk_id] for chunk_id in ranked if chunk_id in records]
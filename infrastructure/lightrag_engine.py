@@ -1,47 +1,335 @@
 #infrastructure/lightrag_engine.py
 
+import os
 import time
-from lightrag import LightRAG
-from infrastructure.embedder import embedder
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, FrozenSet, Optional
+from infrastructure.embedder import embedder, EMBEDDING_BATCH_SIZE
 from infrastructure.azure_llm import azure_llm
+from infrastructure.llm_dispatcher import LLM_MAX_CONCURRENCY
 from infrastructure.logger import debug
-from lightrag.kg.shared_storage import initialize_pipeline_status
+from infrastructure.tombstones import get_tombstoned_ids
+from infrastructure.doc_registry import get_doc, registry_generation
 import json
 
+if TYPE_CHECKING:
+    from lightrag import LightRAG
+
 WORKDIR = "rag_storage"
 
-_lightrag: LightRAG | None = None
+# Storage backends: LightRAG's JSON files (default), or SQLite records and memory-mapped vectors
+# (SqliteKVStorage / MmapVectorDBStorage, see lightrag_storages.py and scripts/migrate_json_storage.py)
+KV_STORAGE = os.getenv("KV_STORAGE", "JsonKVStorage")
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "NanoVectorDBStorage")
+
+_lightrag: "LightRAG | None" = None
+_init_lock = asyncio.Lock()
+
+# Set while LightRAG answers a /ask query: the chunks of tombstoned documents are hidden from it
+tombstone_filter_var: contextvars.ContextVar[bool] = contextvars.ContextVar("tombstone_filter", default=False)
+
+def _install_tombstone_filter(lightrag) -> None:
+    """Wrap the chunk reads of LightRAG so that queries skip the documents deleted but not yet compacted."""
+    vdb_query = lightrag.chunks_vdb.query
+    get_by_ids = lightrag.text_chunks.get_by_ids
+
+    async def query(query, top_k, *args, **kwargs):
+        if not tombstone_filter_var.get():
+            return await vdb_query(query, top_k, *args, **kwargs)
+        excluded = get_tombstoned_ids()
+        fetch_k = top_k + _count_excluded_chunks(excluded) if excluded else top_k
+        results = await vdb_query(query, fetch_k, *args, **kwargs)
+        return [r for r in results if r.get("full_doc_id") not in excluded][:top_k]
 
-async def init_rag() -> LightRAG:
+    async def get_chunks_by_ids(ids, *args, **kwargs):
+        records = await get_by_ids(ids, *args, **kwargs)
+        if not tombstone_filter_var.get():
+            return records
+        excluded = get_tombstoned_ids()
+        return [None if r and r.get("full_doc_id") in excluded else r for r in records]
+
+    lightrag.chunks_vdb.query = query
+    lightrag.text_chunks.get_by_ids = get_chunks_by_ids
+
+def _register_storages() -> None:
+    """Make the storages of lightrag_storages.py selectable by name, like the built-in ones."""
+    from lightrag import kg
+
+    for storage_type, name in (("KV_STORAGE", "SqliteKVStorage"), ("VECTOR_STORAGE", "MmapVectorDBStorage")):
+        kg.STORAGES[name] = "infrastructure.lightrag_storages"
+        kg.STORAGE_ENV_REQUIREMENTS[name] = []
+        implementations = kg.STORAGE_IMPLEMENTATIONS[storage_type]["implementations"]
+        if name not in implementations:
+            implementations.append(name)
+
+async def init_rag() -> "LightRAG":
     global _lightrag
     if _lightrag is None:
-        # Initialize LightRAG
-        start = time.time() 
-        _lightrag = LightRAG(
-            working_dir=WORKDIR,
-            embedding_func=embedder,
-            llm_model_func=azure_llm,
-            chunk_token_size=99999,
-        )
-        await _lightrag.initialize_storages()
-        await initialize_pipeline_status()
-        debug(f"[INFO] Initialization complete in {time.time() - start:.2f}s")
+        async with _init_lock:  # concurrent first calls (warm-up + a request) initialize only once
+            if _lightrag is None:
+                # Initialize LightRAG (imported here, it is heavy)
+                start = time.time()
+                from lightrag import LightRAG
+                from lightrag.kg.shared_storage import initialize_pipeline_status
+                _register_storages()
+                lightrag = LightRAG(
+                    working_dir=WORKDIR,
+                    kv_storage=KV_STORAGE,
+                    vector_storage=VECTOR_STORAGE,
+                    embedding_func=embedder,
+                    llm_model_func=azure_llm,
+                    chunk_token_size=99999,
+                    embedding_batch_num=EMBEDDING_BATCH_SIZE,  # large batches, sorted by length in the embedder
+                    llm_model_max_async=LLM_MAX_CONCURRENCY,  # the LLM dispatcher adapts the actual concurrency
+                )
+                await lightrag.initialize_storages()
+                await initialize_pipeline_status()
+                _install_tombstone_filter(lightrag)
+                _lightrag = lightrag
+                debug(f"[INFO] Initialization complete in {time.time() - start:.2f}s")
     return _lightrag
 
+def is_rag_ready() -> bool:
+    return _lightrag is not None
+
+async def _reload_storage(storage) -> None:
+    """Replace the in-memory content of a LightRAG storage with its file. Relies on LightRAG internals."""
+    if hasattr(storage, "reload"):  # storages of lightrag_storages.py
+        await storage.reload()
+    elif hasattr(storage, "_client_file_name"):  # NanoVectorDB storages
+        from nano_vectordb import NanoVectorDB
+        client = await asyncio.to_thread(
+            NanoVectorDB, storage.embedding_func.embedding_dim, storage_file=storage._client_file_name
+        )
+        storage._client = client
+    elif hasattr(storage, "_graphml_xml_file"):  # NetworkX graph
+        import networkx as nx
+        graph = await asyncio.to_thread(storage.load_nx_graph, storage._graphml_xml_file)
+        storage._graph = graph if graph is not None else nx.Graph()
+    elif hasattr(storage, "_file_name"):  # JSON key-value / doc status storages
+        from lightrag.utils import load_json
+        data = await asyncio.to_thread(load_json, storage._file_name)
+        storage._data.clear()
+        storage._data.update(data or {})
+
+async def reload_rag() -> None:
+    """
+    Reload the storages of the LightRAG instance from rag_storage/ (after a write by another process).
+    Does nothing if LightRAG is not initialized yet: it will read the current files.
+    """
+    if _lightrag is None:
+        return
+    start = time.time()
+    for storage in (
+        _lightrag.full_docs, _lightrag.text_chunks, _lightrag.doc_status, _lightrag.llm_response_cache,
+        _lightrag.chunks_vdb, _lightrag.entities_vdb, _lightrag.relationships_vdb,
+        _lightrag.chunk_entity_relation_graph,
+    ):
+        await _reload_storage(storage)
+    debug(f"[INFO] LightRAG storages reloaded in {time.time() - start:.2f}s")
+
+@asynccontextmanager
+async def deferred_persistence():
+    """
+    Run several LightRAG operations (e.g. deletions) and write the storages to disk once at the end,
+    instead of after each operation. Relies on LightRAG internals (_insert_done).
+    """
+    lightrag = await init_rag()
+    async def _skip_insert_done(*args, **kwargs):
+        pass
+    lightrag._insert_done = _skip_insert_done
+    try:
+        yield lightrag
+    finally:
+        del lightrag._insert_done
+        await lightrag._insert_done()
+
+@dataclass(frozen=True)
+class ChunkFilter:
+    """Pre-filter of a vector search: only the rows of these chunks in chunks_vdb are scored."""
+    chunk_ids: FrozenSet[str]
+    rows: Any  # numpy array of rows, resolved once for all the searches of a request
+
+async def get_chunk_filter(chunk_ids) -> ChunkFilter:
+    import numpy as np
+
+    lightrag = await init_rag()
+    vdb = lightrag.chunks_vdb
+    chunk_ids = frozenset(chunk_ids)
+    if hasattr(vdb, "rows_of"):  # MmapVectorDBStorage
+        return ChunkFilter(chunk_ids, await vdb.rows_of(list(chunk_ids)))
+    client = await vdb._get_client() if hasattr(vdb, "_get_client") else vdb._client
+    index = _nano_row_index(getattr(client, "_NanoVectorDB__storage"))
+    return ChunkFilter(chunk_ids, np.array(sorted(index[c] for c in chunk_ids if c in index), dtype=np.int64))
+
+def _query_nano_rows(client, query_vector, top_k: int, better_than_threshold: float, rows) -> list:
+    """NanoVectorDB query scoring only the given rows. Relies on NanoVectorDB internals."""
+    import numpy as np
+
+    storage = getattr(client, "_NanoVectorDB__storage")
+    data, matrix = storage["data"], storage["matrix"]
+    rows = rows[rows < len(data)]
+    if not len(rows) or top_k <= 0:
+        return []
+    query = np.asarray(query_vector, dtype=np.float32)
+    scores = matrix[rows] @ (query / np.linalg.norm(query))
+    k = min(top_k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [{**data[rows[i]], "__metrics__": float(scores[i])} for i in top if scores[i] >= better_than_threshold]
+
+# Number of chunks of the tombstoned documents, recomputed when the tombstones or the registry change
+_excluded_chunks = {"doc_ids": None, "generation": None, "count": 0}
+
+def _count_excluded_chunks(excluded: FrozenSet[str]) -> int:
+    """Upper bound of the search results that can belong to the excluded documents: their own chunks."""
+    generation = registry_generation()
+    if _excluded_chunks["doc_ids"] is not excluded or _excluded_chunks["generation"] != generation:
+        chunk_ids = {
+            s["chunk_id"] for doc_id in excluded for s in (get_doc(doc_id) or {}).get("slides", []) if s["chunk_id"]
+        }
+        _excluded_chunks.update(doc_ids=excluded, generation=generation, count=len(chunk_ids))
+    return _excluded_chunks["count"]
+
+async def query_chunks_by_vector(query_vector, top_k: int = 30, chunk_filter: Optional[ChunkFilter] = None):
+    """
+    Search chunks_vdb with an already computed query vector (so queries can use the E5 "query: " prefix,
+    while chunks_vdb.query would embed the text like a stored passage).
+    With a chunk_filter, only its chunks are scored (metadata-filtered search).
+    Returns the same records as chunks_vdb.query.
+    """
+    import numpy as np
+
+    lightrag = await init_rag()
+    vdb = lightrag.chunks_vdb
+    excluded = get_tombstoned_ids()  # deleted documents waiting for compaction
+    # Over-fetch by the number of tombstoned chunks: top_k results remain once they are filtered out
+    fetch_k = top_k + _count_excluded_chunks(excluded) if excluded else top_k
+    rows = chunk_filter.rows if chunk_filter is not None else None
+    if hasattr(vdb, "query_by_vector"):  # MmapVectorDBStorage
+        results = await vdb.query_by_vector(query_vector, top_k=fetch_k, rows=rows)
+    else:
+        client = await vdb._get_client() if hasattr(vdb, "_get_client") else vdb._client
+        if rows is not None:
+            results = _query_nano_rows(client, query_vector, fetch_k, vdb.cosine_better_than_threshold, rows)
+        else:
+            results = client.query(
+                query=np.asarray(query_vector, dtype=np.float32),
+                top_k=fetch_k,
+                better_than_threshold=vdb.cosine_better_than_threshold,
+            )
+    if chunk_filter is not None:
+        # The rows were resolved before the search: a row rewritten since then holds another chunk
+        results = [dp for dp in results if dp["__id__"] in chunk_filter.chunk_ids]
+    results = [dp for dp in results if dp.get("full_doc_id") not in excluded][:top_k]
+    return [{**dp, "id": dp["__id__"], "distance": dp["__metrics__"]} for dp in results]
+
+# Row of each id in the NanoVectorDB matrix, rebuilt when the storage changes (deletions replace the list)
+_nano_rows = {"data": None, "size": 0, "index": {}}
+
+def _nano_row_index(storage) -> dict:
+    data = storage["data"]
+    if _nano_rows["data"] is not data or _nano_rows["size"] != len(data):
+        _nano_rows.update(data=data, size=len(data), index={dp["__id__"]: i for i, dp in enumerate(data)})
+    return _nano_rows["index"]
+
+async def get_chunk_vectors(chunk_ids) -> dict:
+    """Stored (normalized) embeddings of chunks: chunk_id -> numpy vector, missing ids left out."""
+    import numpy as np
+
+    lightrag = await init_rag()
+    vdb = lightrag.chunks_vdb
+    if hasattr(vdb, "get_vectors_by_ids"):
+        vectors = await vdb.get_vectors_by_ids(list(chunk_ids))
+        return {chunk_id: np.asarray(v, dtype=np.float32) for chunk_id, v in vectors.items()}
+    # NanoVectorDB storages without get_vectors_by_ids: read the matrix. Relies on NanoVectorDB internals.
+    client = await vdb._get_client() if hasattr(vdb, "_get_client") else vdb._client
+    storage = getattr(client, "_NanoVectorDB__storage")
+    index = _nano_row_index(storage)
+    return {chunk_id: storage["matrix"][index[chunk_id]] for chunk_id in chunk_ids if chunk_id in index}
+
 async def query_similar_chunks_from_keywords(weighted_query: str, top_k: int = 30):
-    return await _lightrag.chunks_vdb.query(weighted_query, top_k=top_k)
+    query_vector = (await embedder.embed_queries([weighted_query]))[0]
+    return await query_chunks_by_vector(query_vector, top_k=top_k)
 
 async def query_similar_chunks_from_keyword(keyword: str, top_k: int = 30):
     q = keyword.strip()
     if not q:
         return []
-    return await _lightrag.chunks_vdb.query(keyword, top_k=top_k)
+    return await query_similar_chunks_from_keywords(q, top_k=top_k)
 
-def get_slide_number(chunk_id, json_path="rag_storage/kv_store_text_chunks.json", default=-1):
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+async def extract_graph_for_chunks(chunk_ids) -> dict:
+    """
+    Run the LightRAG entity / relation extraction (LLM calls, no storage write) on already stored chunks.
+    Returns chunk_id -> extraction result, for merge_graph_results. Relies on LightRAG internals.
+    """
+    from lightrag.kg.shared_storage import get_namespace_data, get_pipeline_status_lock
+
+    lightrag = await init_rag()
+    records = await lightrag.text_chunks.get_by_ids(list(chunk_ids))
+    chunks = {chunk_id: record for chunk_id, record in zip(chunk_ids, records) if record}
+    if not chunks:
+        return {}
+
+    pipeline_status = await get_namespace_data("pipeline_status")
+    pipeline_status_lock = get_pipeline_status_lock()
+    chunk_results = await lightrag._process_entity_relation_graph(
+        chunks, pipeline_status=pipeline_status, pipeline_status_lock=pipeline_status_lock
+    )
+    return dict(zip(chunks, chunk_results))  # one result per chunk, in the order of the chunks
+
+
+async def merge_graph_results(results: dict, file_name: str) -> int:
+    """
+    Merge extraction results into the knowledge graph (what ainsert does after the extraction), skipping the
+    chunks removed since they were extracted. Call under corpus_write(). Returns the number of chunks merged.
+    """
+    from dataclasses import asdict
+    from lightrag.operate import merge_nodes_and_edges
+    from lightrag.kg.shared_storage import get_namespace_data, get_pipeline_status_lock
 
-    if chunk_id not in data:
+    lightrag = await init_rag()
+    records = await lightrag.text_chunks.get_by_ids(list(results))
+    chunk_results = [results[chunk_id] for chunk_id, record in zip(results, records) if record]
+    if not chunk_results:
+        return 0
+
+    await merge_nodes_and_edges(
+        chunk_results=chunk_results,
+        knowledge_graph_inst=lightrag.chunk_entity_relation_graph,
+        entity_vdb=lightrag.entities_vdb,
+        relationships_vdb=lightrag.relationships_vdb,
+        global_config=asdict(lightrag),
+        pipeline_status=await get_namespace_data("pipeline_status"),
+        pipeline_status_lock=get_pipeline_status_lock(),
+        llm_response_cache=lightrag.llm_response_cache,
+        current_file_number=1,
+        total_files=1,
+        file_path=file_name,
+    )
+    await lightrag._insert_done()
+    return len(chunk_results)
+
+# chunk_id -> chunk_order_index, read again only when the text chunks file changes
+_slide_numbers = {"path": None, "mtime": None, "data": {}}
+
+def get_slide_number(chunk_id, json_path="rag_storage/kv_store_text_chunks.json", default=-1):
+    if _lightrag is not None and hasattr(_lightrag.text_chunks, "get_field"):  # SqliteKVStorage: indexed lookup
+        return _lightrag.text_chunks.get_field(chunk_id, "chunk_order_index", default)
+    try:
+        mtime = os.stat(json_path).st_mtime_ns
+    except FileNotFoundError:
         return default
+    if _slide_numbers["path"] != json_path or _slide_numbers["mtime"] != mtime:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        _slide_numbers.update(
+            path=json_path,
+            mtime=mtime,
+            data={cid: chunk.get("chunk_order_index", default) for cid, chunk in data.items()},
+        )
 
-    return data[chunk_id].get("chunk_order_index", default)
\ No newline at end of file
+    return _slide_numbers["data"].get(chunk_id, default)
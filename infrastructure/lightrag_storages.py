@@ -0,0 +1,184 @@
+# infrastructure/lightrag_storages.py
+#
+# LightRAG storage implementations on the binary formats of binary_store.py, selected with
+# KV_STORAGE=SqliteKVStorage and VECTOR_STORAGE=MmapVectorDBStorage (see lightrag_engine.init_rag).
+# Nothing is loaded in memory at startup and each write commits only what it changes, where the JSON
+# storages load every file fully and rewrite it fully on each insert.
+# Writes are committed right away: index_done_callback has nothing to flush (it compacts the vector file).
+
+import os
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, final
+
+import numpy as np
+from lightrag.base import BaseKVStorage, BaseVectorStorage
+from lightrag.utils import compute_mdhash_id
+
+from infrastructure.binary_store import SqliteKV, VectorBlocks
+from infrastructure.logger import debug
+
+
+@final
+@dataclass
+class SqliteKVStorage(BaseKVStorage):
+    def __post_init__(self):
+        self._kv = SqliteKV(os.path.join(self.global_config["working_dir"], f"kv_store_{self.namespace}.sqlite"))
+
+    async def finalize(self):
+        self._kv.close()
+
+    async def reload(self) -> None:
+        pass  # every read goes to the database, which already holds the writes of the other processes
+
+    async def index_done_callback(self) -> None:
+        pass  # every upsert / delete is already committed
+
+    async def get_all(self) -> dict[str, Any]:
+        return await asyncio.to_thread(lambda: dict(self._kv.items()))
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        return await asyncio.to_thread(self._kv.get, id)
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        return await asyncio.to_thread(self._kv.get_many, ids)
+
+    def get_field(self, id: str, field: str, default=None):
+        """One field of a record, read synchronously (indexed lookup, used by get_slide_number)."""
+        record = self._kv.get(id)
+        return record.get(field, default) if record else default
+
+    async def filter_keys(self, keys: set[str]) -> set[str]:
+        return await asyncio.to_thread(self._kv.missing, keys)
+
+    async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
+        if not data:
+            return
+        await asyncio.to_thread(self._kv.put_many, data)
+
+    async def delete(self, ids: list[str]) -> None:
+        await asyncio.to_thread(self._kv.delete_many, ids)
+
+    async def is_empty(self) -> bool:
+        return await asyncio.to_thread(self._kv.count) == 0
+
+    async def drop_cache_by_modes(self, modes: list[str] | None = None) -> bool:
+        # The LLM response cache is stored by mode: {mode: {hash: entry}}
+        if not modes:
+            return False
+        await self.delete(modes)
+        return True
+
+    async def drop(self) -> dict[str, str]:
+        try:
+            await asyncio.to_thread(self._kv.clear)
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+
+@final
+@dataclass
+class MmapVectorDBStorage(BaseVectorStorage):
+    def __post_init__(self):
+        kwargs = self.global_config.get("vector_db_storage_cls_kwargs", {})
+        cosine_threshold = kwargs.get("cosine_better_than_threshold")
+        if cosine_threshold is None:
+            raise ValueError("cosine_better_than_threshold must be specified in vector_db_storage_cls_kwargs")
+        self.cosine_better_than_threshold = cosine_threshold
+        self._max_batch_size = self.global_config["embedding_batch_num"]
+        self._blocks = VectorBlocks(
+            os.path.join(self.global_config["working_dir"], f"vdb_{self.namespace}"),
+            self.embedding_func.embedding_dim,
+        )
+
+    async def finalize(self):
+        self._blocks.close()
+
+    async def reload(self) -> None:
+        await asyncio.to_thread(self._blocks.load)
+
+    async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
+        if not data:
+            return
+        now = int(time.time())
+        metas = [
+            {"__created_at__": now, **{k: v for k, v in item.items() if k in self.meta_fields}}
+            for item in data.values()
+        ]
+        contents = [item["content"] for item in data.values()]
+        batches = [contents[i:i + self._max_batch_size] for i in range(0, len(contents), self._max_batch_size)]
+        embeddings = np.concatenate(await asyncio.gather(*[self.embedding_func(batch) for batch in batches]))
+        if len(embeddings) != len(metas):
+            debug(f"[ERROR] {self.namespace}: {len(embeddings)} embeddings for {len(metas)} records, not stored")
+            return
+        await asyncio.to_thread(self._blocks.upsert, list(data), embeddings, metas)
+
+    async def rows_of(self, ids: list[str]):
+        """Rows of the given records, to restrict query_by_vector to them."""
+        return await asyncio.to_thread(self._blocks.rows, ids)
+
+    async def query_by_vector(self, vector, top_k: int, better_than_threshold: float | None = None, rows=None) -> list[dict]:
+        """
+        Nearest records of an already computed vector, as NanoVectorDB returns them (__id__, __metrics__).
+        With rows (from rows_of), only these records are scored.
+        """
+        if better_than_threshold is None:
+            better_than_threshold = self.cosine_better_than_threshold
+        hits = await asyncio.to_thread(self._blocks.query, vector, top_k, better_than_threshold, rows)
+        metas = await asyncio.to_thread(self._blocks.get_metas, [id for id, _ in hits])
+        # A record deleted between the two reads is skipped
+        return [{**metas[id], "__id__": id, "__metrics__": score} for id, score in hits if id in metas]
+
+    async def query(self, query: str, top_k: int, ids: list[str] | None = None, query_embedding=None) -> list[dict[str, Any]]:
+        if query_embedding is None:
+            query_embedding = (await self.embedding_func([query]))[0]
+        results = await self.query_by_vector(query_embedding, top_k)
+        return [
+            {**dp, "id": dp["__id__"], "distance": dp["__metrics__"], "created_at": dp.get("__created_at__")}
+            for dp in results
+        ]
+
+    async def delete(self, ids: list[str]):
+        await asyncio.to_thread(self._blocks.delete, ids)
+
+    async def delete_entity(self, entity_name: str) -> None:
+        await self.delete([compute_mdhash_id(entity_name, prefix="ent-")])
+
+    async def delete_entity_relation(self, entity_name: str) -> None:
+        relation_ids = await asyncio.to_thread(self._blocks.ids_where, "src_id", [entity_name])
+        relation_ids += await asyncio.to_thread(self._blocks.ids_where, "tgt_id", [entity_name])
+        if relation_ids:
+            await self.delete(relation_ids)
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        records = await self.get_by_ids([id])
+        return records[0] if records else None
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        if not ids:
+            return []
+        metas = await asyncio.to_thread(self._blocks.get_metas, ids)
+        return [
+            {**metas[id], "__id__": id, "id": id, "created_at": metas[id].get("__created_at__")}
+            for id in ids if id in metas
+        ]
+
+    async def get_vectors_by_ids(self, ids: list[str]) -> dict[str, list[float]]:
+        return await asyncio.to_thread(self._blocks.get_vectors, ids)
+
+    async def index_done_callback(self) -> None:
+        # Writes are already on disk; rewrite the vector file once enough of it is dead rows
+        if self._blocks.needs_compaction():
+            start = time.time()
+            dead_rows = self._blocks.dead_rows
+            await asyncio.to_thread(self._blocks.compact)
+            debug(f"[INFO] {self.namespace}: {dead_rows} dead vectors compacted in {time.time() - start:.2f}s")
+
+    async def drop(self) -> dict[str, str]:
+        try:
+            await asyncio.to_thread(self._blocks.clear)
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
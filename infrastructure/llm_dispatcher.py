@@ -0,0 +1,220 @@
+# infrastructure/llm_dispatcher.py
+#
+# Every Azure OpenAI call goes through one dispatcher per process:
+# - token buckets for the requests per minute and the tokens per minute of the deployment,
+# - adaptive concurrency (AIMD): +1/limit after a fast success, x0.9 after a slow one, /2 after a 429,
+# - retries of 429 / timeouts / 5xx, waiting for the Retry-After given by Azure (exponential backoff otherwise),
+# - priority classes: interactive calls (/match, /ask, /analyze) take the free slots before bulk ones
+#   (slide captioning, graph extraction).
+
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Optional
+from infrastructure.logger import debug
+
+# Limits of the Azure deployment (0 = no limit)
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "300"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "150000"))
+# Bounds and starting point of the adaptive concurrency
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+# A call slower than this (seconds) counts as an overload signal
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = 1.0  # seconds, doubled at each retry (with jitter) when Azure gives no Retry-After
+LLM_BACKOFF_MAX = 60.0
+
+INTERACTIVE, BULK = 0, 1  # lower value = served first
+
+# Priority of the LLM calls made by the current task (set around bulk work, see llm_priority)
+llm_priority_var: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    token = llm_priority_var.set(priority)
+    try:
+        yield
+    finally:
+        llm_priority_var.reset(token)
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute, holds at most 10 seconds of them (Azure checks short windows)."""
+
+    def __init__(self, rate_per_minute: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, rate_per_minute / 6.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (a request larger than the bucket waits for a full bucket)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        if self.rate > 0:
+            self.level -= min(amount, self.capacity)
+
+
+def _retry_after(exc) -> Optional[float]:
+    """Delay requested by Azure in the headers of a 429 / 503 response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class LlmDispatcher:
+    def __init__(
+        self,
+        rpm_limit: int = LLM_RPM_LIMIT,
+        tpm_limit: int = LLM_TPM_LIMIT,
+        min_concurrency: int = LLM_MIN_CONCURRENCY,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        initial_concurrency: int = LLM_INITIAL_CONCURRENCY,
+    ):
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self.requests = TokenBucket(rpm_limit)
+        self.tokens = TokenBucket(tpm_limit)
+        self.in_flight = 0
+        self.paused_until = 0.0  # set by a 429: nobody calls Azure before this time
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self.counters = Counter()
+
+    # Concurrency slots
+
+    async def _acquire_slot(self, priority: int) -> None:
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release_slot()  # the slot was handed over right before the cancellation
+            raise
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue  # cancelled while waiting
+            self.in_flight += 1
+            future.set_result(None)
+
+    # Rate limits
+
+    async def _wait_for_budget(self, tokens: int) -> None:
+        while True:
+            now = time.monotonic()
+            wait = max(self.paused_until - now, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait <= 0:
+                self.requests.consume(1)
+                self.tokens.consume(tokens)
+                return
+            await asyncio.sleep(wait)
+
+    # AIMD
+
+    def _on_success(self, latency: float) -> None:
+        if latency > LLM_LATENCY_TARGET:
+            self.limit = max(self.min_concurrency, self.limit * 0.9)
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        self._wake_waiters()
+
+    def _on_throttled(self, delay: float) -> None:
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    async def run(self, call: Callable[[], Awaitable], priority: Optional[int] = None, estimated_tokens: int = 0):
+        """
+        Run `call` (one Azure OpenAI request) within the limits, retrying throttled and transient failures.
+        Other errors, and the last failure once LLM_MAX_RETRIES is reached, are raised.
+        """
+        import openai
+
+        priority = llm_priority_var.get() if priority is None else priority
+        self.counters["requests"] += 1
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await self._acquire_slot(priority)
+            try:
+                await self._wait_for_budget(estimated_tokens)
+                start = time.monotonic()
+                result = await call()
+                self._on_success(time.monotonic() - start)
+                return result
+            except openai.RateLimitError as e:
+                self.counters["throttled"] += 1
+                delay = _retry_after(e) or min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)
+                self._on_throttled(delay)
+                error = e
+            except (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError) as e:
+                self.counters["transient_errors"] += 1
+                delay = _retry_after(e) or min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)
+                error = e
+            finally:
+                self._release_slot()
+
+            if attempt == LLM_MAX_RETRIES:
+                break
+            self.counters["retries"] += 1
+            debug(f"[WARN] LLM call failed ({type(error).__name__}), retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay * random.uniform(1.0, 1.2))
+
+        self.counters["failures"] += 1
+        raise error
+
+    def get_stats(self) -> dict:
+        waiting = Counter(priority for priority, _, future in self._waiters if not future.done())
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting_interactive": waiting[INTERACTIVE],
+            "waiting_bulk": waiting[BULK],
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            **self.counters,
+        }
+
+
+_dispatcher: Optional[LlmDispatcher] = None
+
+
+def get_dispatcher() -> LlmDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = LlmDispatcher()
+    return _dispatcher
@@ -0,0 +1,125 @@
+# infrastructure/llm_hedging.py
+#
+# Hedged LLM requests: when a call is still running after a high percentile of the recent latencies,
+# a duplicate is sent and the first valid answer wins (the other call is cancelled).
+
+import os
+import time
+import asyncio
+from collections import Counter, deque
+from typing import Awaitable, Callable, Optional, TypeVar
+from infrastructure.logger import debug
+
+T = TypeVar("T")
+
+# Latency percentile after which the duplicate is sent (0 = no hedging)
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Until enough latencies are known, the duplicate is sent after HEDGE_DEFAULT_DELAY seconds
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "8"))
+HEDGE_MIN_DELAY = 1.0  # never hedge earlier than this (seconds)
+
+
+class LatencyTracker:
+    """Latencies of the last `window` calls of one kind, and the hedging counters of these calls."""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self.counters = Counter()
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a duplicate call is sent, None if hedging is disabled."""
+        if HEDGE_PERCENTILE <= 0:
+            return None
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, self.percentile(HEDGE_PERCENTILE))
+
+    def get_stats(self) -> dict:
+        return {
+            "samples": len(self.samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "hedge_delay": self.hedge_delay(),
+            **self.counters,
+        }
+
+
+async def _timed(call: Callable[[], Awaitable[T]], tracker: LatencyTracker, censor_after: Optional[float] = None) -> T:
+    """
+    Run the call and record its latency once it completes. With censor_after (the hedge delay, given for
+    the original call only), a call cancelled after running that long, i.e. beaten by its hedge, is recorded
+    too with the time it had been running: a lower bound of its latency, without which the slow tail would
+    be hidden. A cancelled hedge is never recorded: its short running time would pull the hedge delay down.
+    """
+    start = time.monotonic()
+    try:
+        result = await call()
+    except asyncio.CancelledError:
+        elapsed = time.monotonic() - start
+        if censor_after is not None and elapsed >= censor_after:
+            tracker.record(elapsed)
+        raise
+    tracker.record(time.monotonic() - start)
+    return result
+
+
+async def hedged_call(
+    call: Callable[[], Awaitable[T]],
+    is_valid: Callable[[T], bool],
+    tracker: LatencyTracker,
+) -> T:
+    """
+    Run `call`, and a second time if the first one is slower than the hedge delay (or returns an invalid
+    result). Returns the first valid result; if none is valid, the last result (or raises the last error).
+    The calls still running are cancelled, also when the caller itself is cancelled (deadline).
+    """
+    tracker.counters["calls"] += 1
+    delay = tracker.hedge_delay()
+    tasks = {asyncio.create_task(_timed(call, tracker, censor_after=delay))}
+    hedge = None
+    last_result, last_error = None, None
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(
+                tasks, timeout=delay if hedge is None else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                # The first call is in the slow tail: send the duplicate
+                debug(f"[INFO] LLM call slower than {delay:.2f}s, hedged request sent")
+                hedge = asyncio.create_task(_timed(call, tracker))
+                tasks.add(hedge)
+                tracker.counters["hedged"] += 1
+                continue
+            for task in done:
+                tasks.discard(task)
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    continue
+                result = task.result()
+                if is_valid(result):
+                    if task is hedge:
+                        tracker.counters["hedge_wins"] += 1
+                    return result
+                last_result = result
+            if not tasks and hedge is None and delay is not None:
+                # The first answer is not valid: send the second call right away
+                hedge = asyncio.create_task(_timed(call, tracker))
+                tasks.add(hedge)
+                tracker.counters["hedged"] += 1
+        if last_result is not None or last_error is None:
+            return last_result
+        raise last_error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,86 @@
+# infrastructure/llm_usage.py
+#
+# Input tokens of the Azure OpenAI calls, and how many of them were served from the provider prompt cache
+# (usage.prompt_tokens_details.cached_tokens), per endpoint and per prompt template. Cached input tokens are
+# billed at a discount and processed faster: the stats give the share of cached tokens, the input cost saved,
+# and the average latency of the calls with and without a cache hit.
+
+import os
+import threading
+import contextvars
+from collections import defaultdict
+from dataclasses import dataclass
+
+# Price reduction of a cached input token (0.5 = half price)
+LLM_CACHED_INPUT_DISCOUNT = float(os.getenv("LLM_CACHED_INPUT_DISCOUNT", "0.5"))
+
+# Endpoint of the current request (set by the HTTP middleware in main.py), "background" outside of a request
+llm_endpoint_var: contextvars.ContextVar[str] = contextvars.ContextVar("llm_endpoint", default="background")
+
+
+@dataclass
+class UsageStats:
+    calls: int = 0
+    calls_with_cache_hit: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    seconds_with_cache_hit: float = 0.0
+    seconds_without_cache_hit: float = 0.0
+
+    def add(self, prompt_tokens: int, cached_tokens: int, completion_tokens: int, seconds: float) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        self.completion_tokens += completion_tokens
+        if cached_tokens:
+            self.calls_with_cache_hit += 1
+            self.seconds_with_cache_hit += seconds
+        else:
+            self.seconds_without_cache_hit += seconds
+
+    def to_dict(self) -> dict:
+        misses = self.calls - self.calls_with_cache_hit
+        return {
+            "calls": self.calls,
+            "calls_with_cache_hit": self.calls_with_cache_hit,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "uncached_tokens": self.prompt_tokens - self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else None,
+            # share of the input cost saved by the cache
+            "input_cost_saved": (
+                round(self.cached_tokens * LLM_CACHED_INPUT_DISCOUNT / self.prompt_tokens, 3) if self.prompt_tokens else None
+            ),
+            "avg_seconds_with_cache_hit": (
+                round(self.seconds_with_cache_hit / self.calls_with_cache_hit, 2) if self.calls_with_cache_hit else None
+            ),
+            "avg_seconds_without_cache_hit": round(self.seconds_without_cache_hit / misses, 2) if misses else None,
+        }
+
+
+_by_endpoint = defaultdict(UsageStats)
+_by_prompt = defaultdict(UsageStats)
+_lock = threading.Lock()
+
+
+def record_usage(prompt_name: str, usage, seconds: float) -> None:
+    """Records the usage of one response (ignored when the response has none)."""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None) or 0
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    with _lock:
+        for stats in (_by_endpoint[llm_endpoint_var.get()], _by_prompt[prompt_name]):
+            stats.add(prompt_tokens, cached_tokens, completion_tokens, seconds)
+
+
+def get_llm_usage_stats() -> dict:
+    with _lock:
+        return {
+            "by_endpoint": {name: stats.to_dict() for name, stats in sorted(_by_endpoint.items())},
+            "by_prompt": {name: stats.to_dict() for name, stats in sorted(_by_prompt.items())},
+        }
@@ -1,6 +1,14 @@
 #services/logger.py
 
 import os
+import json
+import queue
+import random
+import atexit
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueListener, RotatingFileHandler
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -12,19 +20,141 @@ DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
 if DEBUG_MODE:
     print("[DEBUG] Debug mode is enabled")
 
+LOGS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../logs"))
+
+# Size-based rotation of every log file
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# Records waiting to be written; when the queue is full new records are dropped (never blocks the caller)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Per-category policies (a category is the log file name).
+# - max_chars : the message is truncated to this many characters (None = keep everything)
+# - sample_rate : fraction of the records that are kept (1.0 = all)
+DEFAULT_LOG_POLICY = {"max_chars": int(os.getenv("LOG_DEFAULT_MAX_CHARS", "20000")), "sample_rate": 1.0}
+LOG_POLICIES = {
+    "text_extraction.log": {"max_chars": 2000, "sample_rate": 1.0},
+    "file_encoding.log": {"max_chars": 200, "sample_rate": 1.0},
+    "added_files.log": {"max_chars": 20000, "sample_rate": 1.0},
+    "ranking_prompts.log": {"max_chars": 20000, "sample_rate": 0.25},
+    "matched_documents.log": {"max_chars": 10000, "sample_rate": 1.0},
+}
+# Optional JSON override, e.g. LOG_POLICIES='{"ranking_prompts.log": {"sample_rate": 1.0}}'
+LOG_POLICIES.update(json.loads(os.getenv("LOG_POLICIES", "{}")))
+
+# Request id of the current request (set by the HTTP middleware in main.py)
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+
 def debug(msg: str):
     if DEBUG_MODE:
         print(f"[DEBUG] {msg}")
 
+
+def get_log_policy(file_name: str) -> dict:
+    return {**DEFAULT_LOG_POLICY, **LOG_POLICIES.get(file_name, {})}
+
+
+class _CategoryRouter(logging.Handler):
+    """Runs in the listener thread: routes each record to the rotating file of its category."""
+
+    def __init__(self):
+        super().__init__()
+        self._handlers: dict[str, RotatingFileHandler] = {}
+
+    def _get_handler(self, file_name: str) -> RotatingFileHandler:
+        handler = self._handlers.get(file_name)
+        if handler is None:
+            os.makedirs(LOGS_DIR, exist_ok=True)  # Ensure logs folder exists
+            handler = RotatingFileHandler(
+                os.path.join(LOGS_DIR, file_name),
+                maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUP_COUNT,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._handlers[file_name] = handler
+        return handler
+
+    def emit(self, record: logging.LogRecord):
+        # JSON serialization happens here, off the caller's thread
+        record.msg = json.dumps(record.payload, ensure_ascii=False)
+        record.args = None
+        self._get_handler(record.payload["category"]).handle(record)
+
+    def close(self):
+        for handler in self._handlers.values():
+            handler.close()
+        super().close()
+
+
+_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_listener: QueueListener | None = None
+_listener_lock = threading.Lock()
+_dropped_records = 0
+
+
+def _ensure_listener():
+    global _listener
+    if _listener is None:
+        with _listener_lock:
+            if _listener is None:
+                _listener = QueueListener(_queue, _CategoryRouter())
+                _listener.start()
+
+
+def shutdown_logging():
+    """Flush the pending records and stop the writer thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
 def write_log(msg: str, header: str = "", file_name: str = "app.log"):
-    if DEBUG_MODE:
-        script_dir = os.path.dirname(__file__)
-        logs_dir = os.path.abspath(os.path.join(script_dir, "../logs"))
-        os.makedirs(logs_dir, exist_ok=True)  # Ensure logs folder exists
-
-        logfile_path = os.path.join(logs_dir, file_name)
-        with open(logfile_path, "a", encoding="utf-8") as f:
-            f.write(f"\n=== {header} ===\n")
-            f.write(f"{datetime.now()}:\n{msg}\n\n{'='*40}\n")
-        
-        print(f"[LOG ADDED IN {file_name} - {header}] : {msg[:50]}...") 
\ No newline at end of file
+    """
+    Queue a structured log record for the file `file_name` (the record category).
+    Never performs file I/O on the caller's thread: the record is written by a background listener.
+    """
+    global _dropped_records
+    if not DEBUG_MODE:
+        return
+
+    policy = get_log_policy(file_name)
+    if policy["sample_rate"] < 1.0 and random.random() >= policy["sample_rate"]:
+        return
+
+    msg = str(msg)
+    original_length = len(msg)
+    max_chars = policy["max_chars"]
+    truncated = max_chars is not None and original_length > max_chars
+    if truncated:
+        msg = msg[:max_chars]
+
+    record = logging.makeLogRecord({"levelno": logging.INFO, "levelname": "INFO"})
+    record.payload = {
+        "ts": datetime.now().isoformat(),
+        "request_id": request_id_var.get(),
+        "category": file_name,
+        "header": header,
+        "msg": msg,
+        "truncated": truncated,
+        "original_length": original_length,
+    }
+
+    _ensure_listener()
+    try:
+        _queue.put_nowait(record)
+    except queue.Full:
+        _dropped_records += 1
+
+
+def get_dropped_records() -> int:
+    return _dropped_records
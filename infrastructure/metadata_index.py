@@ -0,0 +1,76 @@
+# infrastructure/metadata_index.py
+#
+# Resolution of a /match metadata filter (client, sector, year, language) to its search scope: the matching
+# documents and their chunks, from the metadata and slide manifests of the document registry. The vector
+# and BM25 searches then score only these chunks, instead of post-filtering a larger top-k.
+# Scopes are cached until the registry changes.
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+from domain.document_metadata import DocumentMetadata, MetadataFilter
+from infrastructure.doc_registry import list_docs, registry_generation
+from infrastructure.lightrag_engine import init_rag
+
+# Number of distinct filters whose scope is kept in memory
+SCOPE_CACHE_SIZE = int(os.getenv("SCOPE_CACHE_SIZE", "64"))
+
+
+@dataclass(frozen=True)
+class SearchScope:
+    doc_ids: FrozenSet[str]
+    chunk_ids: FrozenSet[str]  # chunks of these documents, including the chunks shared by their duplicate slides
+
+
+_scopes: "OrderedDict[MetadataFilter, SearchScope]" = OrderedDict()
+_scopes_generation = -1
+_lock = threading.Lock()
+
+
+async def _build_scope(metadata_filter: MetadataFilter) -> SearchScope:
+    docs = list_docs()
+    doc_ids = {
+        doc_id for doc_id, entry in docs.items()
+        if metadata_filter.matches(DocumentMetadata.from_dict(entry.get("metadata")))
+    }
+    chunk_ids, without_manifest = set(), []
+    for doc_id in doc_ids:
+        slides = docs[doc_id].get("slides")
+        if slides is None:
+            without_manifest.append(doc_id)
+            continue
+        chunk_ids.update(s.get("chunk_id") or s.get("duplicate_of") for s in slides)
+    if without_manifest:
+        # Documents ingested before slide manifests existed: their chunks are listed in doc_status
+        lightrag = await init_rag()
+        for status in await lightrag.doc_status.get_by_ids(without_manifest):
+            if status:
+                chunk_ids.update(status.get("chunks_list", []))
+    chunk_ids.discard(None)
+    return SearchScope(frozenset(doc_ids), frozenset(chunk_ids))
+
+
+async def resolve_scope(metadata_filter: Optional[MetadataFilter]) -> Optional[SearchScope]:
+    """Scope of a filter, None for no filter (the whole corpus is searched)."""
+    global _scopes_generation
+    if metadata_filter is None or metadata_filter.is_empty():
+        return None
+    generation = registry_generation()
+    with _lock:
+        if _scopes_generation != generation:
+            _scopes.clear()
+            _scopes_generation = generation
+        scope = _scopes.get(metadata_filter)
+        if scope is not None:
+            _scopes.move_to_end(metadata_filter)
+            return scope
+
+    scope = await _build_scope(metadata_filter)
+    with _lock:
+        if _scopes_generation == generation:  # not cached if the registry changed in the meantime
+            _scopes[metadata_filter] = scope
+            while len(_scopes) > SCOPE_CACHE_SIZE:
+                _scopes.popitem(last=False)
+    return scope
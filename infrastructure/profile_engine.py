@@ -0,0 +1,49 @@
+# infrastructure/profile_engine.py
+
+import os
+import json
+from typing import List, Optional
+from core.utils.json_salvage import strip_code_fences
+from infrastructure.azure_llm import azure_llm
+from infrastructure.logger import debug, write_log
+from domain.document_profile import DocumentProfile
+from infrastructure.prompt_templates import PROFILE_PROMPT, PROFILE_MAX_THEMES, PROFILE_MAX_KEYWORDS
+
+# Set DOCUMENT_PROFILES=false to ingest without profiles (the ranking then uses the raw slide captions)
+DOCUMENT_PROFILES = os.getenv("DOCUMENT_PROFILES", "true").lower() == "true"
+PROFILE_INPUT_CHARS = int(os.getenv("PROFILE_INPUT_CHARS", "40000"))  # slide contents sent to build the profile
+
+
+def _parse_profile(response: str) -> Optional[DocumentProfile]:
+    try:
+        data = json.loads(strip_code_fences(response))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("summary"), str):
+        return None
+    return DocumentProfile(
+        summary=data["summary"].strip(),
+        themes=[str(t).strip() for t in data.get("themes", []) if str(t).strip()][:PROFILE_MAX_THEMES],
+        keywords=[str(k).strip() for k in data.get("keywords", []) if str(k).strip()][:PROFILE_MAX_KEYWORDS],
+    )
+
+
+async def build_document_profile(file_name: str, slide_contents: List[str]) -> Optional[DocumentProfile]:
+    """Profile of a document from its slide contents, None if the LLM call or its parsing fails."""
+    text = "\n\n".join(content.strip() for content in slide_contents)[:PROFILE_INPUT_CHARS]
+    if not text:
+        return None
+
+    # The file name is variable: it comes after the static instructions
+    prompt = PROFILE_PROMPT.render(f"--- DOCUMENT: {file_name} ---\n{text}")
+
+    try:
+        response = await azure_llm(prompt, system_prompt=PROFILE_PROMPT.system, prompt_name=PROFILE_PROMPT.id)
+    except Exception as e:
+        debug(f"[ERROR] Profile of {file_name} failed: {e}")
+        return None
+
+    profile = _parse_profile(response)
+    if profile is None:
+        write_log(msg=response, header=f"Invalid profile for {file_name}", file_name="response_LLMs.log")
+    return profile
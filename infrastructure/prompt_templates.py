@@ -0,0 +1,189 @@
+# infrastructure/prompt_templates.py
+#
+# Versioned templates of the prompts sent to Azure OpenAI. The provider caches the longest prompt prefix it has
+# already seen (from 1024 tokens, by steps of 128 tokens) and processes the cached tokens faster and cheaper.
+# Each template therefore puts what never changes first (system prompt, then the static instructions), and the
+# variable sections after them, the most stable first: e.g. the document text comes before the language of the
+# summary, so the same file summarized in another language reuses the whole cached document.
+# Bump the version of a template when its text changes (the /analyze results cached in memory are keyed by it).
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+PROFILE_MAX_THEMES = 6
+PROFILE_MAX_KEYWORDS = 20
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: int
+    instructions: str              # static start of the user message
+    system: Optional[str] = None   # static system prompt
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}-v{self.version}"
+
+    def render(self, *sections: str) -> str:
+        """User message: the static instructions, then the variable sections in the order given."""
+        return "\n\n".join([self.instructions, *(section for section in sections if section)])
+
+
+RANKING_PROMPT = PromptTemplate(
+    name="ranking",
+    version=2,
+    system=(
+        "You are an expert in analyzing professional documents (RAOs). "
+        "Your task is to evaluate which RAO documents are the most relevant "
+        "to answer a given call for tender (AO), based on weighted keywords."
+        "Give the explanations in the language requested by the user."
+    ),
+    instructions=(
+        "You are given the important keywords of a call for tender, and several RAO documents, each described "
+        "by a profile (summary, themes, keywords) with its most relevant extracts, or by extracts (chunks) only.\n"
+        "Rank the documents by relevance and give an explanation in the language given at the end.\n"
+        "For each relevant document, return ONLY the keywords from the keyword list exactly as written "
+        "that are actually related to the document. Do NOT include synonyms or new terms.\n"
+        "Order the keywords by relevance (most important first).\n"
+        "Exclude documents that are not relevant at all.\n\n"
+        "Return a VALID JSON object whose \"documents\" array holds the documents, most relevant first. "
+        "Each element MUST be an object with exactly these keys:\n"
+        "{\"documents\": [{\"document\": \"<ao_id>\", \"explanation\": \"<why it matches>\", \"keywords\": [\"k1\", \"k2\", ... ]}, ...]}\n\n"
+        "Do not add any other keys or data outside this structure."
+    ),
+)
+
+# Structured output of the ranking call (response_format), same structure as asked by RANKING_PROMPT
+RANKING_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "ranked_documents",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "documents": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "document": {"type": "string"},
+                            "explanation": {"type": "string"},
+                            "keywords": {"type": "array", "items": {"type": "string"}},
+                        },
+                        "required": ["document", "explanation", "keywords"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["documents"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+SUMMARY_PROMPT = PromptTemplate(
+    name="summary",
+    version=2,
+    system=(
+        "You are a professional summarizer assistant. Your goal is to analyze multiple documents provided by the user "
+        "and generate a clear, concise, and well-structured summary that captures the key ideas, facts, and arguments across all the files"
+        "The summary must always be a single paragraph of about 5 sentences, written in natural, fluent style, in the language requested by the user. "
+        "Do not use bullet points or multiple paragraphs."
+    ),
+    instructions=(
+        "Below is the full text extracted from multiple documents.\n\n"
+        "Please write a single-paragraph summary, in the language given after the text, that:\n"
+        "- Highlights the main themes and topics\n"
+        "- Includes the most important facts, insights, or arguments\n"
+        "- Flows naturally as one paragraph (around 5 sentences)\n\n"
+        "Do not format with bullet points. Do not split into multiple paragraphs."
+    ),
+)
+
+KEYWORDS_PROMPT = PromptTemplate(
+    name="keywords",
+    version=2,
+    system=(
+        "You are a keyword extraction assistant for a RAG-based document retrieval system. "
+        "For all the document provided, extract a list of 10 to 15 keywords. Choose both: "
+        "1. Direct keywords (explicitly present). "
+        "2. Related keywords (semantically linked). "
+        "Each keyword must have a relevance score from 1 to 3."
+        "The answer should only contain the keywords with their score, without any additional text, in the following format."
+        "keyword1:score1\nkeyword2:score2\n...\nkeywordN:scoreN"
+    ),
+    instructions="Please process the following document. Generate a list of 10 to 15 keywords.",
+)
+
+PROFILE_PROMPT = PromptTemplate(
+    name="profile",
+    version=1,
+    system=(
+        "You are an expert in professional documents answering calls for tender (RAOs). "
+        "You write compact profiles of RAO documents, used later to judge their relevance to new calls for tender."
+    ),
+    instructions=(
+        "Below are the slides of an RAO document.\n"
+        "Return a VALID JSON object with exactly these keys:\n"
+        "{\"summary\": \"<3 sentences: client, context, what was offered>\", "
+        f"\"themes\": [\"<main offer themes, at most {PROFILE_MAX_THEMES}>\"], "
+        f"\"keywords\": [\"<specific terms: technologies, methods, certifications, sectors, at most {PROFILE_MAX_KEYWORDS}>\"]}}\n"
+        "Write in the language of the document. Do not add any text outside the JSON object."
+    ),
+)
+
+# The slide images are sent after the instructions
+SLIDE_CAPTION_PROMPT = PromptTemplate(
+    name="slide_caption",
+    version=1,
+    instructions=""" You are analyzing a slide from a professional Response to a Call for Tenders presentation.
+
+Please return two sections:
+
+---
+
+### [Extracted Text]
+Extract all visible text exactly as it appears on the slide.  
+Preserve the wording, line breaks, bullet points, and labels.  
+Do not summarize or paraphrase — just list what is visible.
+
+---
+
+### [Visual Summary]
+Describe only the visual elements that contribute to the **meaning, structure, or interpretation** of the slide.  
+Ignore purely decorative features (e.g., colors, white space, logos, branding).  
+Focus only on layout, icons, diagrams, or formatting that affect how the content is understood.
+
+Do not add interpretations, summaries, or opinions. Just describe the visual design.
+""",
+)
+
+BATCH_SLIDE_CAPTION_PROMPT = PromptTemplate(
+    name="batch_slide_caption",
+    version=1,
+    instructions=""" You are analyzing several slides from a professional Response to a Call for Tenders presentation.
+Each slide image is preceded by its label "Slide <number>".
+
+For each slide, return two fields:
+
+- "extracted_text": all visible text exactly as it appears on the slide.
+Preserve the wording, line breaks, bullet points, and labels.
+Do not summarize or paraphrase — just list what is visible.
+
+- "visual_summary": only the visual elements that contribute to the **meaning, structure, or interpretation** of the slide.
+Ignore purely decorative features (e.g., colors, white space, logos, branding).
+Focus only on layout, icons, diagrams, or formatting that affect how the content is understood.
+Do not add interpretations, summaries, or opinions. Just describe the visual design.
+
+Return ONLY a valid JSON object, with exactly one element per slide, in this format:
+{"slides": [{"slide": <number>, "extracted_text": "...", "visual_summary": "..."}, ...]}
+""",
+)
+
+TEMPLATES: Dict[str, PromptTemplate] = {
+    t.name: t for t in (
+        RANKING_PROMPT, SUMMARY_PROMPT, KEYWORDS_PROMPT, PROFILE_PROMPT, SLIDE_CAPTION_PROMPT, BATCH_SLIDE_CAPTION_PROMPT,
+    )
+}
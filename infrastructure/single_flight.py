@@ -0,0 +1,61 @@
+# infrastructure/single_flight.py
+#
+# Coalescing of identical in-flight requests: concurrent calls with the same key await one shared
+# computation instead of each paying for the LLM. The computation is cancelled only when every
+# caller waiting for it has been cancelled (e.g. all the clients disconnected).
+
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.counters = Counter()
+        _groups[name] = self
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of factory(), shared with the concurrent calls made with the same key."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.counters["executed"] += 1
+        else:
+            self.counters["coalesced"] += 1
+
+        call.waiters += 1
+        try:
+            # shield: cancelling one caller must not cancel the computation shared with the others
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller is gone: nobody needs the result anymore
+                self.counters["abandoned"] += 1
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def get_stats(self) -> dict:
+        return {"in_flight": len(self._calls), **self.counters}
+
+
+def get_single_flight_stats() -> dict:
+    return {name: group.get_stats() for name, group in _groups.items()}
@@ -0,0 +1,108 @@
+# infrastructure/tombstones.py
+#
+# Documents deleted but not yet removed from the LightRAG storages (bulk deletion), and the compaction
+# jobs that remove them. Tombstoned documents are filtered out of every query right away.
+# Write them under corpus_write() only: the in-memory view is then up to date with the other processes,
+# and they reload the file once the write bumps the corpus version.
+
+import os
+import json
+import time
+import uuid
+import threading
+from typing import Dict, FrozenSet, List, Optional
+
+TOMBSTONES_PATH = os.path.join("rag_storage", "tombstones.json")
+
+_data: Optional[Dict[str, Dict]] = None  # {"docs": {doc_id: {...}}, "jobs": {job_id: {...}}}
+_doc_ids: FrozenSet[str] = frozenset()  # read on every query, rebuilt on change
+_lock = threading.Lock()
+
+
+def _load() -> Dict[str, Dict]:
+    global _data, _doc_ids
+    if _data is None:
+        if os.path.exists(TOMBSTONES_PATH):
+            with open(TOMBSTONES_PATH, "r", encoding="utf-8") as f:
+                _data = json.load(f)
+        else:
+            _data = {"docs": {}, "jobs": {}}
+        _doc_ids = frozenset(_data["docs"])
+    return _data
+
+
+def _save() -> None:
+    global _doc_ids
+    _doc_ids = frozenset(_data["docs"])
+    os.makedirs(os.path.dirname(TOMBSTONES_PATH), exist_ok=True)
+    tmp_path = f"{TOMBSTONES_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_data, f, ensure_ascii=False)
+    os.replace(tmp_path, TOMBSTONES_PATH)
+
+
+def get_tombstoned_ids() -> FrozenSet[str]:
+    with _lock:
+        _load()
+        return _doc_ids
+
+
+def is_tombstoned(doc_id: str) -> bool:
+    return doc_id in get_tombstoned_ids()
+
+
+def create_deletion_job(doc_ids: List[str]) -> Dict:
+    """Tombstone the documents and record the compaction job that will remove them."""
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    doc_ids = list(dict.fromkeys(doc_ids))
+    with _lock:
+        data = _load()
+        for doc_id in doc_ids:
+            data["docs"][doc_id] = {"deleted_at": now, "job_id": job_id}
+        job = {
+            "job_id": job_id,
+            "status": "pending",
+            "doc_ids": doc_ids,
+            "removed": [],
+            "not_found": [],
+            "failed": [],
+            "created_at": now,
+            "finished_at": None,
+        }
+        data["jobs"][job_id] = job
+        _save()
+        return dict(job)
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    with _lock:
+        job = _load()["jobs"].get(job_id)
+        return dict(job) if job is not None else None
+
+
+def list_jobs() -> Dict[str, Dict]:
+    with _lock:
+        return {job_id: dict(job) for job_id, job in _load()["jobs"].items()}
+
+
+def update_job(job_id: str, **fields) -> None:
+    with _lock:
+        _load()["jobs"][job_id].update(fields)
+        _save()
+
+
+def remove_tombstones(doc_ids: List[str]) -> None:
+    """The documents are physically removed (or added again): stop filtering them."""
+    with _lock:
+        data = _load()
+        for doc_id in doc_ids:
+            data["docs"].pop(doc_id, None)
+        _save()
+
+
+def reload_tombstones() -> None:
+    """Drop the in-memory tombstones, they are read again from disk on next access (written by another process)."""
+    global _data
+    with _lock:
+        _data = None
@@ -0,0 +1,59 @@
+# infrastructure/warmup.py
+
+import os
+import sys
+import time
+import asyncio
+from typing import Dict
+from infrastructure.logger import debug
+from infrastructure.embedder import embedder
+from infrastructure.lightrag_engine import init_rag, is_rag_ready
+from infrastructure.bm25_index import get_bm25_index
+
+# Heavy components are loaded in the background once the server accepts connections.
+# Set WARMUP_ON_STARTUP=false to load them only on first use.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+_components: Dict[str, str] = {
+    "pdf_stack": PENDING,
+    "embedding_model": PENDING,
+    "lightrag": PENDING,
+    "bm25_index": PENDING,
+}
+
+def _load_pdf_stack():
+    import fitz  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+async def _warm_component(name: str, load) -> None:
+    _components[name] = LOADING
+    start = time.time()
+    try:
+        await load()
+        _components[name] = READY
+        debug(f"[INFO] {name} ready in {time.time() - start:.2f}s")
+    except Exception as e:
+        _components[name] = FAILED
+        debug(f"[ERROR] Failed to warm up {name}: {e}")
+
+async def warm_up() -> None:
+    """Load the PDF stack, the embedding model and the LightRAG storages (blocking loads run in threads)."""
+    await _warm_component("pdf_stack", lambda: asyncio.to_thread(_load_pdf_stack))
+    await _warm_component("embedding_model", lambda: asyncio.to_thread(embedder.get_model))
+    await _warm_component("lightrag", init_rag)
+    await _warm_component("bm25_index", lambda: asyncio.to_thread(get_bm25_index))
+
+def get_readiness() -> Dict[str, str]:
+    # Components may also have been loaded on demand by a request
+    if "fitz" in sys.modules and "PIL.Image" in sys.modules:
+        _components["pdf_stack"] = READY
+    if embedder.is_loaded:
+        _components["embedding_model"] = READY
+    if is_rag_ready():
+        _components["lightrag"] = READY
+    return dict(_components)
+
+def is_ready() -> bool:
+    return all(state == READY for state in get_readiness().values())
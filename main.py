@@ -1,19 +1,64 @@
 # main.py
 
-from fastapi import FastAPI
+import uuid
+import asyncio
+from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
+from starlette.routing import Match
 from api.v1 import ask, analyze, match, match_v2, documents
 from contextlib import asynccontextmanager
-from infrastructure.lightrag_engine import init_rag
+from infrastructure.logger import request_id_var, shutdown_logging
+from infrastructure.warmup import WARMUP_ON_STARTUP, warm_up, get_readiness, is_ready
+from infrastructure.graph_backfill import resume_graph_backfill, stop_graph_backfill
+from application.compaction_service import resume_compaction, stop_compaction
+from infrastructure.corpus_sync import refresh_if_stale
+from infrastructure.llm_dispatcher import get_dispatcher
+from infrastructure.azure_llm import ranking_latency, get_ranking_parse_stats
+from infrastructure.single_flight import get_single_flight_stats
+from infrastructure.analysis_cache import get_analysis_cache_stats
+from infrastructure.llm_usage import llm_endpoint_var, get_llm_usage_stats
+from core.utils.file_loader import shutdown_extraction_pool
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_rag()  
+    # Heavy components (PDF stack, embedding model, LightRAG storages) load in the background
+    warmup_task = asyncio.create_task(warm_up()) if WARMUP_ON_STARTUP else None
+    await resume_graph_backfill()  # Knowledge graphs left unfinished by the previous run
+    resume_compaction()  # Bulk deletions left unfinished by the previous run
     yield  # Let the app run
-    # Later : maybe add cleanup here
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    stop_graph_backfill()
+    stop_compaction()
+    shutdown_extraction_pool()
+    shutdown_logging()  # Flush the pending log records
 
 app = FastAPI(lifespan=lifespan)
 
+def _endpoint_of(request: Request) -> str:
+    # Route template ("PUT /documents/{doc_id}"), not the path: one stats entry per endpoint
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return f"{request.method} {route.path}"
+    return "unmatched"
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    # Every log record written while handling this request carries its id
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    endpoint_token = llm_endpoint_var.set(_endpoint_of(request))  # LLM token usage is counted per endpoint
+    try:
+        # With several workers, serve the request from the latest corpus written by any of them
+        await refresh_if_stale()
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+        llm_endpoint_var.reset(endpoint_token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 app.include_router(ask.router, prefix="/ask", tags=["RAG Queries"])
 app.include_router(analyze.router, prefix="/analyze", tags=["Document Analysis"])
 app.include_router(match.router, prefix="/match-mini", tags=["Match Requests"])
@@ -24,6 +69,30 @@ app.include_router(documents.router, prefix="/documents", tags=["Ingest"])
 async def health():
     return {"status": "ok"}
 
+@app.get("/ready", tags=["Health"])
+async def ready():
+    # Readiness probe: 503 until every heavy component is loaded
+    ready = is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "warming_up", "components": get_readiness()},
+    )
+
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    # LLM dispatcher of this worker: adaptive concurrency, queued calls, 429s and retries,
+    # latency percentiles / hedged requests of the /match ranking calls, coalesced identical requests,
+    # hits of the /analyze result caches, input tokens served from the provider prompt cache,
+    # and the ranking answers that could not be parsed, or only partly (salvaged, completed by a continuation)
+    return {
+        "llm": get_dispatcher().get_stats(),
+        "ranking": ranking_latency.get_stats(),
+        "ranking_parse": get_ranking_parse_stats(),
+        "single_flight": get_single_flight_stats(),
+        "analysis_cache": get_analysis_cache_stats(),
+        "llm_usage": get_llm_usage_stats(),
+    }
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     return JSONResponse(
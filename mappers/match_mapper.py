@@ -13,7 +13,8 @@ def to_match_responses(domain_docs: List[MatchedDocument]) -> List[MatchResponse
             matched_keywords=[
                 SchemaKeyword(keyword=kw.keyword, score=kw.score)
                 for kw in doc.matched_keywords
-            ]
+            ],
+            degraded=doc.degraded,
         )
         for doc in domain_docs
     ]
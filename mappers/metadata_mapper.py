@@ -0,0 +1,22 @@
+# mappers/metadata_mapper.py
+
+from typing import Optional
+from domain.document_metadata import DocumentMetadata as DomainMetadata, MetadataFilter
+from schemas.document_metadata import DocumentMetadata as SchemaMetadata
+from schemas.match_filters import MatchFilters
+
+def to_domain_metadata(schema_metadata: Optional[SchemaMetadata]) -> Optional[DomainMetadata]:
+    if schema_metadata is None:
+        return None
+    return DomainMetadata.from_dict(schema_metadata.model_dump())
+
+def to_metadata_filter(filters: Optional[MatchFilters]) -> Optional[MetadataFilter]:
+    if filters is None:
+        return None
+    return MetadataFilter.create(
+        clients=filters.clients,
+        sectors=filters.sectors,
+        languages=filters.languages,
+        year_min=filters.year_min,
+        year_max=filters.year_max,
+    )
@@ -1,8 +1,11 @@
 # schemas/add_request.py
 
 from pydantic import BaseModel
+from typing import Optional
+from schemas.document_metadata import DocumentMetadata
 
 class AddRequest(BaseModel):
     file_buffer: str
     doc_id: str
-    file_name: str
\ No newline at end of file
+    file_name: str
+    metadata: Optional[DocumentMetadata] = None  # client, sector, year, language: used by the /match filters
\ No newline at end of file
@@ -0,0 +1,17 @@
+# schemas/batch_match_request.py
+
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from schemas.keyword import Keyword
+from schemas.match_filters import MatchFilters
+
+class MatchLot(BaseModel):
+    lot_id: str
+    keywords: List[Keyword]
+
+class BatchMatchRequest(BaseModel):
+    lots: List[MatchLot]
+    language_code: str
+    deadline_ms: Optional[int] = None  # time budget of the whole batch (default: MATCH_DEADLINE_MS, 0 = none)
+    mode: Literal["llm", "fast"] = "llm"
+    filters: Optional[MatchFilters] = None  # applied to every lot
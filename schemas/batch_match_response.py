@@ -0,0 +1,9 @@
+# schemas/batch_match_response.py
+
+from pydantic import BaseModel
+from typing import List
+from schemas.match_response import MatchResponse
+
+class LotMatchResponse(BaseModel):
+    lot_id: str
+    documents: List[MatchResponse]
@@ -0,0 +1,7 @@
+# schemas/bulk_delete_request.py
+
+from pydantic import BaseModel
+from typing import List
+
+class BulkDeleteRequest(BaseModel):
+    doc_ids: List[str]
@@ -0,0 +1,13 @@
+# schemas/bundle_analysis_request.py
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class BundleFile(BaseModel):
+    file_name: str
+    file_buffer: str
+
+class BundleAnalysisRequest(BaseModel):
+    files: List[BundleFile]
+    language_code: str
+    token_budget: Optional[int] = Field(None, gt=0)  # tokens of merged text sent to the LLM (default: ANALYZE_BUNDLE_TOKEN_BUDGET)
@@ -0,0 +1,19 @@
+# schemas/bundle_analysis_response.py
+
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from schemas.keyword import Keyword
+
+class AnalyzedFile(BaseModel):
+    file_name: str
+    extracted_characters: int
+    boilerplate_characters: int  # lines already present earlier in the bundle, removed
+    truncated_characters: int    # cut to fit the token budget
+    error: Optional[str] = None
+
+class BundleAnalysisResponse(BaseModel):
+    summary: str
+    keywords: List[Keyword]
+    files: List[AnalyzedFile]
+    prompt_tokens: int  # estimated tokens of the merged text
+    timings_ms: Dict[str, float]
@@ -0,0 +1,14 @@
+# schemas/deletion_job_response.py
+
+from pydantic import BaseModel
+from typing import List, Optional
+
+class DeletionJobResponse(BaseModel):
+    job_id: str
+    found: bool = True
+    status: Optional[str] = None  # pending, running, complete or failed
+    total: int = 0
+    processed: int = 0
+    removed: List[str] = []
+    not_found: List[str] = []
+    failed: List[str] = []  # still hidden from the results, not removed from the storages
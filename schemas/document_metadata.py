@@ -0,0 +1,10 @@
+# schemas/document_metadata.py
+
+from pydantic import BaseModel
+from typing import Optional
+
+class DocumentMetadata(BaseModel):
+    client: Optional[str] = None
+    sector: Optional[str] = None
+    year: Optional[int] = None
+    language: Optional[str] = None  # language of the document, e.g. "fr"
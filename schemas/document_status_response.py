@@ -0,0 +1,14 @@
+# schemas/document_status_response.py
+
+from pydantic import BaseModel
+from typing import Optional
+from schemas.document_metadata import DocumentMetadata
+
+class DocumentStatusResponse(BaseModel):
+    doc_id: str
+    found: bool
+    matchable: bool = False          # chunks and vectors are stored (the document can be returned by /match)
+    graph_status: Optional[str] = None  # knowledge graph used by /ask : pending, running, complete or failed
+    slides: int = 0
+    metadata: Optional[DocumentMetadata] = None
+    duplicate_slides: int = 0        # slides sharing the chunk of a near-duplicate slide (of this or another document)
@@ -0,0 +1,12 @@
+# schemas/match_filters.py
+
+from pydantic import BaseModel
+from typing import List, Optional
+
+class MatchFilters(BaseModel):
+    """Only the documents whose metadata match every given field are searched (values compared case-insensitively)."""
+    clients: Optional[List[str]] = None
+    sectors: Optional[List[str]] = None
+    languages: Optional[List[str]] = None
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
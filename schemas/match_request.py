@@ -1,9 +1,13 @@
 # schemas/match_request.py
 
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 from schemas.keyword import Keyword
+from schemas.match_filters import MatchFilters
 
 class MatchRequest(BaseModel):
     keywords: List[Keyword]
-    language_code: str
\ No newline at end of file
+    language_code: str
+    deadline_ms: Optional[int] = None  # time budget of the request (default: MATCH_DEADLINE_MS, 0 = none)
+    mode: Literal["llm", "fast"] = "llm"  # "fast": deterministic ranking with extractive explanations, no LLM
+    filters: Optional[MatchFilters] = None  # search only the documents with these metadata
\ No newline at end of file
@@ -8,3 +8,4 @@ class MatchResponse(BaseModel):
     ao_id: str
     explanation: str
     matched_keywords: List[Keyword]
+    degraded: bool = False  # True when the deadline did not leave time for the LLM re-ranking
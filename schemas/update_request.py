@@ -0,0 +1,10 @@
+# schemas/update_request.py
+
+from pydantic import BaseModel
+from typing import Optional
+from schemas.document_metadata import DocumentMetadata
+
+class UpdateRequest(BaseModel):
+    file_buffer: str
+    file_name: str
+    metadata: Optional[DocumentMetadata] = None  # replaces the metadata of the document when given
@@ -0,0 +1,14 @@
+# schemas/update_response.py
+
+from pydantic import BaseModel
+from typing import List
+
+class UpdateResponse(BaseModel):
+    success: str
+    added: List[int] = []
+    removed: List[int] = []
+    changed: List[int] = []
+    moved: List[int] = []
+    unchanged: int = 0
+    failed: List[int] = []
+    full_reingest: bool = False
@@ -0,0 +1,70 @@
+# scripts/bench_embedding_backends.py
+#
+# Compares the onnx int8 backend with the fp32 torch backend on a sample of the stored chunks:
+# - accuracy : cosine similarity between both embeddings of the same chunk
+# - throughput : texts per second of each backend
+# Usage : python scripts/bench_embedding_backends.py [--sample 200] [--batch-size 32] [--threads 4]
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, ".."))
+sys.path.append(project_root)
+
+import numpy as np
+
+from infrastructure.embedder import TorchBackend, OnnxBackend, ONNX_MODEL_DIR
+
+
+def load_sample_chunks(sample_size: int) -> list:
+    path = os.path.join(project_root, "rag_storage", "kv_store_text_chunks.json")
+    with open(path, "r", encoding="utf-8") as f:
+        chunks = [c["content"] for c in json.load(f).values() if c.get("content")]
+    random.seed(0)
+    return random.sample(chunks, min(sample_size, len(chunks)))
+
+
+def encode_all(backend, texts: list, batch_size: int):
+    start = time.perf_counter()
+    vectors = np.vstack([backend.encode(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+    return vectors, len(texts) / (time.perf_counter() - start)
+
+
+def normalize(vectors):
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = load_sample_chunks(args.sample)
+    print(f"{len(texts)} chunks sampled")
+
+    torch_backend = TorchBackend(threads=args.threads)
+    onnx_backend = OnnxBackend(model_dir=os.path.join(project_root, ONNX_MODEL_DIR), threads=args.threads)
+    torch_backend.load()
+    onnx_backend.load()
+
+    # Warm-up (first calls allocate buffers)
+    torch_backend.encode(texts[:2])
+    onnx_backend.encode(texts[:2])
+
+    fp32, fp32_tps = encode_all(torch_backend, texts, args.batch_size)
+    int8, int8_tps = encode_all(onnx_backend, texts, args.batch_size)
+    assert fp32.shape == int8.shape, f"dimension mismatch: {fp32.shape} vs {int8.shape}"
+
+    cosines = np.sum(normalize(fp32) * normalize(int8), axis=1)
+    print(f"Dimension: {int8.shape[1]}")
+    print(f"Cosine agreement (onnx int8 vs torch fp32): mean={cosines.mean():.4f} "
+          f"min={cosines.min():.4f} p5={np.percentile(cosines, 5):.4f}")
+    print(f"Throughput torch fp32: {fp32_tps:.1f} texts/s")
+    print(f"Throughput onnx int8 : {int8_tps:.1f} texts/s (x{int8_tps / fp32_tps:.2f})")
@@ -0,0 +1,62 @@
+# scripts/bench_import_time.py
+#
+# Measures the cold import time of the application and of the modules used by the scripts.
+# Each import runs in a fresh interpreter. Usage :
+#   python scripts/bench_import_time.py                 # print the timings
+#   python scripts/bench_import_time.py --max-seconds 2 # exit with code 1 if `import main` is slower
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, ".."))
+
+MODULES = ["infrastructure.logger", "main"]
+
+
+def time_import(module: str, runs: int) -> float:
+    """Best wall time (in seconds) of `import module` in a new interpreter."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=project_root, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def slowest_imports(module: str, top: int = 15) -> list:
+    """Modules with the highest cumulative import time, from `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_root, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative.strip()), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    timings = {}
+    for module in MODULES:
+        timings[module] = time_import(module, args.runs)
+        print(f"import {module}: {timings[module]:.2f}s")
+
+    print("\nSlowest imports of main (cumulative):")
+    for cumulative_us, name in slowest_imports("main"):
+        print(f"  {cumulative_us / 1e6:6.3f}s  {name}")
+
+    if args.max_seconds is not None and timings["main"] > args.max_seconds:
+        print(f"\n[FAIL] import main took {timings['main']:.2f}s (> {args.max_seconds}s)")
+        sys.exit(1)
@@ -0,0 +1,85 @@
+# scripts/bench_match_fast.py
+#
+# Latency and throughput of /match in fast mode (no LLM), run in-process on the local rag_storage/.
+# The keyword sets are a JSON file such as
+#   [[{"keyword": "java", "score": 2}, {"keyword": "data", "score": 3}], ...]
+# (without a file, keyword sets are sampled from the stored slides).
+# Usage : python scripts/bench_match_fast.py [keyword_sets.json] [--requests 200] [--concurrency 8]
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, ".."))
+sys.path.append(project_root)
+os.chdir(project_root)  # rag_storage/ is resolved from the project root
+
+from domain.keyword import Keyword
+from application.matcher_service import match_documents_v2
+from infrastructure.lightrag_engine import init_rag
+from infrastructure.bm25_index import get_bm25_index
+from infrastructure.embedder import embedder
+
+CHUNKS_PATH = os.path.join("rag_storage", "kv_store_text_chunks.json")
+
+
+def sample_keyword_sets(count: int, size: int = 8) -> list:
+    """Keyword sets made of words of the stored slides (a rough stand-in for real tender keywords)."""
+    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    words = sorted({w.lower() for c in chunks.values() for w in re.findall(r"[^\W\d_]{5,}", c.get("content", ""))})
+    rng = random.Random(0)
+    return [
+        [{"keyword": w, "score": rng.randint(1, 3)} for w in rng.sample(words, min(size, len(words)))]
+        for _ in range(count)
+    ]
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def main(keyword_sets: list, requests: int, concurrency: int):
+    await init_rag()
+    get_bm25_index()
+    await embedder.embed_queries(["warm-up"])
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(keyword_set):
+        async with semaphore:
+            start = time.perf_counter()
+            await match_documents_v2([Keyword(k["keyword"], k["score"]) for k in keyword_set], "en", mode="fast")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(keyword_sets[i % len(keyword_sets)]) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{requests} requests, concurrency {concurrency}")
+    print(f"mean {sum(latencies) / len(latencies):.1f} ms, p50 {percentile(latencies, 50):.1f} ms, "
+          f"p95 {percentile(latencies, 95):.1f} ms, p99 {percentile(latencies, 99):.1f} ms")
+    print(f"throughput {requests / elapsed:.1f} requests/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("keyword_sets_file", nargs="?")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.keyword_sets_file:
+        with open(args.keyword_sets_file, "r", encoding="utf-8") as f:
+            sets = json.load(f)
+    else:
+        sets = sample_keyword_sets(50)
+    asyncio.run(main(sets, args.requests, args.concurrency))
@@ -0,0 +1,77 @@
+# scripts/bench_retrieval.py
+#
+# Compares dense, BM25 and hybrid (dense + BM25) chunk retrieval on labelled keywords:
+# precision@k at the document level and latency per query.
+# Runs in-process on the local rag_storage/. The labelled keywords are a JSON file such as
+#   [{"keyword": "ISO 27001", "relevant_docs": ["ao-12", "ao-31"]}, ...]
+# Usage : python scripts/bench_retrieval.py scripts/data/retrieval_queries.json [--k 5] [--top-k 8]
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, ".."))
+sys.path.append(project_root)
+os.chdir(project_root)  # rag_storage/ is resolved from the project root
+
+from infrastructure.embedder import embedder
+from infrastructure.lightrag_engine import init_rag, query_chunks_by_vector
+from infrastructure.hybrid_search import query_chunks_hybrid
+from infrastructure.bm25_index import get_bm25_index
+
+
+def top_docs(doc_ids, k: int) -> list:
+    """Distinct documents in rank order."""
+    return list(dict.fromkeys(doc_ids))[:k]
+
+
+async def retrieve(mode: str, keyword: str, top_k: int) -> list:
+    if mode == "bm25":
+        index = get_bm25_index()
+        return [index.get_doc_id(chunk_id) for chunk_id, _, _ in index.search(keyword, top_k)]
+    query_vector = (await embedder.embed_queries([keyword]))[0]
+    if mode == "dense":
+        chunks = await query_chunks_by_vector(query_vector, top_k=top_k)
+    else:
+        chunks = await query_chunks_hybrid(keyword, query_vector, top_k=top_k)
+    return [c["full_doc_id"] for c in chunks]
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def main(queries: list, k: int, top_k: int):
+    await init_rag()
+    get_bm25_index()
+    await embedder.embed_queries(["warm-up"])
+
+    print(f"{len(queries)} labelled keywords, precision@{k}, {top_k} chunks per keyword\n")
+    print(f"{'mode':8} {'P@k':>6} {'mean ms':>8} {'p95 ms':>8}")
+    for mode in ("dense", "bm25", "hybrid"):
+        precisions, latencies = [], []
+        for query in queries:
+            start = time.perf_counter()
+            doc_ids = await retrieve(mode, query["keyword"], top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            relevant = set(query["relevant_docs"])
+            precisions.append(len(relevant.intersection(top_docs(doc_ids, k))) / k)
+        print(f"{mode:8} {sum(precisions) / len(precisions):6.3f} "
+              f"{sum(latencies) / len(latencies):8.1f} {percentile(latencies, 95):8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("queries_file")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=8)
+    args = parser.parse_args()
+
+    with open(args.queries_file, "r", encoding="utf-8") as f:
+        labelled_queries = json.load(f)
+    asyncio.run(main(labelled_queries, args.k, args.top_k))
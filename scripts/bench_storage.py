@@ -0,0 +1,206 @@
+# scripts/bench_storage.py
+#
+# Compares the LightRAG JSON storages (JsonKVStorage + NanoVectorDBStorage) with the SQLite /
+# memory-mapped ones (SqliteKVStorage + MmapVectorDBStorage) on synthetic text chunks:
+# - cold-start load time and peak RSS of a fresh process that opens the chunk stores and runs one query
+# - write cost of inserting one chunk (record + vector) and persisting it
+# The JSON side reproduces what the JSON storages do: load the whole files, rewrite them on each insert.
+# Linux / macOS only (peak RSS). The RSS of the binary backend includes the vector pages mapped by the
+# query, which stay shared with the OS page cache.
+# Usage : python scripts/bench_storage.py [--sizes 1000 10000 100000] [--inserts 10] [--dim 384]
+
+import argparse
+import base64
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, ".."))
+sys.path.append(project_root)
+
+import numpy as np
+
+from infrastructure.binary_store import SqliteKV, VectorBlocks
+
+WORDS = [
+    "projet", "migration", "cloud", "data", "sécurité", "agile", "formation", "architecture", "audit",
+    "infrastructure", "support", "développement", "intégration", "méthodologie", "référence", "client",
+]
+
+
+def peak_rss_mb() -> float:
+    if os.path.exists("/proc/self/status"):
+        # Linux: VmHWM starts again at exec, ru_maxrss keeps the peak of the parent process
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KB on Linux
+
+
+def make_chunk(i: int, rng: random.Random) -> dict:
+    return {
+        "tokens": 350,
+        "content": " ".join(rng.choice(WORDS) for _ in range(200)),
+        "chunk_order_index": i % 40,
+        "full_doc_id": f"doc-{i // 40}",
+        "file_path": f"rao_{i // 40}.pdf",
+    }
+
+
+def make_vectors(count: int, dim: int, seed: int) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+# JSON storages (same file formats as LightRAG / NanoVectorDB)
+
+def write_json_stores(workdir: str, chunks: dict, vectors: np.ndarray) -> None:
+    with open(os.path.join(workdir, "kv_store_text_chunks.json"), "w", encoding="utf-8") as f:
+        json.dump(chunks, f, ensure_ascii=False)
+    now = int(time.time())
+    storage = {
+        "embedding_dim": vectors.shape[1],
+        "data": [
+            {"__id__": id, "__created_at__": now, "full_doc_id": c["full_doc_id"], "content": c["content"],
+             "file_path": c["file_path"]}
+            for id, c in chunks.items()
+        ],
+        "matrix": base64.b64encode(vectors.tobytes()).decode(),
+    }
+    with open(os.path.join(workdir, "vdb_chunks.json"), "w", encoding="utf-8") as f:
+        json.dump(storage, f, ensure_ascii=False)
+
+
+def load_json_stores(workdir: str):
+    with open(os.path.join(workdir, "kv_store_text_chunks.json"), "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    with open(os.path.join(workdir, "vdb_chunks.json"), "r", encoding="utf-8") as f:
+        storage = json.load(f)
+    matrix = np.frombuffer(base64.b64decode(storage["matrix"]), dtype=np.float32).reshape(-1, storage["embedding_dim"])
+    return chunks, storage, matrix
+
+
+def query_json(storage: dict, matrix: np.ndarray, vector: np.ndarray, top_k: int = 10) -> list:
+    scores = matrix @ vector
+    return [storage["data"][i]["__id__"] for i in np.argsort(-scores)[:top_k]]
+
+
+# SQLite / memory-mapped storages
+
+def write_binary_stores(workdir: str, chunks: dict, vectors: np.ndarray) -> None:
+    kv = SqliteKV(os.path.join(workdir, "kv_store_text_chunks.sqlite"))
+    blocks = VectorBlocks(os.path.join(workdir, "vdb_chunks"), vectors.shape[1])
+    ids = list(chunks)
+    for i in range(0, len(ids), 5000):
+        batch = ids[i:i + 5000]
+        kv.put_many({id: chunks[id] for id in batch})
+        blocks.upsert(batch, vectors[i:i + 5000], [
+            {"full_doc_id": chunks[id]["full_doc_id"], "content": chunks[id]["content"],
+             "file_path": chunks[id]["file_path"]}
+            for id in batch
+        ])
+    kv.close()
+    blocks.close()
+
+
+# Cold start, run in a fresh process: python bench_storage.py --load json|binary --workdir ... --dim ...
+
+def cold_start(backend: str, workdir: str, dim: int) -> dict:
+    baseline = peak_rss_mb()
+    query = make_vectors(1, dim, seed=1)[0]
+    start = time.perf_counter()
+    if backend == "json":
+        chunks, storage, matrix = load_json_stores(workdir)
+        top = query_json(storage, matrix, query)
+        first = chunks[top[0]]
+    else:
+        kv = SqliteKV(os.path.join(workdir, "kv_store_text_chunks.sqlite"))
+        blocks = VectorBlocks(os.path.join(workdir, "vdb_chunks"), dim)
+        top = blocks.query(query, 10)
+        first = kv.get(top[0][0])
+    seconds = time.perf_counter() - start
+    assert first is not None
+    return {"load_s": seconds, "rss_mb": peak_rss_mb() - baseline}
+
+
+def run_cold_start(backend: str, workdir: str, dim: int) -> dict:
+    result = subprocess.run(
+        [sys.executable, __file__, "--load", backend, "--workdir", workdir, "--dim", str(dim)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def insert_cost(backend: str, workdir: str, dim: int, inserts: int, rng: random.Random) -> float:
+    """Mean seconds to insert and persist one chunk."""
+    new_vectors = make_vectors(inserts, dim, seed=2)
+    if backend == "json":
+        chunks, storage, matrix = load_json_stores(workdir)
+        start = time.perf_counter()
+        for n in range(inserts):
+            id = f"chunk-new-{n}"
+            chunks[id] = make_chunk(n, rng)
+            storage["data"].append({"__id__": id, **{k: chunks[id][k] for k in ("full_doc_id", "content", "file_path")}})
+            matrix = np.vstack([matrix, new_vectors[n:n + 1]])
+            # index_done_callback of the JSON storages: both files rewritten in full
+            with open(os.path.join(workdir, "kv_store_text_chunks.json"), "w", encoding="utf-8") as f:
+                json.dump(chunks, f, ensure_ascii=False)
+            storage["matrix"] = base64.b64encode(matrix.tobytes()).decode()
+            with open(os.path.join(workdir, "vdb_chunks.json"), "w", encoding="utf-8") as f:
+                json.dump(storage, f, ensure_ascii=False)
+    else:
+        kv = SqliteKV(os.path.join(workdir, "kv_store_text_chunks.sqlite"))
+        blocks = VectorBlocks(os.path.join(workdir, "vdb_chunks"), dim)
+        start = time.perf_counter()
+        for n in range(inserts):
+            id = f"chunk-new-{n}"
+            chunk = make_chunk(n, rng)
+            kv.put_many({id: chunk})
+            blocks.upsert([id], new_vectors[n:n + 1], [{k: chunk[k] for k in ("full_doc_id", "content", "file_path")}])
+    return (time.perf_counter() - start) / inserts
+
+
+def dir_size_mb(workdir: str) -> float:
+    return sum(os.path.getsize(os.path.join(workdir, f)) for f in os.listdir(workdir)) / 1e6
+
+
+def main(sizes: list, inserts: int, dim: int) -> None:
+    print(f"{'chunks':>8} {'backend':8} {'disk MB':>8} {'load s':>8} {'RSS MB':>8} {'insert ms':>10}")
+    for size in sizes:
+        rng = random.Random(0)
+        chunks = {f"chunk-{i:08d}": make_chunk(i, rng) for i in range(size)}
+        vectors = make_vectors(size, dim, seed=0)
+        for backend, write in (("json", write_json_stores), ("binary", write_binary_stores)):
+            workdir = tempfile.mkdtemp(prefix=f"bench_storage_{backend}_")
+            try:
+                write(workdir, chunks, vectors)
+                disk = dir_size_mb(workdir)
+                cold = run_cold_start(backend, workdir, dim)
+                insert_s = insert_cost(backend, workdir, dim, inserts, rng)
+                print(f"{size:>8} {backend:8} {disk:>8.1f} {cold['load_s']:>8.3f} {cold['rss_mb']:>8.1f} {insert_s * 1000:>10.2f}")
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--inserts", type=int, default=10, help="chunks inserted one by one to measure the write cost")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--load", choices=["json", "binary"], help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        print(json.dumps(cold_start(args.load, args.workdir, args.dim)))
+    else:
+        main(args.sizes, args.inserts, args.dim)
@@ -0,0 +1,60 @@
+# scripts/build_document_profiles.py
+#
+# Builds the profile (summary, themes, keywords) of the documents ingested before profiles existed,
+# from their stored content. Documents that already have a profile are skipped (unless --all).
+# Can run while the server is running: the registry is written under the corpus lock.
+# Usage : python scripts/build_document_profiles.py [--all] [--concurrency 4]
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, ".."))
+sys.path.append(project_root)
+os.chdir(project_root)  # rag_storage/ is resolved from the project root
+
+from infrastructure.lightrag_engine import init_rag
+from infrastructure.doc_registry import list_docs, update_doc
+from infrastructure.corpus_sync import corpus_write
+from infrastructure.llm_dispatcher import llm_priority, BULK
+from infrastructure.profile_engine import build_document_profile
+from domain.document_ingestor import SPLIT_MARKER
+
+
+async def build_profile(doc_id: str, entry: dict, semaphore: asyncio.Semaphore) -> bool:
+    async with semaphore:
+        lightrag = await init_rag()
+        record = await lightrag.full_docs.get_by_id(doc_id)
+        if not record or not record.get("content"):
+            print(f"  {doc_id}: no stored content, skipped")
+            return False
+        slides = [part.strip() for part in record["content"].split(SPLIT_MARKER) if part.strip()]
+        profile = await build_document_profile(entry.get("file_name", doc_id), slides)
+        if profile is None:
+            print(f"  {doc_id}: profile failed")
+            return False
+        async with corpus_write():
+            update_doc(doc_id, profile=profile.to_dict())
+        print(f"  {doc_id}: {', '.join(profile.themes)}")
+        return True
+
+
+async def main(rebuild_all: bool, concurrency: int):
+    docs = {doc_id: entry for doc_id, entry in list_docs().items() if rebuild_all or not entry.get("profile")}
+    print(f"{len(docs)} documents to profile")
+    start = time.time()
+    semaphore = asyncio.Semaphore(concurrency)
+    with llm_priority(BULK):
+        results = await asyncio.gather(*(build_profile(doc_id, entry, semaphore) for doc_id, entry in docs.items()))
+    print(f"{sum(results)} profiles built in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--all", action="store_true", help="rebuild the existing profiles too")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.all, args.concurrency))
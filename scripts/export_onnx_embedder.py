@@ -0,0 +1,50 @@
+# scripts/export_onnx_embedder.py
+#
+# Exports intfloat/multilingual-e5-small to ONNX and quantizes it to int8 (dynamic quantization).
+# The result is the folder used by EMBEDDING_BACKEND=onnx (ONNX_MODEL_DIR).
+# Requires: torch, transformers, onnx, onnxruntime
+
+import os
+import sys
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, ".."))
+sys.path.append(project_root)
+
+import torch
+from transformers import AutoModel, AutoTokenizer
+from onnxruntime.quantization import quantize_dynamic, QuantType
+
+from infrastructure.embedder import MODEL_NAME, ONNX_MODEL_DIR, ONNX_MODEL_FILE
+from infrastructure.logger import debug
+
+output_dir = os.path.join(project_root, ONNX_MODEL_DIR)
+os.makedirs(output_dir, exist_ok=True)
+fp32_path = os.path.join(output_dir, "model.onnx")
+
+tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+model = AutoModel.from_pretrained(MODEL_NAME).eval()
+
+sample = tokenizer(["passage: sample text"], return_tensors="pt")
+input_names = list(sample.keys())  # input_ids, attention_mask (+ token_type_ids)
+dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+debug(f"Exporting {MODEL_NAME} to {fp32_path}...")
+with torch.no_grad():
+    torch.onnx.export(
+        model,
+        tuple(sample[name] for name in input_names),
+        fp32_path,
+        input_names=input_names,
+        output_names=["last_hidden_state"],
+        dynamic_axes=dynamic_axes,
+        opset_version=14,
+    )
+
+debug("Quantizing weights to int8...")
+quantize_dynamic(fp32_path, os.path.join(output_dir, ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+tokenizer.save_pretrained(output_dir)
+os.remove(fp32_path)
+
+print(f"ONNX int8 model saved in {output_dir}")
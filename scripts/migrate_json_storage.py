@@ -0,0 +1,111 @@
+# scripts/migrate_json_storage.py
+#
+# One-shot migration of rag_storage/ from the LightRAG JSON storages to the SQLite / memory-mapped ones:
+# - kv_store_<namespace>.json -> kv_store_<namespace>.sqlite (SqliteKVStorage)
+# - vdb_<namespace>.json (NanoVectorDB) -> vdb_<namespace>.sqlite + vdb_<namespace>.0.f32 (MmapVectorDBStorage)
+# The document statuses (kv_store_doc_status.json) and the graph stay in their files. The JSON files are
+# left untouched, they can be removed once the server runs with
+#   KV_STORAGE=SqliteKVStorage VECTOR_STORAGE=MmapVectorDBStorage
+# Stop the server before migrating.
+# Usage : python scripts/migrate_json_storage.py [--workdir rag_storage] [--force]
+
+import argparse
+import base64
+import glob
+import json
+import os
+import sys
+import time
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, ".."))
+sys.path.append(project_root)
+os.chdir(project_root)  # rag_storage/ is resolved from the project root
+
+import numpy as np
+
+from infrastructure.binary_store import SqliteKV, VectorBlocks
+
+BATCH_SIZE = 2000
+JSON_ONLY_NAMESPACES = {"doc_status"}  # LightRAG storage types without a SQLite implementation here
+
+
+def namespace_of(path: str, prefix: str) -> str:
+    return os.path.basename(path)[len(prefix):-len(".json")]
+
+
+def remove_existing(paths: list, force: bool) -> bool:
+    existing = [p for p in paths if os.path.exists(p)]
+    if existing and not force:
+        print(f"  skipped: {', '.join(existing)} already exist (use --force to migrate again)")
+        return False
+    for path in existing:
+        os.remove(path)
+    return True
+
+
+def migrate_kv(json_path: str, force: bool) -> None:
+    db_path = json_path[:-len(".json")] + ".sqlite"
+    print(f"{json_path} -> {db_path}")
+    if not remove_existing([db_path, f"{db_path}-wal", f"{db_path}-shm"], force):
+        return
+    start = time.time()
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    kv = SqliteKV(db_path)
+    ids = list(data)
+    for i in range(0, len(ids), BATCH_SIZE):
+        kv.put_many({id: data[id] for id in ids[i:i + BATCH_SIZE]})
+    count = kv.count()
+    kv.close()
+    if count != len(data):
+        raise RuntimeError(f"{db_path}: {count} records written, {len(data)} expected")
+    print(f"  {count} records in {time.time() - start:.1f}s")
+
+
+def migrate_vdb(json_path: str, force: bool) -> None:
+    base_path = json_path[:-len(".json")]
+    print(f"{json_path} -> {base_path}.sqlite / .f32")
+    existing = [f"{base_path}.sqlite", f"{base_path}.sqlite-wal", f"{base_path}.sqlite-shm"]
+    if not remove_existing(existing + glob.glob(f"{base_path}.*.f32"), force):
+        return
+    start = time.time()
+    with open(json_path, "r", encoding="utf-8") as f:
+        storage = json.load(f)
+    dim = storage["embedding_dim"]
+    # NanoVectorDB stores the (already normalized) float32 matrix as a base64 string
+    matrix = np.frombuffer(base64.b64decode(storage["matrix"]), dtype=np.float32).reshape(-1, dim)
+    records = storage["data"]
+    if len(records) != len(matrix):
+        raise RuntimeError(f"{json_path}: {len(records)} records for {len(matrix)} vectors")
+
+    blocks = VectorBlocks(base_path, dim)
+    for i in range(0, len(records), BATCH_SIZE):
+        batch = records[i:i + BATCH_SIZE]
+        blocks.upsert(
+            [r["__id__"] for r in batch],
+            matrix[i:i + BATCH_SIZE],
+            [{k: v for k, v in r.items() if k != "__id__"} for r in batch],
+        )
+    count = len(blocks)
+    blocks.close()
+    if count != len({r["__id__"] for r in records}):
+        raise RuntimeError(f"{base_path}: {count} vectors written, {len(records)} expected")
+    print(f"  {count} vectors of dimension {dim} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workdir", default="rag_storage")
+    parser.add_argument("--force", action="store_true", help="replace the already migrated stores")
+    args = parser.parse_args()
+
+    for path in sorted(glob.glob(os.path.join(args.workdir, "kv_store_*.json"))):
+        if namespace_of(path, "kv_store_") in JSON_ONLY_NAMESPACES:
+            print(f"{path}: kept in JSON")
+            continue
+        migrate_kv(path, args.force)
+    for path in sorted(glob.glob(os.path.join(args.workdir, "vdb_*.json"))):
+        migrate_vdb(path, args.force)
+
+    print("\nDone. Start the server with KV_STORAGE=SqliteKVStorage VECTOR_STORAGE=MmapVectorDBStorage")
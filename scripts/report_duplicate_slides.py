@@ -0,0 +1,52 @@
+# scripts/report_duplicate_slides.py
+#
+# Corpus-wide statistics of the near-duplicate slides stored once (see infrastructure/duplicate_index.py):
+# - index space saved: chunks not stored (vector + text record + copy of the text in the vector metadata)
+# - ingestion time saved: vision calls avoided, at the average vision call duration of the corpus
+# Documents ingested before fingerprints existed have no duplicates (re-adding them fingerprints their slides).
+# Usage : python scripts/report_duplicate_slides.py
+
+import asyncio
+import os
+import sys
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, ".."))
+sys.path.append(project_root)
+os.chdir(project_root)  # rag_storage/ is resolved from the project root
+
+from infrastructure.lightrag_engine import init_rag
+from infrastructure.doc_registry import list_docs
+from infrastructure.duplicate_index import get_duplicate_aliases, get_duplicate_stats
+
+
+async def main():
+    docs = list_docs()
+    stats = get_duplicate_stats()
+    caption_stats = [entry.get("caption_stats") or {} for entry in docs.values()]
+    vision_calls = sum(s.get("vision_calls", 0) for s in caption_stats)
+    vision_seconds = sum(s.get("vision_seconds", 0.0) for s in caption_stats)
+    visual_duplicates = sum(s.get("duplicate_visual_slides", 0) for s in caption_stats)
+    total_slides = sum(len(entry.get("slides", [])) for entry in docs.values())
+
+    lightrag = await init_rag()
+    shared_ids = list(get_duplicate_aliases())
+    records = [r for r in await lightrag.text_chunks.get_by_ids(shared_ids) if r]
+    text_bytes = sum(len(r["content"].encode("utf-8")) for r in records) / len(records) if records else 0
+    chunk_bytes = lightrag.chunks_vdb.embedding_func.embedding_dim * 4 + 2 * text_bytes
+
+    print(f"{len(docs)} documents, {total_slides} slides")
+    print(f"{stats['duplicate_slides']} duplicate slides sharing {stats['shared_slides']} chunks "
+          f"({stats['duplicate_slides'] / total_slides:.1%} of the slides)" if total_slides else "no slides")
+    print(f"index space saved: ~{stats['duplicate_slides'] * chunk_bytes / 1e6:.2f} MB "
+          f"({stats['duplicate_slides']} chunks of ~{chunk_bytes / 1e3:.1f} KB, BM25 postings not counted)")
+    if vision_calls:
+        average = vision_seconds / vision_calls
+        print(f"ingestion time saved: {visual_duplicates} vision calls, ~{visual_duplicates * average:.0f}s "
+              f"at {average:.1f}s per slide")
+    else:
+        print(f"ingestion time saved: {visual_duplicates} vision calls (no vision call timed yet)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())